@@ -0,0 +1,340 @@
+"""
+다중 계정 관리자 (한 배포 안에서 계정 N개 + 공유 시세 프로세스 1개)
+
+- 계정마다 봇 프로세스(main.py) 하나: 자기 API 키/상태(StateStore, 초기 자본 파일, 로트/손익 원장)/
+  주문 속도 한도(RiskGate)/비공개 WS 인증 연결을 가짐 → 한 계정의 예외/재시작이 다른 계정에 번지지 않음
+- 공개 시세(티커/호가 WS, 캔들 REST)와 지표 계산(OBV MACD/ATR/실현 변동성)은 시세 프로세스 하나가 담당하고
+  계정별 공유 메모리 링에 같은 레코드를 기록 (FEED_MODE=shared, FEED_RING=<링 이름>)
+  + 계정별 깨우기 파이프 (쓰기 끝 → 시세 프로세스, 읽기 끝 → 봇 프로세스 FEED_WAKE_FD, 둘 다 pass_fds로 전달)
+  → 공개 WS 연결/호가창/캔들 조회 비용은 계정 수와 무관하게 1회
+- 감시: 시세 heartbeat가 멈추거나 프로세스가 죽으면 재시작, 봇 프로세스가 죽으면 지수 백오프로 재시작
+- 자원 보고: 계정/시세 프로세스별 RSS, CPU 시간, 스레드 수, 열린 소켓 수(/proc) + 링 backlog/drop → GET /accounts
+
+계정 파일 (JSON 목록, 키/시크릿은 직접 쓰지 않고 환경 변수 이름으로 참조):
+    [{"name": "main", "api_key_env": "API_KEY", "api_secret_env": "API_SECRET", "user_id": "123"},
+     {"name": "sub1", "api_key_env": "SUB1_API_KEY", "api_secret_env": "SUB1_API_SECRET",
+      "order_rate_limit": 20, "env": {"LOG_FORMAT": "json"}}]
+    모든 계정은 관리자의 --symbol 계약을 거래 (공유 시세 링 레코드에는 계약 구분이 없음 → env의 다른 SYMBOL은 거부)
+    계정별 초기 자본 파일은 --data-dir 아래 (소스 트리에 쓰지 않음)
+
+사용법:
+    python accounts.py accounts.json              # 관리 포트 8080, 계정은 8081부터
+    python accounts.py accounts.json --port 9000
+    python accounts.py accounts.json --data-dir /var/lib/gate-bot
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from shm_ring import ShmRing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "data")       # 계정별 실행 상태 파일 기본 위치 (gitignore)
+BOT_RESTART_BACKOFF_MIN = 1.0               # 봇 재시작 대기 (초, 연속 실패마다 2배)
+BOT_RESTART_BACKOFF_MAX = 60.0
+BOT_STABLE_AFTER = 60.0                     # 이 시간 이상 살아 있었으면 백오프 초기화 (초)
+RESOURCE_SAMPLE_INTERVAL = 5.0              # 자원 사용량 수집 주기 (초)
+
+
+class AccountSpec:
+    __slots__ = ("name", "api_key", "api_secret", "user_id", "port", "order_rate_limit", "env")
+
+    def __init__(self, name, api_key, api_secret, user_id="", port=0, order_rate_limit=None, env=None):
+        self.name = name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.user_id = user_id
+        self.port = port
+        self.order_rate_limit = order_rate_limit
+        self.env = env or {}
+
+
+def load_accounts(path, base_port=8081, symbol=None):
+    """ 계정 파일 → AccountSpec 목록 (키가 비었거나 이름이 겹치거나 env SYMBOL이 symbol과 다르면 ValueError) """
+    with open(path) as f:
+        entries = json.load(f)
+    specs, names = [], set()
+    for i, entry in enumerate(entries):
+        name = entry["name"]
+        if name in names:
+            raise ValueError(f"duplicate account name: {name}")
+        names.add(name)
+        api_key = os.environ.get(entry.get("api_key_env", ""), "")
+        api_secret = os.environ.get(entry.get("api_secret_env", ""), "")
+        if not api_key or not api_secret:
+            raise ValueError(f"account {name}: {entry.get('api_key_env')}/{entry.get('api_secret_env')} not set")
+        env_symbol = (entry.get("env") or {}).get("SYMBOL")
+        if symbol is not None and env_symbol is not None and env_symbol != symbol:
+            raise ValueError(f"account {name}: SYMBOL {env_symbol} differs from shared feed symbol {symbol}")
+        specs.append(AccountSpec(name, api_key, api_secret, user_id=str(entry.get("user_id", "")),
+                                 port=int(entry.get("port", base_port + i)),
+                                 order_rate_limit=entry.get("order_rate_limit"), env=entry.get("env")))
+    return specs
+
+
+def proc_resources(pid):
+    """ /proc 기준 프로세스 자원 사용량 (Linux 외에는 None) """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        fds = os.listdir(f"/proc/{pid}/fd")
+        sockets = 0
+        for fd in fds:
+            try:
+                if os.readlink(f"/proc/{pid}/fd/{fd}").startswith("socket:"):
+                    sockets += 1
+            except OSError:
+                pass
+        ticks = os.sysconf("SC_CLK_TCK")
+        return {"rss_mb": round(int(status["VmRSS"].split()[0]) / 1024, 1),
+                "cpu_s": round((int(fields[11]) + int(fields[12])) / ticks, 2),
+                "threads": int(status["Threads"]), "fds": len(fds), "sockets": sockets}
+    except (OSError, KeyError, ValueError, IndexError):
+        return None
+
+
+class AccountProcess:
+    """ 계정 하나의 봇 프로세스 + 전용 시세 링 + 깨우기 파이프 """
+
+    def __init__(self, spec, ring, symbol, data_dir=DATA_DIR):
+        self.spec = spec
+        self.ring = ring
+        # 재시작해도 같은 파이프를 넘김 (관리자가 양 끝을 계속 들고 있음)
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_w, False)
+        self.symbol = symbol
+        self.data_dir = data_dir
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = BOT_RESTART_BACKOFF_MIN
+        self.next_start = 0.0
+        self.last_exit = None
+        self.resources = None
+
+    def environment(self):
+        spec = self.spec
+        env = dict(os.environ, **{str(k): str(v) for k, v in spec.env.items()})
+        env.update(API_KEY=spec.api_key, API_SECRET=spec.api_secret, GATE_USER_ID=spec.user_id,
+                   ACCOUNT_NAME=spec.name, PORT=str(spec.port), FEED_MODE="shared", FEED_RING=self.ring.name,
+                   FEED_WAKE_FD=str(self.wake_r),
+                   SYMBOL=self.symbol, CAPITAL_FILE=os.path.join(self.data_dir, f"initial_capital_{spec.name}.json"))
+        if spec.order_rate_limit is not None:
+            env["ORDER_RATE_LIMIT"] = str(spec.order_rate_limit)
+        if env.get("RECORD_DIR"):
+            env["RECORD_DIR"] = os.path.join(env["RECORD_DIR"], spec.name)
+        return env
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, os.path.join(HERE, "main.py")], cwd=HERE,
+                                        env=self.environment(), pass_fds=(self.wake_r,))
+        self.started_at = time.time()
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait(timeout=2)
+
+    def close(self):
+        self.ring.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+
+    def stats(self):
+        ring = self.ring.stats()
+        return {"pid": self.process.pid if self.process else None, "alive": self.alive(), "port": self.spec.port,
+                "restarts": self.restarts, "last_exit": self.last_exit,
+                "uptime_s": round(time.time() - self.started_at, 1) if self.alive() else 0,
+                "order_rate_limit": self.spec.order_rate_limit, "resources": self.resources,
+                "feed_ring": {"backlog": ring["backlog"], "dropped": ring["dropped"], "read": ring["read"]}}
+
+
+class AccountManager:
+    def __init__(self, specs, symbol, settle, ws_url, host, feed_capacity=4096, watchdog_timeout=5.0,
+                 data_dir=DATA_DIR, logger=None, **feed_kwargs):
+        self.specs = specs
+        self.symbol = symbol
+        self.data_dir = data_dir
+        self.settle = settle
+        self.ws_url = ws_url
+        self.host = host
+        self.feed_capacity = feed_capacity
+        self.watchdog_timeout = watchdog_timeout
+        self.feed_kwargs = feed_kwargs
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.accounts = {}
+        self.feed = None
+        self.feed_started_at = 0.0
+        self.feed_restarts = 0
+        self.feed_resources = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------------------------------------------------------
+    # 시세 프로세스
+    # -------------------------------------------------------------------------
+    def _spawn_feed(self):
+        wake_fds = [a.wake_w for a in self.accounts.values()]
+        kwargs = dict(self.feed_kwargs, ring_name=[a.ring.name for a in self.accounts.values()], wake_fds=wake_fds,
+                      symbol=self.symbol, settle=self.settle, ws_url=self.ws_url, host=self.host)
+        module = os.path.join(HERE, "market_feed.py")
+        self.feed = subprocess.Popen([sys.executable, module, json.dumps(kwargs)], cwd=HERE, pass_fds=wake_fds)
+        self.feed_started_at = time.time()
+        self.log("🚀 ACCOUNTS", "Shared market data process spawned (pid %d, %d rings)", self.feed.pid,
+                 len(self.accounts), event="feed_spawn", pid=self.feed.pid)
+
+    def _check_feed(self):
+        alive = self.feed.poll() is None
+        # 모든 링에 같은 heartbeat가 기록되므로 가장 최근 값 기준
+        age = min(a.ring.heartbeat_age() for a in self.accounts.values())
+        if alive and (age < self.watchdog_timeout or time.time() - self.feed_started_at < self.watchdog_timeout * 2):
+            return
+        self.log("⚠️ ACCOUNTS", "Market data process %s (heartbeat age %.1fs) → restart",
+                 "alive but stalled" if alive else "dead", age if age != float("inf") else -1,
+                 event="feed_restart", alive=alive)
+        _terminate(self.feed)
+        self.feed_restarts += 1
+        self._spawn_feed()
+
+    # -------------------------------------------------------------------------
+    # 계정 프로세스
+    # -------------------------------------------------------------------------
+    def _check_account(self, account, now):
+        if account.alive():
+            if now - account.started_at >= BOT_STABLE_AFTER:
+                account.backoff = BOT_RESTART_BACKOFF_MIN
+            return
+        if account.process is not None and not account.next_start:
+            account.last_exit = account.process.returncode
+            account.next_start = now + account.backoff
+            self.log("⚠️ ACCOUNTS", "Account %s exited (code %s) → restart in %.0fs", account.spec.name,
+                     account.last_exit, account.backoff, event="account_exit", account=account.spec.name,
+                     code=account.last_exit)
+            account.backoff = min(account.backoff * 2, BOT_RESTART_BACKOFF_MAX)
+        if account.next_start and now >= account.next_start:
+            account.next_start = 0.0
+            account.restarts += 1
+            account.start()
+
+    def _sample_resources(self):
+        self.feed_resources = proc_resources(self.feed.pid) if self.feed else None
+        for account in self.accounts.values():
+            account.resources = proc_resources(account.process.pid) if account.alive() else None
+
+    # -------------------------------------------------------------------------
+    # 실행
+    # -------------------------------------------------------------------------
+    def start(self):
+        for spec in self.specs:
+            self.accounts[spec.name] = AccountProcess(spec, ShmRing.create(self.feed_capacity), self.symbol,
+                                                      self.data_dir)
+        self._spawn_feed()
+        for account in self.accounts.values():
+            account.start()
+            self.log("🚀 ACCOUNTS", "Account %s started (pid %d, port %d)", account.spec.name, account.process.pid,
+                     account.spec.port, event="account_start", account=account.spec.name)
+        self._thread = threading.Thread(target=self._monitor, name="account-manager", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _monitor(self):
+        next_sample = 0.0
+        while not self._stop.wait(1.0):
+            now = time.time()
+            try:
+                self._check_feed()
+                for account in self.accounts.values():
+                    self._check_account(account, now)
+                if now >= next_sample:
+                    next_sample = now + RESOURCE_SAMPLE_INTERVAL
+                    self._sample_resources()
+            except Exception as e:
+                self.log("❌ ACCOUNTS", "Monitor error: %s", e, event="account_monitor_error")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        for account in self.accounts.values():
+            account.stop()
+        _terminate(self.feed)
+        for account in self.accounts.values():
+            account.close()
+
+    def stats(self):
+        accounts = {name: a.stats() for name, a in self.accounts.items()}
+        totals = {"rss_mb": 0.0, "cpu_s": 0.0, "threads": 0, "sockets": 0}
+        for res in [self.feed_resources] + [a["resources"] for a in accounts.values()]:
+            for key in totals:
+                totals[key] += (res or {}).get(key, 0)
+        return {"feed": {"pid": self.feed.pid if self.feed else None,
+                         "alive": bool(self.feed and self.feed.poll() is None), "restarts": self.feed_restarts,
+                         "resources": self.feed_resources},
+                "accounts": accounts, "totals": {k: round(v, 2) for k, v in totals.items()}}
+
+
+def _terminate(process):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=2)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=2)
+
+
+def main():
+    from flask import Flask, jsonify
+
+    parser = argparse.ArgumentParser(description="Run several accounts sharing one market data feed")
+    parser.add_argument("accounts_file")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8080")), help="관리 포트 (/accounts)")
+    parser.add_argument("--symbol", default=os.environ.get("SYMBOL", "BNB_USDT"))
+    parser.add_argument("--data-dir", default=DATA_DIR, help="계정별 초기 자본 파일 위치")
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s")
+    manager_logger = logging.getLogger("accounts")
+
+    def log(tag, msg, *args, **fields):
+        manager_logger.info(f"[{tag}] {msg}", *args)
+
+    settle = "usdt"
+    manager = AccountManager(load_accounts(args.accounts_file, base_port=args.port + 1, symbol=args.symbol),
+                             args.symbol, settle, f"wss://fx-ws.gateio.ws/v4/ws/{settle}", "https://api.gateio.ws/api/v4",
+                             data_dir=args.data_dir, logger=log)
+    # SIGTERM(배포 교체)에도 finally에서 계정 프로세스를 정리하도록 예외로 바꿈
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    manager.start()
+    app = Flask(__name__)
+
+    @app.route('/accounts', methods=['GET'])
+    def accounts():
+        return jsonify(manager.stats()), 200
+
+    try:
+        app.run(host="0.0.0.0", port=args.port, debug=False, use_reloader=False)
+    finally:
+        manager.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+잔고/증거금 캐시 (futures.balances 스트림 + REST 정합성 보정)
+
+- 스트림 이벤트로 total(잔고)과 change를 즉시 반영
+- available / margin / unrealised_pnl 은 REST(list_futures_accounts)로 주기적 보정
+- 각 갱신은 version을 올리고, wait_for_update()로 다음 갱신을 기다릴 수 있음
+"""
+import threading
+import time
+from decimal import Decimal
+
+ZERO = Decimal("0")
+
+
+class BalanceSnapshot:
+    __slots__ = ("total", "available", "position_margin", "order_margin", "unrealised_pnl",
+                 "updated_at", "reconciled_at", "source", "version")
+
+    def __init__(self, total=ZERO, available=ZERO, position_margin=ZERO, order_margin=ZERO,
+                 unrealised_pnl=ZERO, updated_at=0.0, reconciled_at=0.0, source="init", version=0):
+        self.total = total
+        self.available = available
+        self.position_margin = position_margin
+        self.order_margin = order_margin
+        self.unrealised_pnl = unrealised_pnl
+        self.updated_at = updated_at
+        self.reconciled_at = reconciled_at
+        self.source = source
+        self.version = version
+
+    @property
+    def equity(self):
+        return self.total + self.unrealised_pnl
+
+    def to_dict(self):
+        data = {k: getattr(self, k) for k in self.__slots__}
+        for k, v in data.items():
+            if isinstance(v, Decimal):
+                data[k] = str(v)
+        data["equity"] = str(self.equity)
+        return data
+
+
+def _dec(value, default=ZERO):
+    if value is None or value == "":
+        return default
+    return Decimal(str(value))
+
+
+class BalanceCache:
+    def __init__(self, currency="USDT"):
+        self.currency = currency.upper()
+        self._cond = threading.Condition()
+        self._snapshot = BalanceSnapshot()
+        self._listeners = []
+        self.stream_updates = 0
+        self.rest_updates = 0
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def age(self):
+        updated = self._snapshot.updated_at
+        return time.time() - updated if updated else float("inf")
+
+    def on_update(self, callback):
+        """ callback(snapshot) - 갱신마다 호출 (락 밖에서) """
+        self._listeners.append(callback)
+
+    def _publish(self, snapshot):
+        with self._cond:
+            self._snapshot = snapshot
+            self._cond.notify_all()
+        for callback in self._listeners:
+            callback(snapshot)
+
+    def apply_stream(self, update):
+        """ futures.balances result 한 건: {"balance", "change", "currency", "time_ms", ...} """
+        currency = str(update.get("currency", self.currency)).upper()
+        if currency != self.currency:
+            return None
+        old = self._snapshot
+        total = _dec(update.get("balance"), old.total)
+        change = _dec(update.get("change"))
+        event_ts = (update.get("time_ms") or 0) / 1000 or time.time()
+        snapshot = BalanceSnapshot(
+            total=total,
+            available=old.available + change,      # REST 보정 전까지 change만큼 근사
+            position_margin=old.position_margin,
+            order_margin=old.order_margin,
+            unrealised_pnl=old.unrealised_pnl,
+            updated_at=event_ts,
+            reconciled_at=old.reconciled_at,
+            source="stream",
+            version=old.version + 1,
+        )
+        self.stream_updates += 1
+        self._publish(snapshot)
+        return snapshot
+
+    def apply_rest(self, account):
+        """ FuturesAccount (REST) 전체 반영 """
+        old = self._snapshot
+        now = time.time()
+        snapshot = BalanceSnapshot(
+            total=_dec(getattr(account, "total", None), old.total),
+            available=_dec(getattr(account, "available", None), old.available),
+            position_margin=_dec(getattr(account, "position_margin", None), old.position_margin),
+            order_margin=_dec(getattr(account, "order_margin", None), old.order_margin),
+            unrealised_pnl=_dec(getattr(account, "unrealised_pnl", None), old.unrealised_pnl),
+            updated_at=now,
+            reconciled_at=now,
+            source="rest",
+            version=old.version + 1,
+        )
+        self.rest_updates += 1
+        self._publish(snapshot)
+        return snapshot
+
+    def wait_for_update(self, since_version=None, timeout=None):
+        """ since_version 이후의 갱신을 기다림. 시간 초과 시 None """
+        if since_version is None:
+            since_version = self._snapshot.version
+        with self._cond:
+            ok = self._cond.wait_for(lambda: self._snapshot.version > since_version, timeout=timeout)
+            return self._snapshot if ok else None
+
+    def wait_until_fresh(self, max_age, timeout=None):
+        """ 스냅샷 나이가 max_age 이내가 될 때까지 대기 """
+        with self._cond:
+            ok = self._cond.wait_for(lambda: self.age() <= max_age, timeout=timeout)
+            return self._snapshot if ok else None
+
+    def stats(self):
+        data = self._snapshot.to_dict()
+        data["age_s"] = round(self.age(), 3) if self._snapshot.updated_at else None
+        data["stream_updates"] = self.stream_updates
+        data["rest_updates"] = self.rest_updates
+        return data
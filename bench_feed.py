@@ -0,0 +1,205 @@
+"""
+시세 경로 지연 비교: 단일 프로세스(스레드) vs 시세 프로세스 + 공유 메모리 링
+
+같은 합성 시세(티커 + 호가 증분 JSON)를 일정한 속도로 만들어 디코딩하고 주기적으로 OBV MACD를 계산합니다.
+실행 측에는 Flask/SDK 처리를 흉내 내는 부하 스레드(JSON 직렬화 반복)를 두고,
+메시지 예정 시각 → 실행 측 핸들러 반영까지의 지연(p50/p99/max)을 두 모드에서 측정합니다.
+- thread: 디코딩/지표 계산이 부하 스레드와 같은 프로세스(GIL 공유)에서 실행
+- process: 디코딩/지표 계산은 자식 프로세스, 실행 측은 ShmRing에서 고정 크기 레코드만 읽음
+  (링이 비면 --wakeup pipe: 깨우기 파이프 select / poll: 0.5ms sleep 폴링, consumer_cpu_s = 소비 스레드 CPU 시간)
+
+사용법:
+    python bench_feed.py                                # 2000 msg/s, 5초, 부하 스레드 2개
+    python bench_feed.py --rate 5000 --seconds 10 --load-threads 4
+    python bench_feed.py --mode process --capacity 256  # 작은 링으로 백프레셔(drop) 확인
+    python bench_feed.py --mode process --wakeup poll   # 폴링 소비와 비교
+"""
+import argparse
+import json
+import os
+import random
+import select
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from market_feed import KIND_BOOK, KIND_INDICATOR, KIND_TICK
+from shm_ring import ShmRing
+from strategy import calculate_obv_macd_normalized
+
+INDICATOR_INTERVAL = 0.2                    # 지표 계산 주기 (초)
+
+
+def synthetic_messages(count=512, seed=7):
+    """ Gate 선물 WS 형식의 티커/호가 증분 원문 (티커 1 : 호가 4) """
+    rng = random.Random(seed)
+    price = 612.0
+    messages = []
+    for i in range(count):
+        price = round(price + rng.uniform(-0.2, 0.2), 2)
+        now_ms = 1700000000000 + i * 100
+        if i % 5 == 0:
+            result = [{"contract": "BNB_USDT", "last": str(price), "change_percentage": "0.41",
+                       "total_size": "987654", "volume_24h": "123456", "volume_24h_base": "12345",
+                       "volume_24h_quote": "7561234", "volume_24h_settle": "7561234",
+                       "mark_price": str(round(price + 0.01, 2)), "funding_rate": "0.0001",
+                       "funding_rate_indicative": "0.0001", "index_price": str(round(price - 0.01, 2)),
+                       "low_24h": "600.1", "high_24h": "620.2"}]
+            channel = "futures.tickers"
+        else:
+            result = {"t": now_ms, "s": "BNB_USDT", "U": i * 10, "u": i * 10 + 9,
+                      "b": [{"p": str(round(price - 0.01 * k, 2)), "s": rng.randint(0, 500)} for k in range(1, 11)],
+                      "a": [{"p": str(round(price + 0.01 * k, 2)), "s": rng.randint(0, 500)} for k in range(1, 11)]}
+            channel = "futures.order_book_update"
+        messages.append(json.dumps({"time": now_ms // 1000, "time_ms": now_ms, "channel": channel,
+                                    "event": "update", "result": result}))
+    return messages
+
+
+def run_source(rate, seconds, emit, start_at):
+    """ rate msg/s로 원문 디코딩 → emit(kind, scheduled_ts, a, b). INDICATOR_INTERVAL마다 OBV MACD 계산 """
+    messages = synthetic_messages()
+    closes = [612.0 + 0.1 * (i % 17) for i in range(200)]
+    volumes = [100.0 + (i % 13) for i in range(200)]
+    total = int(rate * seconds)
+    next_indicator = start_at
+    for i in range(total):
+        due = start_at + i / rate
+        delay = due - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        data = json.loads(messages[i % len(messages)])
+        result = data["result"]
+        if data["channel"] == "futures.tickers":
+            item = result[0]
+            emit(KIND_TICK, due, float(item["last"]), float(item["mark_price"]))
+        else:
+            emit(KIND_BOOK, due, float(result["b"][0]["p"]), float(result["a"][0]["p"]))
+        if due >= next_indicator:
+            next_indicator = due + INDICATOR_INTERVAL
+            obv = calculate_obv_macd_normalized(closes, volumes)
+            emit(KIND_INDICATOR, due, obv or 0.0, 0.0)
+
+
+def producer_process(ring_name, rate, seconds, start_at, wake_fd=None):
+    ring = ShmRing.attach(ring_name)
+    ring.beat()
+
+    def emit(kind, ts, a, b):
+        ring.write(kind, ts, 0.0, a, b, block_timeout=0.01)
+        if wake_fd is not None:
+            try:
+                os.write(wake_fd, b"\0")
+            except BlockingIOError:
+                pass
+
+    run_source(rate, seconds, emit, start_at)
+    ring.beat()
+    if wake_fd is not None:
+        os.close(wake_fd)
+
+
+def load_worker(stop):
+    """ 실행 측 부하: 주문/응답 JSON 직렬화 반복 (GIL 점유) """
+    payload = {"orders": [{"id": i, "text": f"t-gl{i}", "size": i % 7 - 3, "price": f"{612 + i * 0.01:.2f}",
+                           "status": "open", "left": 3} for i in range(50)]}
+    while not stop.is_set():
+        json.loads(json.dumps(payload))
+
+
+def summarize(latencies_ms, dropped, elapsed, consumer_cpu=None):
+    if not latencies_ms:
+        return {"delivered": 0, "dropped": dropped}
+    ordered = sorted(latencies_ms)
+    return {"delivered": len(ordered), "dropped": dropped,
+            "consumer_cpu_s": round(consumer_cpu, 3) if consumer_cpu is not None else "-",
+            "p50_ms": round(statistics.median(ordered), 3),
+            "p99_ms": round(ordered[max(0, int(len(ordered) * 0.99) - 1)], 3),
+            "max_ms": round(ordered[-1], 3),
+            "msg_per_s": round(len(ordered) / elapsed, 1)}
+
+
+def bench_thread(rate, seconds, load_threads):
+    latencies = []
+    stop = threading.Event()
+    loads = [threading.Thread(target=load_worker, args=(stop,), daemon=True) for _ in range(load_threads)]
+    for t in loads:
+        t.start()
+    start_at = time.time() + 0.2
+    source = threading.Thread(target=run_source, args=(rate, seconds, lambda kind, ts, a, b: latencies.append(
+        (time.time() - ts) * 1000), start_at), daemon=True)
+    source.start()
+    source.join()
+    stop.set()
+    return summarize(latencies, 0, seconds)
+
+
+def bench_process(rate, seconds, load_threads, capacity, wakeup="pipe"):
+    latencies = []
+    stop = threading.Event()
+    ring = ShmRing.create(capacity)
+    loads = [threading.Thread(target=load_worker, args=(stop,), daemon=True) for _ in range(load_threads)]
+    for t in loads:
+        t.start()
+    start_at = time.time() + 1.0            # 자식 프로세스 기동 시간
+    wake_r = wake_w = None
+    if wakeup == "pipe":
+        wake_r, wake_w = os.pipe()
+        os.set_blocking(wake_w, False)
+    # MarketFeed와 같은 방식으로 기동 (multiprocessing spawn은 파이프 fd를 넘기지 않음)
+    kwargs = json.dumps({"ring_name": ring.name, "rate": rate, "seconds": seconds, "start_at": start_at,
+                         "wake_fd": wake_w})
+    process = subprocess.Popen([sys.executable, "-c", "import bench_feed, json, sys; "
+                                "bench_feed.producer_process(**json.loads(sys.argv[1]))", kwargs],
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               pass_fds=(wake_w,) if wake_w is not None else ())
+
+    def on_record(kind, flags, recv_ts, server_ts, a, b, c, d):
+        latencies.append((time.time() - recv_ts) * 1000)
+
+    cpu_start = time.thread_time()
+    while process.poll() is None or ring.backlog():
+        if ring.read_batch(on_record):
+            continue
+        if wake_r is None:
+            time.sleep(0.0005)
+        elif select.select([wake_r], [], [], 1.0)[0]:
+            os.read(wake_r, 4096)
+    consumer_cpu = time.thread_time() - cpu_start
+    process.wait()
+    stop.set()
+    dropped = ring.stats()["dropped"]
+    ring.close()
+    if wake_r is not None:
+        os.close(wake_r)
+        os.close(wake_w)
+    return summarize(latencies, dropped, seconds, consumer_cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market data path latency: single process vs feed process + shm ring")
+    parser.add_argument("--rate", type=float, default=2000, help="초당 메시지 수")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--load-threads", type=int, default=2, help="실행 측 부하 스레드 수")
+    parser.add_argument("--capacity", type=int, default=4096, help="링 레코드 수")
+    parser.add_argument("--mode", choices=("both", "thread", "process"), default="both")
+    parser.add_argument("--wakeup", choices=("pipe", "poll"), default="pipe", help="process 모드 소비 대기 방식")
+    args = parser.parse_args()
+
+    results = {}
+    if args.mode in ("both", "thread"):
+        results["thread"] = bench_thread(args.rate, args.seconds, args.load_threads)
+    if args.mode in ("both", "process"):
+        results["process"] = bench_process(args.rate, args.seconds, args.load_threads, args.capacity,
+                                           args.wakeup)
+
+    columns = ("delivered", "dropped", "p50_ms", "p99_ms", "max_ms", "msg_per_s", "consumer_cpu_s")
+    print(f"{'mode':<10}" + "".join(f"{c:>15}" for c in columns))
+    for mode, r in results.items():
+        print(f"{mode:<10}" + "".join(f"{r.get(c, '-'):>15}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+REST 주문 핫패스 벤치마크: gate_api SDK vs FastRestClient
+
+로컬 모의 Gate 서버(별도 프로세스, keep-alive)에 같은 요청을 보내
+호출당 지연(wall)과 클라이언트 CPU 시간을 비교합니다. 네트워크 지연은 제외됩니다.
+
+사용법:
+    python bench_rest.py               # 기본 2000회
+    python bench_rest.py --calls 5000
+"""
+import argparse
+import json
+import multiprocessing
+import statistics
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gate_api import ApiClient, Configuration, FuturesApi, FuturesOrder
+
+from fast_rest import FastRestClient
+
+ORDER = {
+    "id": 123456789, "user": 1000, "contract": "BNB_USDT", "create_time": 1700000000.123, "finish_time": None,
+    "finish_as": None, "status": "open", "size": 10, "iceberg": 0, "price": "600.12", "close": False,
+    "is_close": False, "reduce_only": False, "is_reduce_only": False, "is_liq": False, "tif": "gtc", "left": 10,
+    "fill_price": "0", "text": "t-ge1700000000000_1", "tkfr": "0.0005", "mkfr": "0.0002", "refu": 0,
+    "auto_size": None, "stp_act": "-", "stp_id": 0,
+}
+
+
+class MockGateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16                      # 헤더+본문을 한 번에 전송 (Nagle/지연 ACK 40ms 방지)
+    disable_nagle_algorithm = True
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path.endswith("/batch_orders"):
+            self._reply([dict(ORDER, succeeded=True) for _ in body])
+        else:
+            self._reply(ORDER)
+
+    def do_DELETE(self):
+        self._reply(dict(ORDER, status="finished", finish_as="cancelled"))
+
+    def do_GET(self):
+        self._reply([ORDER] * 20)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port):
+    ThreadingHTTPServer(("127.0.0.1", port), MockGateHandler).serve_forever()
+
+
+def measure(fn, calls):
+    latencies = []
+    cpu_started = time.process_time()
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    cpu = (time.process_time() - cpu_started) / calls * 1e6
+    latencies.sort()
+    return {"p50_us": round(statistics.median(latencies), 1),
+            "p99_us": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+            "cpu_us": round(cpu, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SDK vs FastRestClient order path benchmark")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+    time.sleep(0.5)
+    host = f"http://127.0.0.1:{args.port}/api/v4"
+
+    config = Configuration(key="bench", secret="bench-secret", host=host)
+    sdk = FuturesApi(ApiClient(config))
+    fast = FastRestClient("bench", "bench-secret", host=host)
+
+    def order():
+        return FuturesOrder(contract="BNB_USDT", size=10, price="600.12", tif="poc", text="t-ge1700000000000_1")
+
+    cases = {
+        "create": (lambda: sdk.create_futures_order("usdt", order()),
+                   lambda: fast.create_futures_order("usdt", {"contract": "BNB_USDT", "size": 10, "price": "600.12",
+                                                              "tif": "poc", "text": "t-ge1700000000000_1"})),
+        "batch_create_10": (lambda: sdk.create_batch_futures_order("usdt", [order() for _ in range(10)]),
+                            lambda: fast.create_batch_futures_order("usdt", [order() for _ in range(10)])),
+        "cancel": (lambda: sdk.cancel_futures_order("usdt", "123456789"),
+                   lambda: fast.cancel_futures_order("usdt", "123456789")),
+        "list_open_20": (lambda: sdk.list_futures_orders("usdt", contract="BNB_USDT", status="open"),
+                         lambda: fast.list_futures_orders("usdt", contract="BNB_USDT", status="open")),
+    }
+    print(f"{'endpoint':<18}{'client':<8}{'p50_us':>10}{'p99_us':>10}{'cpu_us':>10}")
+    for name, (sdk_call, fast_call) in cases.items():
+        sdk_call(), fast_call()                 # 연결 수립/워밍업
+        for label, fn in (("sdk", sdk_call), ("fast", fast_call)):
+            r = measure(fn, args.calls)
+            print(f"{name:<18}{label:<8}{r['p50_us']:>10}{r['p99_us']:>10}{r['cpu_us']:>10}")
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
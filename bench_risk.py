@@ -0,0 +1,76 @@
+"""
+리스크 게이트 검사 비용 벤치마크
+
+실제 주문 경로와 같은 FuturesOrder 모델 / dict 주문으로 RiskGate.check를 반복 호출하여
+건당 지연(p50/p99)을 측정합니다. 원장은 열린 주문 20건, 양방향 포지션이 있는 상태로 채웁니다.
+
+사용법:
+    python bench_risk.py               # 기본 200000회
+    python bench_risk.py --calls 1000000
+"""
+import argparse
+import statistics
+import time
+
+from gate_api import FuturesOrder
+
+from risk import RiskGate, RiskLedger
+
+
+class Snapshot:
+    long_size = 1.2
+    short_size = 0.8
+    long_locked = False
+    short_locked = False
+    capital = 1000.0
+
+
+def build_gate():
+    ledger = RiskLedger(contract_multiplier=0.001, reservation_ttl=0.0)
+    ledger.on_state(Snapshot())
+    ledger.on_price(600.0)
+    ledger.replace_orders([{"id": i, "status": "open", "left": 5 if i % 2 else -5, "is_reduce_only": False,
+                            "text": f"t-gl{i}"} for i in range(20)])
+    # 속도 한도는 측정 대상이 아니므로 충분히 크게
+    return RiskGate(ledger, side_ratio=3.0, gross_ratio=6.0, rate_limit=10 ** 9, rate_window=1.0)
+
+
+def measure(fn, calls):
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter_ns()
+        fn()
+        latencies.append(time.perf_counter_ns() - started)
+    latencies.sort()
+    return {"p50_us": round(statistics.median(latencies) / 1000, 2),
+            "p99_us": round(latencies[int(len(latencies) * 0.99) - 1] / 1000, 2),
+            "mean_us": round(sum(latencies) / len(latencies) / 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RiskGate.check latency benchmark")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    gate = build_gate()
+    model = FuturesOrder(contract="BNB_USDT", size="3", price="600.12", tif="poc", text="t-ge1700000000000_1")
+    market = FuturesOrder(contract="BNB_USDT", size="-3", price="0", tif="ioc", text="t-ie1700000000000_2")
+    reduce = FuturesOrder(contract="BNB_USDT", size="-3", price="601", tif="gtc", reduce_only=True, text="t-tp1")
+    plain = {"contract": "BNB_USDT", "size": 3, "price": "600.12", "tif": "poc", "text": "t-gl1700000000000_3"}
+    cases = {
+        "model_limit": lambda: gate.check(model),
+        "model_market": lambda: gate.check(market),
+        "reduce_only": lambda: gate.check(reduce),
+        "dict_limit": lambda: gate.check(plain),
+    }
+    print(f"{'case':<16}{'p50_us':>10}{'p99_us':>10}{'mean_us':>10}")
+    for name, fn in cases.items():
+        for _ in range(1000):
+            fn()
+        r = measure(fn, args.calls)
+        print(f"{name:<16}{r['p50_us']:>10}{r['p99_us']:>10}{r['mean_us']:>10}")
+    print(gate.stats()["blocked"] or "no blocks")
+
+
+if __name__ == "__main__":
+    main()
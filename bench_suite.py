@@ -0,0 +1,201 @@
+"""
+핫 함수 마이크로벤치마크 + 회귀 검사
+
+bench_fixtures/의 기록된 응답(캔들/포지션/열린 주문/티커/WS 주문 메시지)을 돌려주는 StubApi로
+main의 함수를 네트워크 없이 단독 실행하여 처리량(ops/s)과 호출당 최대 할당량(tracemalloc peak)을 측정하고,
+bench_baseline.json의 기준값과 비교합니다. 허용 범위를 넘게 느려지거나 할당이 늘면 종료 코드 1.
+
+사용법:
+    python bench_suite.py                   # 측정 후 기준값과 비교
+    python bench_suite.py --update          # 현재 측정값을 기준값으로 저장 (기준값은 머신별)
+    python bench_suite.py --only sync_position --only get_tp_orders_hash
+    python bench_suite.py --tolerance 0.2 --alloc-tolerance 0.1
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+from replay import ReplayRecord
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "bench_fixtures")
+BASELINE_FILE = os.path.join(HERE, "bench_baseline.json")
+ALLOC_SLACK_BYTES = 256                     # 작은 할당량의 측정 흔들림 허용치
+
+
+def load_fixtures(directory=FIXTURE_DIR):
+    fixtures = {}
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                fixtures[name[:-5]] = json.load(f)
+    return fixtures
+
+
+class StubApi:
+    """ FuturesApi 대체: 메서드마다 같은 픽스처 응답을 반환 (네트워크/소비 없음) """
+
+    def __init__(self, fixtures):
+        self._responses = {
+            "list_futures_candlesticks": [ReplayRecord(c) for c in fixtures["candles"]],
+            "list_positions": [ReplayRecord(p) for p in fixtures["positions"]],
+            "list_futures_orders": [ReplayRecord(o) for o in fixtures["open_orders"]],
+            "list_futures_tickers": [ReplayRecord(t) for t in fixtures["tickers"]],
+        }
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        response = self._responses.get(name)
+        return lambda *args, **kwargs: response
+
+
+def import_bot():
+    """ main을 재생 모드(빈 기록)로 import → 초기화 중 REST 호출 없음 """
+    os.environ["REPLAY_DIR"] = tempfile.mkdtemp(prefix="bench-replay-")
+    import main as bot
+    bot.logger.setLevel(logging.WARNING)    # log() 조기 반환 → 출력 비용 제외
+    return bot
+
+
+def build_cases(bot, fixtures):
+    bot.api = StubApi(fixtures)
+    bot.kline_history.clear()
+    bot.fetch_klines()
+    bot.timers.cancel("kline")
+    bot.sync_position()
+    bot.subscribe_ws_channels("bench")
+
+    tp_orders = [o for o in bot.api.list_futures_orders() if o.is_reduce_only]
+    order_message = fixtures["ws_messages"]["futures.orders"]
+    price = Decimal(fixtures["tickers"][0]["last"])
+    snap = bot.state.snapshot
+
+    def order_event_json():
+        bot.ws_manager.replay(json.loads(order_message))
+
+    return {
+        "calculate_obv_macd": bot.calculate_obv_macd,
+        "calculate_dynamic_tp_gap": bot.calculate_dynamic_tp_gap,
+        "adjust_quantity_step": lambda: bot.adjust_quantity_step(Decimal("1.2345678")),
+        "safe_order_qty": lambda: bot.safe_order_qty("0.0123456"),
+        "sync_position": bot.sync_position,
+        "get_tp_orders_hash": lambda: bot.get_tp_orders_hash(tp_orders),
+        "compute_entry_sizing": lambda: bot.compute_entry_sizing(snap, price, Decimal("1000")),
+        "grid_ladder_plan": lambda: bot.grid_ladder.plan(price, 12, 9, bot.GRID_LEVELS, bot.GRID_SPACING,
+                                                         bot.GRID_SIZE_GROWTH),
+        "order_event_json": order_event_json,
+    }
+
+
+def measure_throughput(fn, repeats=15, target_seconds=0.05):
+    """ 한 번에 target_seconds 정도 걸리는 횟수로 repeats번 반복 → 가장 빠른 회차의 ops/s """
+    for _ in range(100):
+        fn()
+    n = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_seconds / 4 or n >= 1 << 24:
+            break
+        n *= 2
+    n = max(1, int(n * target_seconds / max(elapsed, 1e-9)))
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return n / best
+
+
+def measure_alloc(fn, samples=50):
+    """ 호출당 최대 추가 할당량 (바이트, 중앙값) """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return int(statistics.median(peaks))
+
+
+def compare(name, result, baseline, tolerance, alloc_tolerance):
+    """ 기준값 대비 회귀 사유 리스트 """
+    if not baseline:
+        return []
+    problems = []
+    floor = baseline["ops_per_sec"] * (1 - tolerance)
+    if result["ops_per_sec"] < floor:
+        problems.append(f"throughput {result['ops_per_sec']:.0f} < {floor:.0f} ops/s "
+                        f"(baseline {baseline['ops_per_sec']:.0f})")
+    ceiling = baseline["peak_alloc_bytes"] * (1 + alloc_tolerance) + ALLOC_SLACK_BYTES
+    if result["peak_alloc_bytes"] > ceiling:
+        problems.append(f"alloc {result['peak_alloc_bytes']} > {ceiling:.0f} B "
+                        f"(baseline {baseline['peak_alloc_bytes']})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path microbenchmarks with baseline regression check")
+    parser.add_argument("--update", action="store_true", help="현재 측정값을 기준값으로 저장")
+    parser.add_argument("--only", action="append", help="지정한 케이스만 실행 (여러 번 지정 가능)")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="허용 처리량 감소 비율")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.25, help="허용 할당량 증가 비율")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    bot = import_bot()
+    cases = build_cases(bot, load_fixtures())
+    if args.only:
+        unknown = set(args.only) - set(cases)
+        if unknown:
+            parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+        cases = {name: fn for name, fn in cases.items() if name in args.only}
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    results, failures = {}, {}
+    print(f"{'case':<26}{'ops/s':>14}{'us/op':>10}{'peak_B':>10}{'vs base':>10}")
+    for name, fn in cases.items():
+        result = {"ops_per_sec": round(measure_throughput(fn), 1), "peak_alloc_bytes": measure_alloc(fn)}
+        results[name] = result
+        base = baselines.get(name)
+        ratio = f"{result['ops_per_sec'] / base['ops_per_sec']:.2f}x" if base else "-"
+        print(f"{name:<26}{result['ops_per_sec']:>14.0f}{1e6 / result['ops_per_sec']:>10.2f}"
+              f"{result['peak_alloc_bytes']:>10}{ratio:>10}")
+        problems = compare(name, result, base, args.tolerance, args.alloc_tolerance)
+        if problems:
+            failures[name] = problems
+
+    if args.update:
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline updated: {args.baseline}")
+        return 0
+    for name, problems in failures.items():
+        for problem in problems:
+            print(f"REGRESSION {name}: {problem}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
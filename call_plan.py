@@ -0,0 +1,170 @@
+"""
+REST 호출 계획 (독립 조회 병렬 팬아웃 + 새로고침 안 결과 재사용 + 호출별 시간 측정)
+
+- CallPlanApi: FuturesApi 프록시 (RecordingApi/RiskGatedApi처럼 api 체인 가장 바깥에 끼움)
+  · 현재 스레드에 계획이 열려 있으면 조회(READ_METHODS)는 (메서드, 인자) 기준으로 결과를 재사용
+  · 그 밖의 호출(생성/취소/amend 등 쓰기)은 실행 뒤 계좌 조회(포지션/주문/잔고) 결과를 버림 → 쓰기 이후 조회는 항상 새로
+    시세 조회(MARKET_METHODS)는 우리 쓰기로 바뀌지 않으므로 계획 끝까지 유지
+  · 실패한 조회는 재사용하지 않음 (재시도 시 다시 호출)
+  · 계획이 없는 스레드(WS 핸들러/타이머 등)는 그대로 위임
+- plan(name, prefetch): with 블록. prefetch 조회를 공용 스레드 풀에서 동시에 시작하고
+  블록 안 코드가 같은 조회를 하면 진행 중인 결과를 기다림 → 새로고침 비용 ≈ 가장 긴 경로 (조회 합계가 아님)
+  이미 계획이 열린 스레드에서 다시 열면 바깥 계획을 그대로 사용 (prefetch만 추가)
+- 계획이 끝나면 경과 시간 / 호출별 ms 합계(직렬로 했다면) / 재사용 수를 기록 → stats()
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+MARKET_METHODS = frozenset({"list_futures_tickers", "get_futures_contract", "list_futures_order_book",
+                            "list_futures_candlesticks"})
+READ_METHODS = MARKET_METHODS | {"list_positions", "list_futures_orders", "list_futures_accounts"}
+
+
+def read_key(method, args, kwargs):
+    return (method, args, tuple(sorted(kwargs.items())))
+
+
+class CallPlan:
+    def __init__(self, name, executor):
+        self.name = name
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._results = {}                  # read_key → Future
+        self._unclaimed = set()             # 아직 아무도 읽지 않은 prefetch 결과
+        self.calls = []                     # (method, ms, prefetched)
+        self.hits = 0                       # 이미 읽은 결과를 다시 쓴 횟수 (= 절약한 호출 수)
+        self.invalidations = 0
+        self.started = time.perf_counter()
+
+    def _run(self, key, fn, future, prefetched):
+        started = time.perf_counter()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            with self._lock:
+                if self._results.get(key) is future:
+                    del self._results[key]
+            future.set_exception(e)
+        finally:
+            self.calls.append((key[0], (time.perf_counter() - started) * 1000, prefetched))
+
+    def prefetch(self, key, fn):
+        with self._lock:
+            if key in self._results:
+                return
+            future = self._results[key] = Future()
+            self._unclaimed.add(key)
+        self._executor.submit(self._run, key, fn, future, True)
+
+    def read(self, key, fn):
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+            elif key in self._unclaimed:
+                self._unclaimed.discard(key)
+            else:
+                self.hits += 1
+        if owner:
+            self._run(key, fn, future, False)
+        return future.result()
+
+    def wrote(self, method, ms):
+        self.calls.append((method, ms, False))
+        with self._lock:
+            for key in [k for k in self._results if k[0] not in MARKET_METHODS]:
+                del self._results[key]
+                self._unclaimed.discard(key)
+            self.invalidations += 1
+
+    def summary(self):
+        wall_ms = (time.perf_counter() - self.started) * 1000
+        calls = list(self.calls)
+        return {"name": self.name, "wall_ms": round(wall_ms, 2),
+                "serial_ms": round(sum(ms for _, ms, _ in calls), 2), "calls": len(calls),
+                "prefetched": sum(1 for _, _, p in calls if p), "reused": self.hits,
+                "invalidations": self.invalidations,
+                "detail": [(method, round(ms, 2)) for method, ms, _ in calls[:20]]}
+
+
+class CallPlanApi:
+    def __init__(self, api, workers=4, history=50, logger=None):
+        self._api = api
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="call-plan")
+        self._local = threading.local()
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.recent = deque(maxlen=history)
+        self.by_name = {}                   # 계획 이름 → 누적 {count, wall_ms, serial_ms, calls, reused}
+
+    def __getattr__(self, name):
+        target = getattr(self._api, name)
+        if not callable(target) or name.startswith("_"):
+            return target
+
+        if name in READ_METHODS:
+            def call(*args, **kwargs):
+                plan = getattr(self._local, "plan", None)
+                if plan is None:
+                    return target(*args, **kwargs)
+                return plan.read(read_key(name, args, kwargs), lambda: target(*args, **kwargs))
+            return call
+
+        def call(*args, **kwargs):
+            plan = getattr(self._local, "plan", None)
+            if plan is None:
+                return target(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                plan.wrote(name, (time.perf_counter() - started) * 1000)
+        return call
+
+    @property
+    def current(self):
+        return getattr(self._local, "plan", None)
+
+    @contextmanager
+    def plan(self, name, prefetch=()):
+        """ prefetch: [(메서드 이름, args 튜플, kwargs dict), ...] - 블록 진입과 동시에 병렬 조회 시작 """
+        outer = self.current
+        plan = outer or CallPlan(name, self._executor)
+        for method, args, kwargs in prefetch:
+            target = getattr(self._api, method)
+            plan.prefetch(read_key(method, args, kwargs),
+                          lambda target=target, args=args, kwargs=kwargs: target(*args, **kwargs))
+        if outer is not None:
+            yield plan
+            return
+        self._local.plan = plan
+        try:
+            yield plan
+        finally:
+            self._local.plan = None
+            self._finish(plan)
+
+    def _finish(self, plan):
+        summary = plan.summary()
+        self.recent.append(summary)
+        agg = self.by_name.setdefault(plan.name, {"count": 0, "wall_ms": 0.0, "serial_ms": 0.0, "calls": 0,
+                                                  "reused": 0})
+        agg["count"] += 1
+        agg["wall_ms"] += summary["wall_ms"]
+        agg["serial_ms"] += summary["serial_ms"]
+        agg["calls"] += summary["calls"]
+        agg["reused"] += summary["reused"]
+        self.log("⏱️ PLAN", "%s: %.0fms wall, %d calls (%.0fms if serial), %d reused", plan.name,
+                 summary["wall_ms"], summary["calls"], summary["serial_ms"], summary["reused"],
+                 event="call_plan", plan=plan.name, latency_ms=summary["wall_ms"], serial_ms=summary["serial_ms"],
+                 calls=summary["calls"], reused=summary["reused"])
+
+    def stats(self):
+        by_name = {name: {"count": a["count"], "avg_wall_ms": round(a["wall_ms"] / a["count"], 2),
+                          "avg_serial_ms": round(a["serial_ms"] / a["count"], 2),
+                          "avg_calls": round(a["calls"] / a["count"], 2), "reused": a["reused"]}
+                   for name, a in self.by_name.items()}
+        return {"by_name": by_name, "last": self.recent[-1] if self.recent else None}
@@ -0,0 +1,130 @@
+"""
+주문 핫패스용 경량 REST 클라이언트 (Gate.io APIv4 서명)
+
+- 대상: 주문 생성 / 배치 생성 / 취소 / 배치 취소 / amend / 열린 주문 목록
+- urllib3 커넥션 풀 재사용 (keep-alive), SDK 모델 생성/검증/역직렬화 없음
+- 서명: HMAC-SHA512(secret, "METHOD\\npath\\nquery\\nSHA512(body)\\ntimestamp")
+  키가 들어간 HMAC 객체와 빈 body 해시, 경로 접두어를 미리 계산해 두고 요청마다 copy()
+- 응답은 OrderRecord(__slots__, 속성 접근 + to_dict)로 반환 → 기존 SDK 응답과 같은 방식으로 사용
+- 나머지 메서드는 fallback(SDK FuturesApi)으로 위임
+"""
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode, urlsplit
+
+import urllib3
+
+EMPTY_BODY_HASH = hashlib.sha512(b"").hexdigest()
+
+
+class FastRestError(Exception):
+    def __init__(self, status, label=None, message=None):
+        super().__init__(f"{status} {label}: {message}")
+        self.status = status
+        self.label = label
+        self.message = message
+
+
+class OrderRecord:
+    """ 주문 응답에서 봇이 읽는 필드만 보관 (나머지 필드는 버림) """
+    __slots__ = ("id", "text", "contract", "size", "left", "price", "fill_price", "status", "finish_as",
+                 "tif", "is_reduce_only", "is_close", "create_time", "finish_time", "user", "auto_size",
+                 "succeeded", "label", "detail")
+
+    def __init__(self, data):
+        for name in self.__slots__:
+            setattr(self, name, data.get(name))
+        if self.succeeded is None:
+            self.succeeded = True
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _order_body(order):
+    """ FuturesOrder 모델 또는 dict → 요청 dict (None 필드 제외) """
+    if isinstance(order, dict):
+        data = order
+    else:
+        data = {attr: getattr(order, attr) for attr in ("contract", "size", "iceberg", "price", "close",
+                                                        "reduce_only", "tif", "text", "auto_size")}
+    return {k: v for k, v in data.items() if v is not None}
+
+
+class FastRestClient:
+    def __init__(self, api_key, api_secret, host="https://api.gateio.ws/api/v4", fallback=None,
+                 pool_size=4, timeout=10.0):
+        parts = urlsplit(host)
+        self.api_key = api_key
+        self.fallback = fallback
+        self._base = f"{parts.scheme}://{parts.netloc}"
+        self._prefix = parts.path.rstrip("/")          # 서명 경로에 포함되는 접두어 (/api/v4)
+        self._mac = hmac.new(api_secret.encode(), digestmod=hashlib.sha512)
+        self._pool = urllib3.PoolManager(num_pools=1, maxsize=pool_size, block=False,
+                                         timeout=urllib3.Timeout(total=timeout), retries=False)
+        self._headers = {"Accept": "application/json", "Content-Type": "application/json", "KEY": api_key}
+        self.calls = 0
+        self.total_ms = 0.0
+
+    def __getattr__(self, name):
+        # 핫패스가 아닌 메서드는 SDK로 위임
+        fallback = self.__dict__.get("fallback")
+        if fallback is None:
+            raise AttributeError(name)
+        return getattr(fallback, name)
+
+    # -------------------------------------------------------------------------
+    # 요청
+    # -------------------------------------------------------------------------
+    def _request(self, method, path, query=None, body=None):
+        started = time.perf_counter()
+        url_path = self._prefix + path
+        query_string = urlencode(query) if query else ""
+        payload = json.dumps(body, separators=(",", ":")).encode() if body is not None else b""
+        body_hash = hashlib.sha512(payload).hexdigest() if payload else EMPTY_BODY_HASH
+        ts = str(int(time.time()))
+        mac = self._mac.copy()
+        mac.update(f"{method}\n{url_path}\n{query_string}\n{body_hash}\n{ts}".encode())
+        headers = dict(self._headers, Timestamp=ts, SIGN=mac.hexdigest())
+        url = self._base + url_path + ("?" + query_string if query_string else "")
+        resp = self._pool.request(method, url, body=payload or None, headers=headers)
+        data = json.loads(resp.data) if resp.data else None
+        self.calls += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        if resp.status >= 400:
+            data = data if isinstance(data, dict) else {}
+            raise FastRestError(resp.status, data.get("label"), data.get("message") or data.get("detail"))
+        return data
+
+    # -------------------------------------------------------------------------
+    # 핫패스 엔드포인트 (SDK FuturesApi와 같은 이름/인자)
+    # -------------------------------------------------------------------------
+    def create_futures_order(self, settle, order):
+        return OrderRecord(self._request("POST", f"/futures/{settle}/orders", body=_order_body(order)))
+
+    def create_batch_futures_order(self, settle, orders):
+        data = self._request("POST", f"/futures/{settle}/batch_orders", body=[_order_body(o) for o in orders])
+        return [OrderRecord(d) for d in data or []]
+
+    def cancel_futures_order(self, settle, order_id):
+        return OrderRecord(self._request("DELETE", f"/futures/{settle}/orders/{order_id}"))
+
+    def cancel_batch_future_orders(self, settle, order_ids):
+        return self._request("POST", f"/futures/{settle}/batch_cancel_orders", body=[str(i) for i in order_ids]) or []
+
+    def amend_futures_order(self, settle, order_id, amendment):
+        body = amendment if isinstance(amendment, dict) else {
+            k: getattr(amendment, k) for k in ("size", "price", "amend_text") if getattr(amendment, k) is not None}
+        return OrderRecord(self._request("PUT", f"/futures/{settle}/orders/{order_id}", body=body))
+
+    def list_futures_orders(self, settle, contract, status, limit=None, **kwargs):
+        query = {"contract": contract, "status": status}
+        if limit is not None:
+            query["limit"] = limit
+        query.update({k.lstrip("_"): v for k, v in kwargs.items() if v is not None})
+        return [OrderRecord(d) for d in self._request("GET", f"/futures/{settle}/orders", query=query) or []]
+
+    def stats(self):
+        return {"calls": self.calls, "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else None}
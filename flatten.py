@@ -0,0 +1,117 @@
+"""
+포지션 청산/감축 (양방향 동시 배치 주문 + 주문 이벤트 확인)
+
+- 여러 다리(long/short)를 create_batch_futures_order 한 번으로 동시에 전송
+- 전량 청산은 size=0 + auto_size(close_long/close_short)로 서버가 수량을 결정
+- 완료 확인은 sleep 대신 주문 이벤트(OrderRegistry.wait_finished), 시간 초과 시 REST 조회
+- 요청 시작부터 모든 다리가 종료될 때까지의 시간(ms)을 보고
+"""
+import time
+
+from gate_api import FuturesOrder
+
+
+class FlattenResult:
+    __slots__ = ("intent", "legs", "started_at", "finished_at", "confirmed", "errors")
+
+    def __init__(self, intent, started_at):
+        self.intent = intent
+        self.legs = []                      # [{side, size, text, id, status, finish_as, left}]
+        self.started_at = started_at
+        self.finished_at = 0.0
+        self.confirmed = False
+        self.errors = []
+
+    @property
+    def elapsed_ms(self):
+        end = self.finished_at or time.perf_counter()
+        return round((end - self.started_at) * 1000, 2)
+
+    def to_dict(self):
+        return {"intent": self.intent, "legs": self.legs, "confirmed": self.confirmed,
+                "elapsed_ms": self.elapsed_ms, "errors": self.errors}
+
+
+class Flattener:
+    def __init__(self, api, settle, contract, registry, make_text, logger=None):
+        self.api = api
+        self.settle = settle
+        self.contract = contract
+        self.registry = registry
+        self.make_text = make_text          # make_text(intent, side, expected_size) → text
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+
+    def _build(self, side, size, intent):
+        """ size=None → 해당 방향 전량 청산 (auto_size), 아니면 지정 계약 수만큼 감축 """
+        if size is None:
+            text = self.make_text(intent, side, 0)
+            order = FuturesOrder(contract=self.contract, size=0, price="0", tif="ioc", reduce_only=True,
+                                 auto_size="close_long" if side == "long" else "close_short", text=text)
+        else:
+            signed = -abs(int(size)) if side == "long" else abs(int(size))
+            text = self.make_text(intent, side, signed)
+            order = FuturesOrder(contract=self.contract, size=signed, price="0", tif="ioc",
+                                 reduce_only=True, text=text)
+        return order, text
+
+    def execute(self, legs, intent, timeout=3.0):
+        """
+        legs: [(side, 계약 수 또는 None), ...]
+        모든 다리를 한 번의 배치 요청으로 보내고 종료 이벤트를 기다림
+        """
+        result = FlattenResult(intent, time.perf_counter())
+        if not legs:
+            result.confirmed = True
+            result.finished_at = result.started_at
+            return result
+
+        built = [self._build(side, size, intent) + (side, size) for side, size in legs]
+        try:
+            responses = self.api.create_batch_futures_order(self.settle, [order for order, _, _, _ in built])
+        except Exception as e:
+            result.errors.append(str(e))
+            self.log("❌ FLATTEN", "Batch request failed: %s", e, event="flatten_error", intent=intent)
+            return result
+
+        waiting = []
+        for (order, text, side, size), resp in zip(built, responses or []):
+            leg = {"side": side, "size": size, "text": text, "id": getattr(resp, "id", None),
+                   "status": getattr(resp, "status", None), "finish_as": getattr(resp, "finish_as", None),
+                   "left": getattr(resp, "left", None)}
+            result.legs.append(leg)
+            if not getattr(resp, "succeeded", False):
+                result.errors.append(f"{side}: {getattr(resp, 'label', '')} {getattr(resp, 'detail', '')}".strip())
+            elif leg["status"] != "finished":
+                waiting.append(text)
+
+        if waiting:
+            pending = self.registry.wait_finished(waiting, timeout)
+            for text in pending:
+                leg = next(l for l in result.legs if l["text"] == text)
+                try:
+                    order = self.api.get_futures_order(self.settle, str(leg["id"]))
+                    leg.update(status=order.status, finish_as=order.finish_as, left=order.left)
+                    if order.status != "finished":
+                        result.errors.append(f"{leg['side']}: not finished ({order.status})")
+                except Exception as e:
+                    result.errors.append(f"{leg['side']}: status query failed ({e})")
+        for leg in result.legs:
+            entry = self.registry.resolve(leg["text"])
+            if entry is not None and entry.is_finished:
+                leg.update(status=entry.status, finish_as=entry.finish_as, filled=entry.filled_size)
+
+        result.finished_at = time.perf_counter()
+        result.confirmed = not result.errors
+        self.log("✅ FLATTEN" if result.confirmed else "⚠️ FLATTEN", "%s %s in %.1fms",
+                 intent, "+".join(f"{l['side']}:{l['size'] or 'all'}" for l in result.legs), result.elapsed_ms,
+                 event="flatten", intent=intent, confirmed=result.confirmed, latency_ms=result.elapsed_ms,
+                 errors="; ".join(result.errors) or None)
+        return result
+
+    def flatten(self, sides, intent, timeout=3.0):
+        """ 지정 방향 전량 청산 """
+        return self.execute([(side, None) for side in sides], intent, timeout)
+
+    def reduce(self, side, contracts, intent, timeout=3.0):
+        """ 지정 방향을 contracts 계약만큼 감축 """
+        return self.execute([(side, contracts)], intent, timeout)
@@ -0,0 +1,237 @@
+"""
+다단계 지정가 그리드 래더 (LONG 매수 / SHORT 매도 지정가 N단계)
+
+- 레벨 가격은 틱 단위 정수 격자: 한 번 정한 간격(step)을 유지하여 가격이 움직여도
+  기존 레벨 가격이 그대로 남음 → 재정렬 시 양 끝의 레벨만 취소/생성
+- 양방향 레벨 가격/수량을 NumPy로 한 번에 계산
+- 목표 래더와 현재 래더를 가격 기준으로 비교: 동일 → 유지, 수량만 다름 → amend,
+  없음 → 배치 생성(최대 10건/요청), 남음 → 배치 취소(최대 20건/요청)
+- 상태는 grid_orders[SYMBOL][side] 리스트에 레벨 dict로 보관
+  {"level", "price_ticks", "price", "size", "text", "id"}
+"""
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+from gate_api import FuturesOrder, FuturesOrderAmendment
+
+from risk import RiskRejected
+
+BATCH_CREATE_MAX = 10
+BATCH_CANCEL_MAX = 20
+
+
+def compute_ladder(price_ticks, step_ticks, long_base, short_base, levels, growth=1.0):
+    """
+    현재가(틱) 기준 양방향 래더 → {"long": [(level, price_ticks, size)], "short": [...]}
+    LONG은 현재가 아래 격자부터 매수(+), SHORT는 현재가 위 격자부터 매도(-).
+    level k(1부터) 수량 = base × growth^(k-1), 최소 1계약.
+    """
+    if levels <= 0:
+        return {"long": [], "short": []}
+    k = np.arange(levels, dtype=np.int64)
+    top = (price_ticks - 1) // step_ticks * step_ticks          # 현재가 미만 첫 격자
+    bottom = -(-(price_ticks + 1) // step_ticks) * step_ticks   # 현재가 초과 첫 격자
+    prices = np.stack((top - k * step_ticks, bottom + k * step_ticks))
+    bases = np.array([[long_base], [-short_base]], dtype=np.float64)
+    sizes = bases * np.power(float(growth), k)
+    sizes = np.where(sizes >= 0, np.maximum(np.floor(sizes), 1), np.minimum(np.ceil(sizes), -1)).astype(np.int64)
+    valid = prices > 0
+    return {
+        side: [(int(lv) + 1, int(p), int(s)) for lv, p, s, ok in zip(k, prices[i], sizes[i], valid[i])
+               if ok and (long_base if side == "long" else short_base) > 0]
+        for i, side in enumerate(("long", "short"))
+    }
+
+
+class GridLadder:
+    def __init__(self, api, settle, contract, store, make_text, intent, tick, logger=None):
+        self.api = api
+        self.settle = settle
+        self.contract = contract
+        self.store = store                  # grid_orders[SYMBOL] → {"long": [...], "short": [...]}
+        self.make_text = make_text          # make_text(intent, side, expected_size) → text
+        self.intent = intent
+        self.tick = Decimal(str(tick))
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.step_ticks = 0
+        self.spacing = None                 # step_ticks를 정한 간격 (바뀌면 격자를 새로 정함)
+        self._lock = threading.RLock()
+        self.created = 0
+        self.amended = 0
+        self.cancelled = 0
+        self.filled = 0
+
+    # -------------------------------------------------------------------------
+    # 변환
+    # -------------------------------------------------------------------------
+    def to_ticks(self, price):
+        return int(Decimal(str(price)) / self.tick)
+
+    def to_price(self, ticks):
+        return str(Decimal(ticks) * self.tick)
+
+    def levels(self, side):
+        return self.store[side]
+
+    def find(self, text):
+        with self._lock:
+            for side in ("long", "short"):
+                for level in self.store[side]:
+                    if level["text"] == text:
+                        return side, level
+        return None, None
+
+    # -------------------------------------------------------------------------
+    # 목표 래더 반영
+    # -------------------------------------------------------------------------
+    def plan(self, price, long_base, short_base, levels, spacing, growth=1.0):
+        """ 현재가/기준 수량으로 목표 래더 계산. 격자 간격은 비어 있거나 spacing이 바뀐 경우에만 새로 정함 """
+        price_ticks = self.to_ticks(price)
+        with self._lock:
+            if not self.step_ticks or not (self.store["long"] or self.store["short"]) or spacing != self.spacing:
+                self.step_ticks = max(1, int(price_ticks * float(spacing)))
+                self.spacing = spacing
+            step = self.step_ticks
+        return compute_ladder(price_ticks, step, long_base, short_base, levels, growth)
+
+    def sync(self, targets):
+        """ targets: compute_ladder 결과 (side 생략 시 해당 방향은 그대로 둠) → 작업 건수 dict """
+        started = time.perf_counter()
+        creates, amends, cancels = [], [], []
+        with self._lock:
+            for side, target in targets.items():
+                current = {lv["price_ticks"]: lv for lv in self.store[side]}
+                wanted = {p: (level, size) for level, p, size in target}
+                for p, lv in current.items():
+                    if p not in wanted:
+                        cancels.append((side, lv))
+                    elif lv["size"] != wanted[p][1]:
+                        amends.append((side, lv, wanted[p]))
+                    else:
+                        lv["level"] = wanted[p][0]
+                for p, (level, size) in wanted.items():
+                    if p not in current:
+                        creates.append((side, level, p, size))
+
+            self._cancel(cancels)
+            for side, lv, (level, size) in amends:
+                self._amend(side, lv, level, size)
+            self._create(creates)
+            for side in targets:
+                self.store[side].sort(key=lambda lv: lv["level"])
+
+        result = {"created": len(creates), "amended": len(amends), "cancelled": len(cancels),
+                  "kept": sum(len(t) for t in targets.values()) - len(creates) - len(amends)}
+        if creates or amends or cancels:
+            self.log("🪜 LADDER", "Sync: +%d ~%d -%d (kept %d)", result["created"], result["amended"],
+                     result["cancelled"], result["kept"], event="ladder_sync",
+                     latency_ms=round((time.perf_counter() - started) * 1000, 2), **result)
+        return result
+
+    def _create(self, creates):
+        for i in range(0, len(creates), BATCH_CREATE_MAX):
+            chunk = creates[i:i + BATCH_CREATE_MAX]
+            orders, levels = [], []
+            for side, level, p, size in chunk:
+                text = self.make_text(self.intent, side, size)
+                orders.append(FuturesOrder(contract=self.contract, size=size, price=self.to_price(p),
+                                           tif="poc", reduce_only=False, text=text))
+                levels.append({"level": level, "price_ticks": p, "price": self.to_price(p),
+                               "size": size, "text": text, "id": None, "side": side})
+            try:
+                responses = self.api.create_batch_futures_order(self.settle, orders)
+            except Exception as e:
+                self.log("❌ LADDER", "Batch create failed (%d): %s", len(orders), e, event="ladder_error")
+                continue
+            for lv, resp in zip(levels, responses or []):
+                if getattr(resp, "succeeded", False) and getattr(resp, "status", "open") == "open":
+                    lv["id"] = resp.id
+                    self.store[lv.pop("side")].append(lv)
+                    self.created += 1
+                else:
+                    self.log("⚠️ LADDER", "%s L%d @ %s rejected: %s", lv["side"], lv["level"], lv["price"],
+                             getattr(resp, "label", None) or getattr(resp, "finish_as", None), event="ladder_reject")
+
+    def _amend(self, side, lv, level, size):
+        try:
+            self.api.amend_futures_order(self.settle, str(lv["id"]), FuturesOrderAmendment(size=size))
+            lv.update(level=level, size=size)
+            self.amended += 1
+        except RiskRejected as e:
+            # 리스크 게이트 차단 → 거래소 주문은 그대로 살아 있으므로 레벨 유지 (수량 변경 없음)
+            self.log("🛑 LADDER", "%s L%d amend blocked: %s", side, lv["level"], e.reason, event="ladder_blocked")
+        except Exception as e:
+            # amend 실패(이미 체결/취소) → 레벨 제거, 다음 sync에서 재생성
+            self.log("⚠️ LADDER", "%s L%d amend failed: %s", side, lv["level"], e, event="ladder_error")
+            self._remove(side, lv)
+
+    def _cancel(self, cancels):
+        for i in range(0, len(cancels), BATCH_CANCEL_MAX):
+            chunk = cancels[i:i + BATCH_CANCEL_MAX]
+            ids = [str(lv["id"]) for _, lv in chunk if lv["id"] is not None]
+            try:
+                if ids:
+                    self.api.cancel_batch_future_orders(self.settle, ids)
+                self.cancelled += len(ids)
+            except Exception as e:
+                self.log("❌ LADDER", "Batch cancel failed (%d): %s", len(ids), e, event="ladder_error")
+            for side, lv in chunk:
+                self._remove(side, lv)
+
+    def _remove(self, side, lv):
+        try:
+            self.store[side].remove(lv)
+        except ValueError:
+            pass
+
+    # -------------------------------------------------------------------------
+    # 체결/정리
+    # -------------------------------------------------------------------------
+    def on_finished(self, text, filled):
+        """ 래더 주문 종료 이벤트 → (side, level) (래더 주문이 아니면 (None, None)) """
+        with self._lock:
+            side, lv = self.find(text)
+            if lv is None:
+                return None, None
+            self._remove(side, lv)
+            if filled:
+                self.filled += 1
+        return side, lv
+
+    def extend(self, side):
+        """ 체결된 레벨을 대신해 해당 방향 가장 먼 레벨 바깥에 한 단계 추가 """
+        with self._lock:
+            levels = self.store[side]
+            if not levels or not self.step_ticks:
+                return None
+            far = levels[-1]
+            p = far["price_ticks"] - self.step_ticks if side == "long" else far["price_ticks"] + self.step_ticks
+            if p <= 0:
+                return None
+            self._create([(side, far["level"] + 1, p, far["size"])])
+            return self.store[side][-1] if self.store[side][-1]["price_ticks"] == p else None
+
+    def clear(self):
+        """ 로컬 상태만 비움 (주문은 호출 측에서 이미 취소한 경우) """
+        with self._lock:
+            for side in ("long", "short"):
+                self.store[side].clear()
+            self.step_ticks = 0
+
+    def cancel_all(self, sides=("long", "short")):
+        with self._lock:
+            self._cancel([(side, lv) for side in sides for lv in list(self.store[side])])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "step_ticks": self.step_ticks,
+                "long": [(lv["level"], lv["price"], lv["size"]) for lv in self.store["long"]],
+                "short": [(lv["level"], lv["price"], lv["size"]) for lv in self.store["short"]],
+                "created": self.created,
+                "amended": self.amended,
+                "cancelled": self.cancelled,
+                "filled": self.filled,
+            }
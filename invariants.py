@@ -0,0 +1,193 @@
+"""
+증분 불변식(invariant) 검사 엔진
+
+- 규칙마다 의존하는 상태 키(position, orders, balance ...)를 선언
+- mark_changed(키)가 호출되면 그 키에 의존하는 규칙만 즉시 재평가
+- 위반 시 grace 시간 동안 유지되면 조치(action) 실행 (조치는 별도 스레드, 규칙당 1개씩)
+- REST 정합성 보정(reconcile)은 적응형 주기: 안정적이면 간격을 늘리고 위반/변경 시 최소로 복귀
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Rule:
+    __slots__ = ("name", "deps", "check", "action", "grace", "cooldown",
+                 "first_seen", "last_action_at", "in_flight", "violations", "actions", "last_detail")
+
+    def __init__(self, name, deps, check, action, grace=0.0, cooldown=5.0):
+        self.name = name
+        self.deps = frozenset(deps)
+        self.check = check                  # check() → None(정상) 또는 위반 상세(dict/str)
+        self.action = action                # action(detail)
+        self.grace = grace
+        self.cooldown = cooldown
+        self.first_seen = 0.0
+        self.last_action_at = 0.0
+        self.in_flight = False
+        self.violations = 0
+        self.actions = 0
+        self.last_detail = None
+
+
+class AdaptiveSchedule:
+    """ 안정 상태면 간격 × factor (최대 max_interval), 변화 감지 시 min_interval로 복귀 """
+
+    def __init__(self, min_interval=15.0, max_interval=300.0, factor=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.interval = min_interval
+        self.next_at = time.time() + min_interval
+
+    def stable(self):
+        self.interval = min(self.max_interval, self.interval * self.factor)
+        self.next_at = time.time() + self.interval
+
+    def unstable(self):
+        self.interval = self.min_interval
+        self.next_at = min(self.next_at, time.time() + self.interval)
+
+
+class InvariantEngine:
+    def __init__(self, reconcile=None, logger=None, min_interval=15.0, max_interval=300.0):
+        self.reconcile = reconcile          # reconcile() → 상태가 바뀌었으면 True
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.schedule = AdaptiveSchedule(min_interval, max_interval)
+        self.rules = {}
+        self._by_dep = {}
+        self._dirty = set()
+        self._cond = threading.Condition()
+        self._actions = ThreadPoolExecutor(max_workers=2, thread_name_prefix="invariant-action")
+        self._thread = None
+        self.evaluations = 0
+        self.last_eval_us = 0.0
+        self.reconciles = 0
+        self.last_reconcile_ms = 0.0
+
+    def add_rule(self, name, deps, check, action, grace=0.0, cooldown=5.0):
+        rule = Rule(name, deps, check, action, grace, cooldown)
+        self.rules[name] = rule
+        for dep in rule.deps:
+            self._by_dep.setdefault(dep, []).append(rule)
+        return rule
+
+    def mark_changed(self, *keys):
+        """ 상태 변경 알림 (어느 스레드에서든 호출 가능, 즉시 반환) """
+        with self._cond:
+            self._dirty.update(keys)
+            self._cond.notify()
+
+    # -------------------------------------------------------------------------
+    # 평가
+    # -------------------------------------------------------------------------
+    def _evaluate(self, rules, now):
+        started = time.perf_counter()
+        for rule in rules:
+            try:
+                detail = rule.check()
+            except Exception as e:
+                self.log("❌ INVARIANT", "%s check error: %s", rule.name, e, event="invariant_error", rule=rule.name)
+                continue
+            if detail is None:
+                rule.first_seen = 0.0
+                continue
+            if not rule.first_seen:
+                rule.first_seen = now
+                rule.violations += 1
+                rule.last_detail = detail
+                self.schedule.unstable()
+            if now < rule.first_seen + rule.grace:
+                continue
+            if rule.in_flight or now - rule.last_action_at < rule.cooldown:
+                continue
+            self._fire(rule, detail, now)
+        self.evaluations += 1
+        self.last_eval_us = (time.perf_counter() - started) * 1e6
+
+    def _next_wake(self):
+        """ grace/cooldown이 끝나는 가장 이른 시각 (대기 중인 위반이 없으면 None) """
+        times = [max(r.first_seen + r.grace, r.last_action_at + r.cooldown)
+                 for r in self.rules.values() if r.first_seen and not r.in_flight]
+        return min(times) if times else None
+
+    def _fire(self, rule, detail, now):
+        rule.in_flight = True
+        rule.last_action_at = now
+        rule.actions += 1
+        self.log("🚨 INVARIANT", "%s violated: %s", rule.name, detail, event="invariant_violation",
+                 rule=rule.name, detail=detail)
+
+        def run():
+            try:
+                rule.action(detail)
+            except Exception as e:
+                self.log("❌ INVARIANT", "%s action error: %s", rule.name, e, event="invariant_action_error", rule=rule.name)
+            finally:
+                rule.in_flight = False
+                rule.first_seen = 0.0
+                self.mark_changed(*rule.deps)
+        self._actions.submit(run)
+
+    def _run_reconcile(self):
+        if self.reconcile is None:
+            self.schedule.stable()
+            return
+        started = time.perf_counter()
+        try:
+            changed = self.reconcile()
+        except Exception as e:
+            self.log("❌ INVARIANT", "Reconcile error: %s", e, event="reconcile_error")
+            changed = True
+        self.reconciles += 1
+        self.last_reconcile_ms = (time.perf_counter() - started) * 1000
+        violated = any(rule.first_seen for rule in self.rules.values())
+        if changed or violated:
+            self.schedule.unstable()
+            self.schedule.next_at = time.time() + self.schedule.interval
+        else:
+            self.schedule.stable()
+
+    def run(self):
+        while True:
+            wake_at = self._next_wake()
+            with self._cond:
+                now = time.time()
+                deadline = self.schedule.next_at if wake_at is None else min(wake_at, self.schedule.next_at)
+                if not self._dirty and deadline > now:
+                    self._cond.wait(timeout=deadline - now)
+                dirty, self._dirty = self._dirty, set()
+
+            now = time.time()
+            if now >= self.schedule.next_at:
+                self._run_reconcile()
+                rules = list(self.rules.values())
+            elif dirty:
+                seen = set()
+                rules = [r for key in dirty for r in self._by_dep.get(key, ())
+                         if not (r.name in seen or seen.add(r.name))]
+            elif wake_at is not None and now >= wake_at:
+                rules = [r for r in self.rules.values() if r.first_seen]
+            else:
+                continue
+            self._evaluate(rules, time.time())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="invariant-engine", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self):
+        return {
+            "evaluations": self.evaluations,
+            "last_eval_us": round(self.last_eval_us, 1),
+            "reconciles": self.reconciles,
+            "last_reconcile_ms": round(self.last_reconcile_ms, 1),
+            "reconcile_interval_s": self.schedule.interval,
+            "next_reconcile_in_s": round(self.schedule.next_at - time.time(), 1),
+            "rules": {
+                name: {"violations": r.violations, "actions": r.actions, "active": bool(r.first_seen),
+                       "last_detail": r.last_detail}
+                for name, r in self.rules.items()
+            },
+        }
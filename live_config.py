@@ -0,0 +1,277 @@
+"""
+실행 중 교체 가능한 전략 설정 (재시작 없이 튜닝)
+
+- StrategyConfig: 튜닝 값 전부를 담는 불변 __slots__ 객체 (BotState와 같은 방식)
+  생성 시 필드별 타입 변환/범위 검사 + 필드 간 제약(TPMIN ≤ TPMAX, OBV 구간 경계/값 개수 등) 검사
+  → 문제를 모두 모아 ConfigError 하나로 보고 (일부만 반영되는 경우 없음)
+- ConfigStore: 현재 설정 참조 하나를 writer 락 안에서 통째로 교체 (읽는 쪽은 락 없이 snapshot 한 번 참조)
+  · apply(changes, source): 현재 설정 위에 바꿀 필드만 병합 → 검증 실패 시 기존 설정 유지
+  · subscribe(callback, fields): 관심 필드가 바뀐 교체마다 callback(old, new, changed)
+    → 파생 값(리스크 한도, 변동성 TP 모델, OBV 게이트, 타이머, TP/래더)은 구독자가 바뀐 부분만 재계산
+    동시에 교체돼도 전달은 한 번에 하나씩, 마지막 전달 설정 → 현재 설정 차이로 (오래된 설정이 나중에 전달되지 않음)
+  · load_file / reload_if_changed: JSON 파일 (mtime이 바뀐 경우에만 다시 읽음)
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from decimal import Decimal, InvalidOperation
+
+# 이름: (종류, 최소, 최대)   종류: decimal | int | float | edges(증가하는 정수 구간 경계) | decimals(구간별 값)
+SPEC = {
+    "BASERATIO": ("decimal", "0.0001", "0.1"),
+    "MAXPOSITIONRATIO": ("decimal", "0.1", "20"),
+    "MAX_GROSS_POSITION_RATIO": ("decimal", "0.1", "40"),
+    "ORDER_RATE_LIMIT": ("int", 1, 1000),
+    "LOSS_WEIGHT": ("decimal", "0", "100"),
+    "TIER1_SL_FACTOR": ("decimal", "0", "10"),
+    "TIER2_SL_FACTOR": ("decimal", "0", "10"),
+    "TPMIN": ("decimal", "0.0001", "0.05"),
+    "TPMAX": ("decimal", "0.0001", "0.05"),
+    "TP_VOL_MIN": ("decimal", "0.0001", "0.05"),
+    "TP_VOL_MAX": ("decimal", "0.0001", "0.05"),
+    "TP_ATR_MULTIPLIER": ("decimal", "0.01", "10"),
+    "TP_VOL_HYSTERESIS": ("decimal", "0", "1"),
+    "IDLE_TIME_SECONDS": ("float", 10, 86400),
+    "IDLE_ENTRY_COOLDOWN": ("float", 0, 3600),
+    "REBALANCE_SECONDS": ("float", 60, 7 * 86400),
+    "IDLE_RECHECK_SECONDS": ("float", 1, 3600),
+    "MAKER_ENTRY_TIMEOUT": ("float", 0, 60),
+    "OBV_CHANGE_THRESHOLD": ("decimal", "0", "1"),
+    "OBV_BUCKET_HYSTERESIS": ("float", 0, 50),
+    "TP_REPRICE_MIN_INTERVAL": ("float", 0, 60),
+    "OBV_WEIGHT_EDGES": ("edges", 0, 1000),
+    "OBV_WEIGHTS": ("decimals", "0.1", "10"),
+    "OBV_TP_EDGES": ("edges", 0, 1000),
+    "OBV_TP_RATIOS": ("decimals", "0", "1"),
+    "GRID_LEVELS": ("int", 0, 50),
+    "GRID_SPACING": ("decimal", "0.0005", "0.1"),
+    "GRID_SIZE_GROWTH": ("decimal", "0.5", "3"),
+    "LOT_TP_BUCKET": ("decimal", "0.0001", "0.05"),
+    "LOT_TP_MAX_ORDERS": ("int", 1, 20),
+}
+
+
+class ConfigError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = list(errors)
+
+
+def _decimal(value):
+    if isinstance(value, bool):
+        raise ValueError("not a number")
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError("not a number") from None
+    if not number.is_finite():
+        raise ValueError("not a finite number")
+    return number
+
+
+def coerce(name, value):
+    """ 필드 값 → 정해진 타입 (범위 밖/형식 오류는 ValueError) """
+    kind, lo, hi = SPEC[name]
+    if kind in ("edges", "decimals"):
+        if isinstance(value, (str, bytes)) or not hasattr(value, "__iter__"):
+            raise ValueError("expected a list")
+        items = tuple(_decimal(v) for v in value)
+        if not items:
+            raise ValueError("empty list")
+        if any(not (Decimal(str(lo)) <= v <= Decimal(str(hi))) for v in items):
+            raise ValueError(f"values must be in [{lo}, {hi}]")
+        if kind == "decimals":
+            return items
+        if any(v != v.to_integral_value() for v in items):
+            raise ValueError("edges must be integers")
+        if any(b <= a for a, b in zip(items, items[1:])):
+            raise ValueError("edges must be strictly increasing")
+        return tuple(int(v) for v in items)
+    number = _decimal(value)
+    if not (Decimal(str(lo)) <= number <= Decimal(str(hi))):
+        raise ValueError(f"{number} not in [{lo}, {hi}]")
+    if kind == "int":
+        if number != number.to_integral_value():
+            raise ValueError("expected an integer")
+        return int(number)
+    if kind == "float":
+        return float(number)
+    return number
+
+
+def cross_check(values):
+    """ 필드 간 제약 → 문제 목록 """
+    errors = []
+    for lo, hi in (("TPMIN", "TPMAX"), ("TP_VOL_MIN", "TP_VOL_MAX"),
+                   ("MAXPOSITIONRATIO", "MAX_GROSS_POSITION_RATIO")):
+        if values[lo] > values[hi]:
+            errors.append(f"{lo} ({values[lo]}) > {hi} ({values[hi]})")
+    for edges, table in (("OBV_WEIGHT_EDGES", "OBV_WEIGHTS"), ("OBV_TP_EDGES", "OBV_TP_RATIOS")):
+        if len(values[table]) != len(values[edges]) + 1:
+            errors.append(f"{table} needs {len(values[edges]) + 1} values (len({edges}) + 1), "
+                          f"got {len(values[table])}")
+    return errors
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, tuple):
+        return [_plain(v) for v in value]
+    return value
+
+
+class StrategyConfig:
+    __slots__ = ("version", "updated_at", "source") + tuple(SPEC)
+
+    FIELDS = tuple(SPEC)
+
+    def __init__(self, version=0, updated_at=0.0, source="defaults", **values):
+        """ values: FIELDS 전부 (변환/검증 후 저장, 문제가 있으면 ConfigError) """
+        errors = [f"{name}: missing" for name in self.FIELDS if name not in values]
+        errors += [f"{name}: unknown field" for name in values if name not in SPEC]
+        coerced = {}
+        for name in self.FIELDS:
+            if name in values:
+                try:
+                    coerced[name] = coerce(name, values[name])
+                except ValueError as e:
+                    errors.append(f"{name}: {e}")
+        if not errors:
+            errors = cross_check(coerced)
+        if errors:
+            raise ConfigError(errors)
+        setter = object.__setattr__
+        setter(self, "version", version)
+        setter(self, "updated_at", updated_at)
+        setter(self, "source", source)
+        for name, value in coerced.items():
+            setter(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StrategyConfig is immutable; use ConfigStore.apply()")
+
+    def evolve(self, source, **changes):
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(changes)
+        return StrategyConfig(self.version + 1, time.time(), source, **values)
+
+    def to_dict(self):
+        return {name: _plain(getattr(self, name)) for name in self.__slots__}
+
+
+class ConfigStore:
+    def __init__(self, initial, logger=None, history=20):
+        self._config = initial
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self._writer = threading.Lock()     # 교체 직렬화 전용 (읽기에는 사용하지 않음)
+        self._notify_lock = threading.Lock()
+        self._notified = initial            # 구독자에게 마지막으로 전달한 설정
+        self._subscribers = []
+        self.history = deque(maxlen=history)
+        self.applied = 0
+        self.rejected = 0
+        self.last_error = None
+        self.path = None
+        self._mtime = None
+
+    @property
+    def snapshot(self):
+        """ 현재 설정 (락 없음, 반환된 객체는 절대 바뀌지 않음) """
+        return self._config
+
+    def subscribe(self, callback, fields=None):
+        """ callback(old, new, changed) - fields 중 하나라도 바뀐 교체마다 호출 (None이면 전부) """
+        self._subscribers.append((callback, frozenset(fields) if fields else None))
+
+    def apply(self, changes, source=""):
+        """ 바꿀 필드 dict → 검증 후 교체된(또는 기존) 설정. 검증 실패 시 ConfigError, 기존 설정 유지 """
+        if not isinstance(changes, dict):
+            self._reject(source, ["expected an object of field → value"])
+        unknown = [f"{name}: unknown field" for name in changes if name not in SPEC]
+        if unknown:
+            self._reject(source, unknown)
+        with self._writer:
+            old = self._config
+            try:
+                new = old.evolve(source, **changes)
+            except ConfigError as e:
+                self._reject(source, e.errors)
+            changed = frozenset(name for name in StrategyConfig.FIELDS if getattr(old, name) != getattr(new, name))
+            if not changed:
+                return old
+            self._config = new
+            self.applied += 1
+            diff = {name: [_plain(getattr(old, name)), _plain(getattr(new, name))] for name in sorted(changed)}
+            self.history.append({"version": new.version, "at": new.updated_at, "source": source, "changed": diff})
+        self.log("⚙️ CONFIG", "v%d from %s: %s", new.version, source,
+                 ", ".join(f"{name} {a} → {b}" for name, (a, b) in diff.items()),
+                 event="config_applied", version=new.version, source=source, changed=sorted(changed))
+        self._notify()
+        return new
+
+    def _reject(self, source, errors):
+        self.rejected += 1
+        self.last_error = {"at": time.time(), "source": source, "errors": list(errors)}
+        self.log("❌ CONFIG", "Rejected from %s: %s", source, "; ".join(errors),
+                 event="config_rejected", source=source, errors=list(errors))
+        raise ConfigError(errors)
+
+    def _notify(self):
+        """
+        마지막으로 전달한 설정 → 현재 설정 차이를 구독자에게 전달 (notify 락 안에서 한 번에 하나씩)
+        동시에 교체되어 늦게 도착한 호출은 이미 최신 설정이 전달됐으면 건너뜀 → 파생 값이 이전 설정으로 되돌아가지 않음
+        """
+        with self._notify_lock:
+            old, new = self._notified, self._config
+            if new.version <= old.version:
+                return
+            changed = frozenset(name for name in StrategyConfig.FIELDS if getattr(old, name) != getattr(new, name))
+            self._notified = new
+            if changed:
+                self._dispatch(old, new, changed)
+
+    def _dispatch(self, old, new, changed):
+        for callback, fields in self._subscribers:
+            if fields is None or fields & changed:
+                try:
+                    callback(old, new, changed)
+                except Exception as e:
+                    self.log("❌ CONFIG", "Subscriber error: %s", e, event="config_subscriber_error")
+
+    # -------------------------------------------------------------------------
+    # 파일
+    # -------------------------------------------------------------------------
+    def load_file(self, path):
+        """ JSON 파일 {필드: 값} 적용 → 설정 (읽기/형식 오류도 ConfigError) """
+        self.path = path
+        source = f"file:{os.path.basename(path)}"
+        try:
+            self._mtime = os.stat(path).st_mtime
+            with open(path) as f:
+                changes = json.load(f)
+        except (OSError, ValueError) as e:
+            self._reject(source, [f"{path}: {e}"])
+        return self.apply(changes, source=source)
+
+    def reload_if_changed(self):
+        """ 파일 mtime이 바뀌었으면 다시 적용 → 새 설정 (변화 없음/오류면 None, 오류는 기록만) """
+        if not self.path:
+            return None
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        if mtime == self._mtime:
+            return None
+        try:
+            return self.load_file(self.path)
+        except ConfigError:
+            return None
+
+    def stats(self):
+        return {"config": self._config.to_dict(), "applied": self.applied, "rejected": self.rejected,
+                "last_error": self.last_error, "file": self.path, "subscribers": len(self._subscribers),
+                "history": list(self.history)}
@@ -0,0 +1,187 @@
+"""
+비동기(큐 기반) 구조화 로깅
+
+- 트레이딩 스레드는 LogRecord를 큐에 넣기만 하고 즉시 반환 (stdout 쓰기 없음)
+- 메시지 포맷팅(%-args)과 JSON 직렬화는 리스너 스레드에서 지연 수행
+- 태그별 rate limit / sampling으로 잦은 로그를 큐에 넣기 전에 걸러냄
+- 호출 측 비용(ns)과 리스너 측 비용, 드롭 건수를 stats()로 제공
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+
+
+class TagRateLimiter(logging.Filter):
+    """
+    태그별 토큰 버킷 + 샘플링 필터
+    rate_limits: {tag: 초당 허용 건수}, sample_rates: {tag: 0~1 통과 확률}
+    """
+
+    def __init__(self, rate_limits=None, sample_rates=None, burst=5):
+        super().__init__()
+        self.rate_limits = dict(rate_limits or {})
+        self.sample_rates = dict(sample_rates or {})
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.suppressed = {}
+
+    def _suppress(self, tag):
+        self.suppressed[tag] = self.suppressed.get(tag, 0) + 1
+        return False
+
+    def filter(self, record):
+        tag = getattr(record, "tag", None)
+        if tag is None:
+            return True
+
+        sample = self.sample_rates.get(tag)
+        if sample is not None and random.random() >= sample:
+            return self._suppress(tag)
+
+        rate = self.rate_limits.get(tag)
+        if rate is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(tag, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * rate)
+            if tokens < 1:
+                self._buckets[tag] = (tokens, now)
+                return self._suppress(tag)
+            self._buckets[tag] = (tokens - 1, now)
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """ 큐가 가득 차면 기다리지 않고 드롭. 메시지 포맷팅은 리스너로 미룸 """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 기본 구현은 호출 스레드에서 format()을 수행하므로 예외 텍스트만 미리 고정
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    """ 기존 로그 형식 유지: [시간] [레벨] [태그] 메시지 """
+
+    def __init__(self):
+        super().__init__('[%(asctime)s] [%(levelname)s] %(tag_prefix)s%(message)s')
+
+    def format(self, record):
+        tag = getattr(record, "tag", None)
+        record.tag_prefix = f"[{tag}] " if tag and tag != "divider" else ""
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """ 한 줄 JSON 레코드: ts, level, tag, msg + 구조화 필드(event, side, qty, price, latency_ms ...) """
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "thread": record.threadName,
+        }
+        tag = getattr(record, "tag", None)
+        if tag:
+            data["tag"] = tag
+        data["msg"] = record.getMessage()
+        fields = getattr(record, "fields", None)
+        if fields:
+            for key, value in fields.items():
+                data[key] = value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class _TimedStreamHandler(logging.StreamHandler):
+    """ 리스너 스레드 측 처리 비용 측정 """
+
+    def __init__(self, stream, stats):
+        super().__init__(stream)
+        self._stats = stats
+
+    def emit(self, record):
+        started = time.perf_counter_ns()
+        super().emit(record)
+        self._stats.record_emit(time.perf_counter_ns() - started)
+
+
+class LogStats:
+    def __init__(self):
+        self.calls = 0
+        self.call_ns = 0
+        self.max_call_ns = 0
+        self.emitted = 0
+        self.emit_ns = 0
+
+    def record_call(self, ns):
+        self.calls += 1
+        self.call_ns += ns
+        if ns > self.max_call_ns:
+            self.max_call_ns = ns
+
+    def record_emit(self, ns):
+        self.emitted += 1
+        self.emit_ns += ns
+
+
+class LogPipeline:
+    def __init__(self, json_output=False, level=logging.INFO, queue_size=10000,
+                 rate_limits=None, sample_rates=None, stream=None):
+        self.stats_data = LogStats()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.limiter = TagRateLimiter(rate_limits, sample_rates)
+        self.queue_handler = NonBlockingQueueHandler(self.queue)
+        self.queue_handler.addFilter(self.limiter)
+
+        self.output_handler = _TimedStreamHandler(stream or sys.stdout, self.stats_data)
+        self.output_handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+        self.listener = logging.handlers.QueueListener(self.queue, self.output_handler,
+                                                       respect_handler_level=False)
+        self.level = level
+
+    def install(self, logger=None):
+        """ root 로거의 핸들러를 큐 핸들러로 교체하고 리스너 스레드 시작 """
+        target = logger or logging.getLogger()
+        for h in list(target.handlers):
+            target.removeHandler(h)
+        target.addHandler(self.queue_handler)
+        target.setLevel(self.level)
+        self.listener.start()
+        return self
+
+    def stop(self):
+        self.listener.stop()
+
+    def stats(self):
+        s = self.stats_data
+        return {
+            "calls": s.calls,
+            "avg_call_us": round(s.call_ns / s.calls / 1000, 3) if s.calls else 0,
+            "max_call_us": round(s.max_call_ns / 1000, 3),
+            "emitted": s.emitted,
+            "avg_emit_us": round(s.emit_ns / s.emitted / 1000, 3) if s.emitted else 0,
+            "queue_depth": self.queue.qsize(),
+            "dropped_queue_full": self.queue_handler.dropped,
+            "suppressed": dict(self.limiter.suppressed),
+        }
@@ -0,0 +1,332 @@
+"""
+방향별 진입 로트 원장 (체결 단위 보유분 추적 → 로트별 TP)
+
+- 진입 체결 한 건 = 로트 한 개 (계약 수, 가격, 시각, 진입 의도). 방향별로 array 버퍼에 체결 순서대로 추가
+  · 잔량은 Fenwick 트리(누적합)로 관리 → FIFO(가장 오래된)/LIFO(가장 최근) 로트 탐색 O(log n)
+  · 로트 id는 단조 증가 → 로트 id로 위치 찾기는 bisect O(log n)
+  · 다 소진된 로트가 절반을 넘으면 압축 (amortized O(1))
+- 청산 체결: TP 주문이면 그 주문에 배정된 로트부터, 그 외(Tier 손절/리밸런싱)는 match 방식(fifo/lifo)으로 소진
+- TP 계획: 로트별 목표가 = 진입가 × (1 ± ratio) → 가격 구간(bucket)으로 묶어 주문 수를 줄이고,
+  max_orders를 넘는 먼 구간은 마지막 주문 하나로 합침 (수량 가중 평균 목표가)
+- 거래소 포지션과 어긋나면 reconcile: 남는 잔량은 match 방식으로 제거, 모자란 잔량은 평단이 맞도록 합성 로트 추가
+"""
+import bisect
+import threading
+import time
+from array import array
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+import numpy as np
+
+SIDES = ("long", "short")
+INTENT_SYNC = "sync"                    # 거래소 포지션 보정으로 생긴 합성 로트
+
+
+class SideLots:
+    """ 한 방향의 로트 버퍼 (병렬 array + Fenwick 누적합) """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.price = array("d")
+        self.size = array("q")              # 남은 계약 수
+        self.opened = array("d")            # 체결 시각 (time.time())
+        self.intent = array("B")            # intent 코드 (LotLedger.intents 인덱스)
+        self._tree = array("q", [0])        # 1-based Fenwick
+        self.total = 0                      # 남은 계약 수 합계
+        self.cost = 0.0                     # Σ 가격 × 남은 계약 수
+        self.live = 0                       # 잔량이 남은 로트 수
+
+    def __len__(self):
+        return self.live
+
+    # -------------------------------------------------------------------------
+    # Fenwick
+    # -------------------------------------------------------------------------
+    def _tree_add(self, i, delta):
+        tree = self._tree
+        i += 1
+        n = len(tree)
+        while i < n:
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        """ 앞쪽 i개 로트의 잔량 합 """
+        tree = self._tree
+        s = 0
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    def _search(self, target):
+        """ 누적 잔량이 target 이상이 되는 첫 로트 위치 (target ≥ 1) """
+        tree = self._tree
+        n = len(tree) - 1
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] < target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def _rebuild(self):
+        n = len(self.size)
+        tree = array("q", [0]) * (n + 1)
+        for i in range(1, n + 1):
+            tree[i] += self.size[i - 1]
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    # -------------------------------------------------------------------------
+    # 추가 / 소진
+    # -------------------------------------------------------------------------
+    def append(self, lot_id, contracts, price, opened, intent_code):
+        self.ids.append(lot_id)
+        self.price.append(price)
+        self.size.append(contracts)
+        self.opened.append(opened)
+        self.intent.append(intent_code)
+        i = len(self.size)
+        # 새 노드 i는 (i - lowbit(i), i] 구간 합
+        self._tree.append(contracts + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+        self.total += contracts
+        self.cost += price * contracts
+        self.live += 1
+
+    def index_of(self, lot_id):
+        i = bisect.bisect_left(self.ids, lot_id)
+        return i if i < len(self.ids) and self.ids[i] == lot_id else None
+
+    def take(self, i, contracts):
+        """ 위치 i 로트에서 최대 contracts만큼 소진 → (소진량, 진입가) """
+        qty = min(contracts, self.size[i])
+        if qty <= 0:
+            return 0, self.price[i]
+        self.size[i] -= qty
+        self._tree_add(i, -qty)
+        self.total -= qty
+        self.cost -= self.price[i] * qty
+        if self.size[i] == 0:
+            self.live -= 1
+        return qty, self.price[i]
+
+    def oldest(self):
+        return self._search(1) if self.total > 0 else None
+
+    def newest(self):
+        return self._search(self.total) if self.total > 0 else None
+
+    def compact(self):
+        """ 소진된 로트 제거 후 Fenwick 재구성 """
+        keep = [i for i in range(len(self.size)) if self.size[i] > 0]
+        for name in ("ids", "price", "size", "opened", "intent"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[i] for i in keep)))
+        self._rebuild()
+        self.cost = sum(p * q for p, q in zip(self.price, self.size))  # 부동소수 누적 오차 제거
+
+    def live_indices(self):
+        return [i for i in range(len(self.size)) if self.size[i] > 0]
+
+
+class LotLedger:
+    def __init__(self, match="fifo", logger=None):
+        if match not in ("fifo", "lifo"):
+            raise ValueError(f"match must be fifo or lifo: {match}")
+        self.match = match
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.sides = {side: SideLots() for side in SIDES}
+        self.intents = [INTENT_SYNC]
+        self._intent_codes = {INTENT_SYNC: 0}
+        self._tp_lots = {}                  # TP 주문 text → (side, 로트 id 튜플)
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self.last_fill = 0.0                # 마지막 체결 반영 시각 (보정 유예 판단용)
+        self.opened = 0
+        self.closed = 0
+        self.reconciled = 0
+
+    def _intent_code(self, intent):
+        code = self._intent_codes.get(intent)
+        if code is None:
+            code = self._intent_codes[intent] = len(self.intents)
+            self.intents.append(intent)
+        return code
+
+    # -------------------------------------------------------------------------
+    # 체결 반영
+    # -------------------------------------------------------------------------
+    def open(self, side, contracts, price, intent, opened=None):
+        """ 진입 체결 → 로트 추가 (로트 id 반환) """
+        if contracts <= 0 or price <= 0:
+            return None
+        with self._lock:
+            lot_id = self._next_id
+            self._next_id += 1
+            self.sides[side].append(lot_id, int(contracts), float(price), opened or time.time(),
+                                    self._intent_code(intent))
+            self.opened += 1
+            self.last_fill = time.time()
+            return lot_id
+
+    def close(self, side, contracts, text=None):
+        """
+        청산 체결 → 로트 소진. text가 로트 TP 주문이면 배정된 로트부터, 나머지는 match 방식.
+        → [(로트 id, 소진 계약 수, 진입가), ...]
+        """
+        with self._lock:
+            lots = self.sides[side]
+            remaining = min(int(contracts), lots.total)
+            consumed = []
+            assigned = self._tp_lots.get(text) if text else None
+            if assigned is not None and assigned[0] == side:
+                for lot_id in assigned[1]:
+                    if remaining <= 0:
+                        break
+                    i = lots.index_of(lot_id)
+                    if i is not None:
+                        remaining -= self._take(lots, i, remaining, consumed)
+            pick = lots.oldest if self.match == "fifo" else lots.newest
+            while remaining > 0:
+                i = pick()
+                if i is None:
+                    break
+                remaining -= self._take(lots, i, remaining, consumed)
+            self.last_fill = time.time()
+            self._maybe_compact(lots)
+            return consumed
+
+    def _take(self, lots, i, contracts, consumed):
+        qty, entry = lots.take(i, contracts)
+        if qty:
+            consumed.append((lots.ids[i], qty, entry))
+            if lots.size[i] == 0:
+                self.closed += 1
+        return qty
+
+    def _maybe_compact(self, lots):
+        if len(lots.size) >= 64 and lots.live * 2 < len(lots.size):
+            lots.compact()
+
+    def reconcile(self, side, contracts, entry_price):
+        """
+        거래소 포지션(계약 수/평단)에 맞춤 → 조정한 계약 수 (+ 추가 / - 제거)
+        남는 잔량은 match 방식으로 제거, 모자란 잔량은 원장 평단이 거래소 평단과 같아지도록 합성 로트 추가
+        """
+        contracts = int(contracts)
+        with self._lock:
+            lots = self.sides[side]
+            diff = contracts - lots.total
+            if diff < 0:
+                self.close(side, -diff)
+            elif diff > 0:
+                target_cost = float(entry_price) * contracts
+                price = (target_cost - lots.cost) / diff
+                if price <= 0:
+                    price = float(entry_price)
+                self.open(side, diff, price, INTENT_SYNC)
+            if diff:
+                self.reconciled += 1
+                self.log("🧾 LOTS", "%s reconciled %+d (C) → %d lots / %d (C)", side.upper(), diff,
+                         lots.live, lots.total, event="lots_reconcile", side=side, diff=diff, contracts=lots.total)
+            return diff
+
+    def matches(self, side, contracts):
+        return self.sides[side].total == int(contracts)
+
+    def clear(self, side=None):
+        with self._lock:
+            for s in ((side,) if side else SIDES):
+                self.sides[s] = SideLots()
+            self._tp_lots = {text: v for text, v in self._tp_lots.items() if side and v[0] != side}
+
+    # -------------------------------------------------------------------------
+    # TP 계획
+    # -------------------------------------------------------------------------
+    def plan_tp(self, side, ratio, bucket, tick, max_orders):
+        """
+        로트별 목표가를 bucket(상대 폭) 단위로 묶은 TP 주문 목록
+        → [(부호 포함 계약 수, 가격 Decimal, 로트 id 튜플), ...] (현재가에 가까운 목표부터)
+        LONG은 목표가 올림, SHORT는 내림 (로트별 목표 이익 이상 보장), 합친 마지막 주문은 수량 가중 평균
+        """
+        tick = Decimal(str(tick))
+        with self._lock:
+            lots = self.sides[side]
+            idx = lots.live_indices()
+            if not idx:
+                return []
+            ids = np.array([lots.ids[i] for i in idx], dtype=np.int64)
+            prices = np.array([lots.price[i] for i in idx], dtype=np.float64)
+            sizes = np.array([lots.size[i] for i in idx], dtype=np.int64)
+        sign = 1.0 if side == "long" else -1.0
+        targets = prices * (1.0 + sign * float(ratio))
+        width = max(float(tick), float(np.median(prices)) * float(bucket))
+        keys = np.ceil(targets / width) if side == "long" else np.floor(targets / width)
+        buckets, inverse = np.unique(keys, return_inverse=True)
+        if side == "short":
+            # 현재가에 가까운(높은) 목표부터
+            buckets, inverse = buckets[::-1], len(buckets) - 1 - inverse
+        groups = min(len(buckets), max(1, int(max_orders)))
+        inverse = np.minimum(inverse, groups - 1)
+        qty = np.bincount(inverse, weights=sizes, minlength=groups)
+        notional = np.bincount(inverse, weights=sizes * targets, minlength=groups)
+        rounding = ROUND_CEILING if side == "long" else ROUND_FLOOR
+        plan = []
+        for g in range(groups):
+            if qty[g] <= 0:
+                continue
+            if g < groups - 1 or groups == len(buckets):
+                raw = buckets[g] * width
+                # 구간 경계가 로트 목표보다 불리해지지 않도록 구간 안 최댓값/최솟값으로 보정
+                member = targets[inverse == g]
+                raw = max(raw, member.max()) if side == "long" else min(raw, member.min())
+            else:
+                raw = notional[g] / qty[g]
+            price = Decimal(repr(float(raw))).quantize(tick, rounding=rounding)
+            members = tuple(int(x) for x in ids[inverse == g])
+            contracts = int(qty[g])
+            plan.append((-contracts if side == "long" else contracts, price, members))
+        return plan
+
+    def assign_tp(self, text, side, lot_ids):
+        with self._lock:
+            self._tp_lots[text] = (side, tuple(lot_ids))
+
+    def tp_lots(self, text):
+        item = self._tp_lots.get(text)
+        return item[1] if item else None
+
+    def release_tp(self, texts=None):
+        """ 취소된 TP 주문의 로트 배정 해제 (texts 생략 시 전부) """
+        with self._lock:
+            if texts is None:
+                self._tp_lots.clear()
+            else:
+                for text in texts:
+                    self._tp_lots.pop(text, None)
+
+    # -------------------------------------------------------------------------
+    # 조회
+    # -------------------------------------------------------------------------
+    def lots(self, side):
+        with self._lock:
+            lots = self.sides[side]
+            return [{"id": lots.ids[i], "size": lots.size[i], "price": lots.price[i],
+                     "opened": lots.opened[i], "intent": self.intents[lots.intent[i]]}
+                    for i in lots.live_indices()]
+
+    def summary(self, side):
+        lots = self.sides[side]
+        return {"lots": lots.live, "contracts": lots.total,
+                "avg_price": round(lots.cost / lots.total, 6) if lots.total else 0.0}
+
+    def stats(self):
+        return {"match": self.match, "long": self.summary("long"), "short": self.summary("short"),
+                "tp_orders": len(self._tp_lots), "opened": self.opened, "closed": self.closed,
+                "reconciled": self.reconciled}
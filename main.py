@@ -1,27 +1,90 @@
 import os
+import sys
+import signal
 import time
-import asyncio
 import threading
 import logging
 import json
 import math
 from decimal import Decimal, ROUND_DOWN
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, request, jsonify
-from gate_api import ApiClient, Configuration, FuturesApi, FuturesOrder, UnifiedApi
+from gate_api import AccountApi, ApiClient, Configuration, FuturesApi, FuturesOrder, FuturesOrderAmendment, UnifiedApi
 import hashlib
+import hmac
+
+from log_pipeline import LogPipeline
+from ws_manager import WsConnectionManager
+from order_book import LocalOrderBook
+from balance_cache import BalanceCache
+from invariants import InvariantEngine
+from flatten import Flattener
+from grid_ladder import GridLadder, BATCH_CREATE_MAX, BATCH_CANCEL_MAX
+from lots import LotLedger
+from market_feed import MarketFeed
+from pnl import PnlEngine
+from profiler import SamplingProfiler, TimedLock, dump_threads
+from state import BotState, StateStore
+from recorder import StreamRecorder, RecordingApi, read_records
+from fast_rest import FastRestClient
+from live_config import ConfigStore, StrategyConfig, ConfigError
+from call_plan import CallPlanApi
+from signals import ObvSignalGate, CoalescingTrigger
+from timer_wheel import TimerWheel
+from order_hygiene import OrderHygiene
+from risk import RiskLedger, RiskGate, RiskGatedApi, RiskRejected
+from order_registry import (
+    OrderRegistry, OpenOrderIndex, BoundedSet, INTENT_GRID_ENTRY, INTENT_GRID_LEVEL, INTENT_IDLE_ENTRY, INTENT_TP, INTENT_TIER_SL,
+    INTENT_REBALANCE, INTENT_UNKNOWN, ENTRY_INTENTS, STOP_INTENTS,
+)
+from volatility import VolatilityTracker, VolatilitySnapshot, VolatilityTPModel
+from strategy import (
+    calculate_obv_tp_gap, calculate_loss_multiplier,
+    calculate_idle_multiplier, calculate_entry_contracts, calculate_tier_sl_qty,
+    calculate_obv_macd_normalized, loss_rate_multiplier, OBV_WEIGHT_EDGES, OBV_WEIGHTS, OBV_TP_EDGES, OBV_TP_RATIOS,
+    CONTRACT_MULTIPLIER,
+)
 
 try:
     from gate_api.exceptions import ApiException as GateApiException
 except ImportError:
     from gate_api import ApiException as GateApiException
 
-import websockets
 
-logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(message)s')
+# =============================================================================
+# 로그 설정 (큐 기반 비동기 로깅)
+# =============================================================================
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")       # text | json
+LOG_RATE_LIMITS = {                                      # 태그별 초당 최대 출력 건수
+    "📊 POSITION": 1.0,
+    "📊 MAIN": 0.5,
+    "📊 OBV-MACD": 0.2,
+    "📈 VOL": 0.1,
+    "⏸️ TP": 0.2,
+    "IDLE-DEBUG": 0.1,
+}
+LOG_SAMPLE_RATES = {}                                    # 태그별 샘플링 비율 (0~1)
+
+log_pipeline = LogPipeline(json_output=(LOG_FORMAT == "json"), level=logging.INFO,
+                           rate_limits=LOG_RATE_LIMITS, sample_rates=LOG_SAMPLE_RATES).install()
 logger = logging.getLogger(__name__)
 
+# =============================================================================
+# 로그
+# =============================================================================
+def log(tag, msg, *args, **fields):
+    """
+    msg는 %-포맷 문자열이며 args와 함께 리스너 스레드에서 지연 포맷팅됩니다.
+    fields(event, side, qty, price, latency_ms ...)는 JSON 로그에 그대로 실립니다.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    started = time.perf_counter_ns()
+    logger.info(msg, *args, extra={"tag": tag, "fields": fields})
+    log_pipeline.stats_data.record_call(time.perf_counter_ns() - started)
+
 # =============================================================================
 # 환경 변수 (Environment Variables)
 # =============================================================================
@@ -29,6 +92,17 @@ API_KEY = os.environ.get("API_KEY", "")
 API_SECRET = os.environ.get("API_SECRET", "")
 SYMBOL = os.environ.get("SYMBOL", "BNB_USDT")
 SETTLE = "usdt"
+GATE_USER_ID = os.environ.get("GATE_USER_ID", "")      # 비공개 채널 구독용 (없으면 계정 정보/주문 이력에서 조회)
+USER_ID_LOOKUP_RETRIES = 3                              # 사용자 ID 조회 재시도 횟수 (모두 실패하면 시작 중단)
+ACCOUNT_NAME = os.environ.get("ACCOUNT_NAME", "main")   # 계정 관리자(accounts.py)가 계정별로 지정
+PORT = int(os.environ.get("PORT", "8080"))
+WS_URL = f"wss://fx-ws.gateio.ws/v4/ws/{SETTLE}"
+
+# 기록/재생 (RECORD_DIR 지정 시 수신 메시지 전부 기록, REPLAY_DIR은 replay.py가 설정)
+RECORD_DIR = os.environ.get("RECORD_DIR", "")
+RECORD_SEGMENT_MB = int(os.environ.get("RECORD_SEGMENT_MB", "64"))     # 세그먼트 회전 크기 (압축 후)
+RECORD_MAX_SEGMENTS = int(os.environ.get("RECORD_MAX_SEGMENTS", "48"))  # 보관 세그먼트 수
+REPLAY_DIR = os.environ.get("REPLAY_DIR", "")
 
 # Railway 환경 변수 로그
 if API_KEY:
@@ -45,28 +119,96 @@ else:
 # =============================================================================
 # 전략 설정 (Strategy Configuration)
 # =============================================================================
+# 튜닝 값(live_config.SPEC에 있는 이름)은 기본값 → 실행 중에는 strategy_config.snapshot 값을 사용
+# STRATEGY_CONFIG_FILE(JSON, 변경 감시) 또는 POST /config 로 재시작 없이 교체
+STRATEGY_CONFIG_FILE = os.environ.get("STRATEGY_CONFIG_FILE", "")
+CONFIG_TOKEN = os.environ.get("CONFIG_TOKEN", "")        # POST /config 인증 토큰 (X-Config-Token 헤더, 없으면 비활성)
+CONFIG_WATCH_INTERVAL = 5.0                              # 설정 파일 변경 확인 간격 (초)
+
 # 기본 비율 설정
 INITIALBALANCE = Decimal("50")              # 초기 잔고
 BASERATIO = Decimal("0.01")                 # ← 기본 수량 비율 (1%)
 MAXPOSITIONRATIO = Decimal("3.0")           # 최대 포지션 비율 (3배)
+MAX_GROSS_POSITION_RATIO = MAXPOSITIONRATIO * 2   # 양방향 합계 최대 노출 비율 (방향별 한도 × 2)
+ORDER_RATE_LIMIT = int(os.environ.get("ORDER_RATE_LIMIT", "50"))   # 주문 속도 한도 (ORDER_RATE_WINDOW초당 신규 주문 수, 계정별)
+ORDER_RATE_WINDOW = 1.0                     # 주문 속도 집계 구간 (초)
 HEDGE_RATIO_MAIN = Decimal("0.10")          # 주력 헤지 비율 (10%)
+LOSS_WEIGHT = Decimal("20")                 # 주력 손실률 가중치 (20배)
+TIER1_SL_FACTOR = Decimal("0.8")            # Tier-1 손절 배수 (비주력 TP 수량 대비)
+TIER2_SL_FACTOR = Decimal("1.5")            # Tier-2 손절 배수
 
 # TP 설정 (동적 TP 기준값)
 TPMIN = Decimal("0.0021")                   # 최소 TP (0.21%)
 TPMAX = Decimal("0.004")                    # 최대 TP (0.4%)
 
+# 변동성 기반 TP 설정 (ATR 데이터가 충분할 때 OBV 단계 TP 대신 사용)
+TP_VOL_MIN = Decimal("0.0015")              # 변동성 TP 하한 (0.15%)
+TP_VOL_MAX = Decimal("0.012")               # 변동성 TP 상한 (1.2%)
+TP_ATR_MULTIPLIER = Decimal("0.5")          # TP 갭 = ATR% × 0.5
+TP_VOL_HYSTERESIS = Decimal("0.15")         # 갭 상대 변화 15% 미만이면 유지
+ATR_PERIOD = 14                             # ATR 기간 (캔들 수)
+RV_WINDOW = 30                              # 실현 변동성 윈도우 (캔들 수)
+
 # 시간 설정
 IDLE_TIME_SECONDS = 600                      # 아이들 감지 시간 (10분)
 IDLE_TIMEOUT = 600                           # 아이들 타임아웃 (10분)
 IDLE_ENTRY_COOLDOWN = 10                     # 아이들 진입 쿨다운 (10초)
 REBALANCE_SECONDS = 5 * 3600                 # 리밸런싱 시간 (5시간)
+IDLE_RECHECK_SECONDS = 60                    # 아이들 진입 조건 미충족 시 재확인 간격 (초)
+KLINE_FETCH_INTERVAL = 60                    # 캔들 조회 간격 (초)
+AVG_TP_CHECK_INTERVAL = 3                    # 평단 TP 주문 상태 확인 간격 (초, 평단 TP가 있을 때만)
+STALE_ORDER_SECONDS = 86400                  # 열린 주문 최대 나이 (초) → 초과 시 취소
+DEADMAN_TIMEOUT = 30                         # 데드맨 스위치: 갱신이 끊기면 이 시간 뒤 거래소가 열린 주문 전부 취소 (초)
+DEADMAN_INTERVAL = 10                        # 데드맨 스위치 갱신 간격 (초)
+HYGIENE_DEBOUNCE = 1.0                       # 주문 변경 후 중복 주문 검사까지 대기 (초, 연속 변경은 합쳐짐)
+FLATTEN_CONFIRM_TIMEOUT = 3.0                # 청산 주문 종료 이벤트 대기 시간 (초)
+DEBUG_PROFILE_MAX_SECONDS = 60               # /debug/profile 최대 샘플링 시간 (초)
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")          # /debug/* 인증 토큰 (X-Debug-Token 헤더, 없으면 localhost 요청만)
+PRICE_MAX_AGE = 5.0                          # 티커 스트림 가격 허용 나이 (초)
+RECONCILE_MIN_SECONDS = 15                   # REST 정합성 보정 최소 간격 (변화/위반 시)
+RECONCILE_MAX_SECONDS = 600                  # 안정 상태에서 최대 보정 간격
+BALANCE_MAX_AGE = 30                         # 수량 계산 시 허용하는 잔고 나이 (초) → 초과 시 REST 보정
+BALANCE_RECONCILE_INTERVAL = 5               # 잔고 스트림 이벤트 후 REST 보정 최소 간격 (초)
+FUNDING_RATE_MATCH_WINDOW = 60               # 펀딩 이력 최신 건 정산 시각과 잔고 이벤트 시각 허용 차 (초)
 
 # 임계값 설정
 OBV_CHANGE_THRESHOLD = Decimal("0.05")       # OBV 변화 임계값 (5%)
+OBV_BUCKET_HYSTERESIS = 1.0                  # OBV 구간 경계 히스테리시스 (표시 단위, ×100)
+TP_REPRICE_MIN_INTERVAL = 0.5                # OBV 신호 TP 재가격 최소 간격 (초)
 TP_CHANGE_THRESHOLD = Decimal("0.01")        # TP 변화 임계값 (0.01%)
 
 # 기능 플래그
 ENABLE_AUTO_HEDGE = True                     # 자동 헤지 활성화
+ENABLE_MAKER_ORDERS = True                   # 진입/TP를 호가 최우선 가격에 메이커로 배치
+ENABLE_FAST_REST = True                      # 주문 생성/취소/amend/열린 주문 조회를 경량 REST 클라이언트로
+ENABLE_DEADMAN_SWITCH = True                 # Gate countdown cancel-all 하트비트
+ENABLE_RISK_GATE = True                      # 모든 주문을 전송 전 리스크 게이트로 검사
+REST_FANOUT_WORKERS = 4                      # 새로고침/체결 처리에서 독립 조회를 동시에 실행할 스레드 수
+
+# 메이커 주문 설정
+MAKER_ENTRY_TIMEOUT = 3.0                    # 메이커 진입 대기 시간 (초) → 미체결분은 시장가
+ORDER_BOOK_DEPTH = "20"                      # 호가 구독 깊이
+
+# 시세 프로세스 설정 (process: 공개 시세 디코딩/호가창/지표 계산을 별도 프로세스로 분리, 공유 메모리 링으로 전달)
+FEED_MODE = os.environ.get("FEED_MODE", "thread")      # thread | process | shared (재생 모드에서는 항상 thread)
+FEED_RING = os.environ.get("FEED_RING", "")            # shared: 계정 관리자가 만든 시세 링 이름
+FEED_WAKE_FD = os.environ.get("FEED_WAKE_FD", "")      # shared: 링 기록 알림 파이프 읽기 끝 (계정 관리자가 넘겨줌)
+FEED_RING_CAPACITY = 4096                    # 링 레코드 수 (64B/건, 가득 차면 잠시 대기 후 버림)
+FEED_WATCHDOG_TIMEOUT = 5.0                  # 시세 프로세스 heartbeat 정지 허용 시간 (초) → 넘으면 재시작
+
+# 그리드 래더 설정 (현재가 바깥에 지정가 N단계)
+ENABLE_GRID_LADDER = True                    # 진입 외 추가 물량을 시장가 대신 지정가 래더로 배치
+GRID_LEVELS = 5                              # 방향별 레벨 수
+GRID_SPACING = Decimal("0.004")              # 레벨 간격 (0.4%, 최초 배치 시 틱 단위로 고정)
+GRID_SIZE_GROWTH = Decimal("1.0")            # 레벨이 깊어질 때마다 수량 배수
+DEFAULT_PRICE_TICK = Decimal("0.01")         # 주문 가격 틱 fallback (계약 정보 order_price_round 조회 실패 시)
+
+# 로트 TP 설정 (평단 TP 한 건 대신 진입 로트별 TP)
+ENABLE_LOT_TP = True                         # 로트 원장이 거래소 포지션과 일치하면 로트별 TP, 아니면 평단 TP
+LOT_MATCH_MODE = "fifo"                      # TP 외 청산 체결(Tier 손절/리밸런싱)의 로트 소진 순서 (fifo | lifo)
+LOT_TP_BUCKET = Decimal("0.001")             # 로트 TP 묶음 가격 구간 (0.1%)
+LOT_TP_MAX_ORDERS = 5                        # 방향별 최대 TP 주문 수 (넘는 먼 구간은 마지막 주문에 합침)
+LOT_RECONCILE_GRACE = 5.0                    # 마지막 체결 후 이 시간 안에는 포지션 보정 보류 (체결 이벤트 대기, 초)
 
 
 # =============================================================================
@@ -77,6 +219,32 @@ config.host = "https://api.gateio.ws/api/v4"
 config.verify_ssl = True
 api_client = ApiClient(config)
 api = FuturesApi(api_client)
+# 핫패스(생성/배치 생성/취소/배치 취소/amend/주문 목록)는 경량 클라이언트, 나머지는 SDK로 위임
+fast_rest = FastRestClient(API_KEY, API_SECRET, host=config.host, fallback=api) if ENABLE_FAST_REST else None
+if fast_rest is not None:
+    api = fast_rest
+recorder = StreamRecorder(RECORD_DIR, segment_bytes=RECORD_SEGMENT_MB * 1024 * 1024,
+                          max_segments=RECORD_MAX_SEGMENTS) if RECORD_DIR else None
+if REPLAY_DIR:
+    # 재생 모드: 기록된 REST 응답을 순서대로 반환, 실제 주문은 나가지 않음
+    from replay import ReplayApi
+    api = ReplayApi(read_records(REPLAY_DIR))
+elif recorder is not None:
+    api = RecordingApi(api, recorder)
+# 주문 생성/배치 생성/수량 amend → 리스크 게이트 (로컬 노출 원장 기준, REST 호출 없음)
+risk_ledger = RiskLedger(contract_multiplier=float(CONTRACT_MULTIPLIER))
+risk_gate = RiskGate(risk_ledger, side_ratio=MAXPOSITIONRATIO, gross_ratio=MAX_GROSS_POSITION_RATIO,
+                     rate_limit=ORDER_RATE_LIMIT, rate_window=ORDER_RATE_WINDOW,
+                     logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+if ENABLE_RISK_GATE:
+    api = RiskGatedApi(api, risk_gate)
+# 새로고침/체결 처리 계획: 독립 조회 병렬 시작 + 계획 안 결과 재사용 (계획이 열린 스레드에서만, 쓰기 후 무효화)
+api = CallPlanApi(api, workers=REST_FANOUT_WORKERS,
+                  logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+READ_POSITIONS = ("list_positions", (SETTLE,), {})           # 호출부와 같은 인자여야 재사용됨
+READ_OPEN_ORDERS = ("list_futures_orders", (SETTLE,), {"contract": SYMBOL, "status": "open"})
+READ_TICKER = ("list_futures_tickers", (SETTLE,), {"contract": SYMBOL})
+READ_ACCOUNT = ("list_futures_accounts", (SETTLE,), {})
 unified_api = UnifiedApi(api_client)
 
 app = Flask(__name__)
@@ -84,7 +252,7 @@ app = Flask(__name__)
 
 def fetch_min_lot(symbol):
     """
-    Gate.io 마켓 정보로부터 최소 주문 수량과 정밀도(Precision)를 가져옴
+    Gate.io 마켓 정보로부터 최소 주문 수량, 정밀도(Precision), 가격 틱(order_price_round)을 가져옴
     """
     try:
         contracts = api.list_futures_contracts(SETTLE)
@@ -106,48 +274,56 @@ def fetch_min_lot(symbol):
                 else:
                     precision = 0
                 
-                return min_qty, precision
+                price_tick = DEFAULT_PRICE_TICK
+                if getattr(c, 'order_price_round', None):
+                    price_tick = Decimal(str(c.order_price_round))
+                
+                return min_qty, precision, price_tick
                 
     except Exception as e:
         log("❌ FETCH_MIN_LOT", f"Error fetching contract info: {e}")
     
-    log("⚠️ FETCH_MIN_LOT", "Using default fallback values (0.001, 3)")
-    return Decimal("0.001"), 3
+    log("⚠️ FETCH_MIN_LOT", f"Using default fallback values (0.001, 3, tick {DEFAULT_PRICE_TICK})")
+    return Decimal("0.001"), 3, DEFAULT_PRICE_TICK
 
 # 초기 세팅부:
-MIN_QUANTITY, step_precision = fetch_min_lot("BNB_USDT")
+MIN_QUANTITY, step_precision, GRID_PRICE_TICK = fetch_min_lot("BNB_USDT")   # 래더/로트 TP 가격은 계약 틱으로 라운딩
 QUANTITY_STEP = Decimal(str(10 ** -step_precision))
 
 
 # =============================================================================
 # 스레드 동기화 (Thread Locks)
 # =============================================================================
-balance_lock = threading.Lock()
-position_lock = threading.Lock()
-initialize_grid_lock = threading.Lock()
-refresh_tp_lock = threading.Lock()
-hedge_lock = threading.Lock()
-idle_entry_progress_lock = threading.Lock()
-idle_entry_lock = threading.Lock()
+# 공유 상태는 StateStore(불변 스냅샷)로 관리 → 아래 락은 실행 중복 방지 전용
+# TimedLock: threading.Lock과 동일하게 동작하며 대기/보유 시간을 /debug/locks 로 노출
+initialize_grid_lock = TimedLock("initialize_grid_lock")
+idle_entry_lock = TimedLock("idle_entry_lock")
+MODULE_LOCKS = (initialize_grid_lock, idle_entry_lock)
 
 
 # =============================================================================
 # 전역 상태 변수 (Global State Variables)
 # =============================================================================
+# 포지션/잔고/초기 자본/OBV/최대 포지션 잠금/평단 TP → 불변 스냅샷 (state.snapshot)
+state = StateStore(BotState(account_balance=INITIALBALANCE),
+                   logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+risk_ledger.on_state(state.snapshot)
+state.subscribe(lambda old, new, changed: risk_ledger.on_state(new),
+                fields=("long_size", "short_size", "long_locked", "short_locked", "account_balance", "initial_capital"))
+
+# 튜닝 값 → 불변 설정 스냅샷 (strategy_config.snapshot, 교체 시 구독자가 파생 값 재계산)
+# 기본값: 위 모듈 상수 + strategy.py의 OBV 구간 표
+strategy_config = ConfigStore(
+    StrategyConfig(**dict({name: globals()[name] for name in StrategyConfig.FIELDS},
+                          OBV_WEIGHT_EDGES=OBV_WEIGHT_EDGES, OBV_WEIGHTS=OBV_WEIGHTS,
+                          OBV_TP_EDGES=OBV_TP_EDGES, OBV_TP_RATIOS=OBV_TP_RATIOS)),
+    logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+
 # 계좌 관련
-account_balance = INITIALBALANCE
-initial_capital = Decimal("0")
-CAPITAL_FILE = "initial_capital.json"
+balance_cache = BalanceCache(SETTLE)
+CAPITAL_FILE = os.environ.get("CAPITAL_FILE", "initial_capital.json")
 last_no_position_time = 0
 
-# 포지션 상태
-position_state = {
-    SYMBOL: {
-        "long": {"size": Decimal("0"), "entry_price": Decimal("0")},
-        "short": {"size": Decimal("0"), "entry_price": Decimal("0")}
-    }
-}
-
 # TP 관련
 tp_gap_min = TPMIN
 tp_gap_max = TPMAX
@@ -157,40 +333,57 @@ last_tp_hash = ""
 last_adjusted_obv = 0
 tp_order_hash = {}
 
-# 평단 TP 주문 ID
-average_tp_orders = {
-    SYMBOL: {"long": None, "short": None}
-}
-
 # 그리드 주문 추적
 grid_orders = {SYMBOL: {"long": [], "short": []}}
-
-# 최대 포지션 잠금
-max_position_locked = {"long": False, "short": False}
+ladder_bases = {"long": 0, "short": 0}      # 마지막 래더 배치의 방향별 기준 계약 수 (설정 교체 시 재배치 기준)
 
 # OBV MACD 관련
-obv_macd_value = Decimal("0")
 kline_history = deque(maxlen=200)
 
+# 변동성 관련
+volatility_tracker = VolatilityTracker(atr_period=ATR_PERIOD, rv_window=RV_WINDOW)
+tp_vol_model = VolatilityTPModel(TP_VOL_MIN, TP_VOL_MAX, atr_multiplier=TP_ATR_MULTIPLIER, hysteresis=TP_VOL_HYSTERESIS)
+
 # 아이들 진입 관련
-idle_entry_in_progress = False
 last_idle_entry_time = 0
-last_idle_check = 0
 idle_entry_count = 0
 
 # 이벤트 타임 트래킹
 last_event_time = 0
 last_grid_time = 0
 
+# 데드라인 타이머 (아이들 만료 / 리밸런싱 구간 / 오래된 주문 / 캔들 조회 / 평단 TP 확인)
+timers = TimerWheel(logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+
 # 주문 관련
 pending_orders = deque(maxlen=100)
-order_sequence_id = 0
+order_registry = OrderRegistry(max_age=86400)
+open_order_index = OpenOrderIndex()
+processed_finished_orders = BoundedSet(1000)     # 중복 처리 방지 (WS 재전송/백필)
+processed_trade_ids = BoundedSet(1000)
+recent_trades = deque(maxlen=200)
+lot_ledger = LotLedger(match=LOT_MATCH_MODE, logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+
+# 시세
+last_price = 0.0
+order_book = LocalOrderBook(SYMBOL)
+order_book_resync_lock = TimedLock("order_book_resync_lock")
+
+# 손익/자산 (마크 가격 틱 + 체결 + 펀딩 + 포지션 동기화로 증분 갱신)
+pnl_engine = PnlEngine(contract_multiplier=CONTRACT_MULTIPLIER)
+
+def on_position_synced(old, new, changed):
+    for side in ("long", "short"):
+        pnl_engine.on_position(side, new.size(side) / CONTRACT_MULTIPLIER, new.entry(side))
+
+state.subscribe(on_position_synced, fields=("long_size", "long_entry", "short_size", "short_entry"))
 
 
 # =============================================================================
 # Initial Capital 저장/로드 함수
 # =============================================================================
 def save_initial_capital():
+    initial_capital = state.snapshot.initial_capital
     try:
         data = {
             "initial_capital": str(initial_capital),
@@ -204,7 +397,6 @@ def save_initial_capital():
         log("❌ SAVE", f"Failed to save capital: {e}")
 
 def load_initial_capital():
-    global initial_capital
     try:
         if os.path.exists(CAPITAL_FILE):
             with open(CAPITAL_FILE, 'r') as f:
@@ -214,11 +406,11 @@ def load_initial_capital():
             saved_symbol = data.get("symbol", "")
             
             if saved_symbol == SYMBOL and loaded_capital > 0:
-                initial_capital = loaded_capital
+                state.update("load_capital", initial_capital=loaded_capital)
                 # 저장된 시간도 로깅에 포함하면 좋음
                 saved_ts = data.get("timestamp", 0)
                 saved_time = datetime.fromtimestamp(saved_ts).strftime("%Y-%m-%d %H:%M:%S") if saved_ts else "?"
-                log("📂 LOAD", f"Initial Capital loaded: {initial_capital:.2f} USDT (Saved: {saved_time})")
+                log("📂 LOAD", f"Initial Capital loaded: {loaded_capital:.2f} USDT (Saved: {saved_time})")
                 return True
             else:
                 log("⚠️ LOAD", "Invalid saved data (symbol mismatch or zero capital)")
@@ -231,23 +423,58 @@ def load_initial_capital():
         return False
 
 # =============================================================================
-# 주문 ID 생성
+# 잔고 캐시 (futures.balances 스트림 + REST 보정)
 # =============================================================================
-def generate_order_id():
-    global order_sequence_id
-    order_sequence_id += 1
-    timestamp = int(time.time() * 1000)
-    unique_id = f"t-{timestamp}_{order_sequence_id}"
-    return unique_id
+def on_balance_update(snapshot):
+    pnl_engine.on_wallet(snapshot.total)
+    if snapshot.available > 0:
+        state.update("balance", account_balance=snapshot.available)
+
+def reconcile_balance():
+    """ REST로 잔고/증거금/미실현손익 전체 보정 → 스냅샷 (실패 시 None) """
+    try:
+        futures_account = api.list_futures_accounts(SETTLE)
+        if futures_account:
+            return balance_cache.apply_rest(futures_account)
+    except Exception as e:
+        log("❌ BALANCE", f"Reconcile error: {e}")
+    return None
+
+def settled_funding_rate(settled_at):
+    """ 방금 정산된 펀딩비율 (이력 최신 1건). 정산 시각이 안 맞거나 조회 실패면 None → 계정 합계만 기록 """
+    try:
+        history = api.list_futures_funding_rate_history(SETTLE, SYMBOL, limit=1)
+    except Exception as e:
+        log("❌ FUNDING", f"Funding rate lookup error: {e}")
+        return None
+    if not history or abs(float(history[0].t) - settled_at) > FUNDING_RATE_MATCH_WINDOW:
+        return None
+    return float(history[0].r)
+
+def balance_reads():
+    """ 잔고 캐시가 BALANCE_MAX_AGE보다 오래됐을 때만 계획에 잔고 조회 추가 """
+    return (READ_ACCOUNT,) if balance_cache.age() > BALANCE_MAX_AGE else ()
+
+def get_sizing_balance():
+    """ 수량 계산용 가용 잔고. 캐시가 BALANCE_MAX_AGE보다 오래되면 REST로 먼저 보정 """
+    if balance_cache.age() > BALANCE_MAX_AGE:
+        reconcile_balance()
+    return state.snapshot.account_balance
+
+balance_cache.on_update(on_balance_update)
 
 # =============================================================================
-# 로그
+# 주문 ID 생성
 # =============================================================================
-def log(tag, msg):
-    if tag == "divider":
-        logger.info(msg)
-    else:
-        logger.info(f"[{tag}] {msg}")
+def generate_order_id(intent=INTENT_UNKNOWN, side=None, expected_size=0):
+    """ 주문 text 생성 + 의도 레지스트리 등록 (스레드 안전) """
+    return order_registry.next_text(intent, side, expected_size)
+
+grid_ladder = GridLadder(api, SETTLE, SYMBOL, grid_orders[SYMBOL], generate_order_id, INTENT_GRID_LEVEL,
+                         GRID_PRICE_TICK, logger=log)
+order_hygiene = OrderHygiene(api, SETTLE, SYMBOL, open_order_index, timers, logger=log,
+                             heartbeat_timeout=DEADMAN_TIMEOUT, heartbeat_interval=DEADMAN_INTERVAL,
+                             stale_seconds=STALE_ORDER_SECONDS, debounce=HYGIENE_DEBOUNCE)
 
 def log_divider(char="=", length=80):
     logger.info(char * length)
@@ -258,40 +485,27 @@ def log_event_header(event_name):
     log_divider("-")
 
 def get_main_side():
-    try:
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
-        
-        if long_size > short_size:
-            return "long"
-        elif short_size > long_size:
-            return "short"
-        else:
-            return "none"
-    except:
-        return "none"
+    return state.snapshot.main_side
 
 def log_position_state():
-    with position_lock:
-        long_size = position_state[SYMBOL]["long"]["size"]
-        long_price = position_state[SYMBOL]["long"]["entry_price"]
-        short_size = position_state[SYMBOL]["short"]["size"]
-        short_price = position_state[SYMBOL]["short"]["entry_price"]
-   
-    with balance_lock:
-        balance = account_balance
-   
-    # ★ [수정] 가치 계산 시 multiplier 제거 (size가 이미 BNB 개수임)
-    long_value = long_price * long_size
-    short_value = short_price * short_size
-   
-    log("📊 POSITION", f"Long: {long_size} @ {long_price:.4f} (${long_value:.2f})")
-    log("📊 POSITION", f"Short: {short_size} @ {short_price:.4f} (${short_value:.2f})")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    snap = state.snapshot
+    long_size, short_size = snap.long_size, snap.short_size
+    pnl = pnl_engine.snapshot
+
+    # 가치/미실현 손익은 손익 엔진 값 (마크 가격 기준, 마크가 없으면 평단 기준)
+    for side, size in (("long", long_size), ("short", short_size)):
+        s = pnl.side(side)
+        log("📊 POSITION", "%s: %s @ %.4f ($%.2f, uPnL %.2f)", side.capitalize(), size, snap.entry(side),
+            pnl.value(side), s.unrealized, event="position", side=side, qty=size, price=snap.entry(side),
+            value=round(pnl.value(side), 4), upnl=round(s.unrealized, 4))
+    log("📊 EQUITY", "%.2f USDT (wallet %.2f, uPnL %.2f)", pnl.equity, pnl.wallet, pnl.unrealized,
+        event="equity", equity=round(pnl.equity, 4), upnl=round(pnl.unrealized, 4))
      
-    main = get_main_side()
+    main = "long" if long_size > short_size else "short" if short_size > long_size else "none"
     if main != "none":
-        log("📊 MAIN", f"{main.upper()} (더 큰 포지션)")
+        log("📊 MAIN", "%s (더 큰 포지션)", main.upper(), event="main_side", side=main)
 
 # =============================================================================
 # 포지션 동기화
@@ -306,12 +520,9 @@ def sync_position(max_retries=3, retry_delay=2):
         try:
             positions = api.list_positions(SETTLE)
             
-            with position_lock:
-                position_state[SYMBOL]["long"]["size"] = Decimal("0")
-                position_state[SYMBOL]["long"]["entry_price"] = Decimal("0")
-                position_state[SYMBOL]["short"]["size"] = Decimal("0")
-                position_state[SYMBOL]["short"]["entry_price"] = Decimal("0")
-            
+            # 양방향을 모두 계산한 뒤 한 번에 발행 (중간 상태 노출 없음)
+            fresh = {"long_size": Decimal("0"), "long_entry": Decimal("0"),
+                     "short_size": Decimal("0"), "short_entry": Decimal("0")}
             if positions:
                 for p in positions:
                     if p.contract == SYMBOL:
@@ -332,14 +543,13 @@ def sync_position(max_retries=3, retry_delay=2):
                              size_dec = Decimal(str(raw_size * 0.001))
 
                         if size_dec > 0:
-                            with position_lock:
-                                position_state[SYMBOL]["long"]["size"] = size_dec
-                                position_state[SYMBOL]["long"]["entry_price"] = entry_price
+                            fresh["long_size"] = size_dec
+                            fresh["long_entry"] = entry_price
                         elif size_dec < 0:
-                            with position_lock:
-                                position_state[SYMBOL]["short"]["size"] = abs(size_dec)
-                                position_state[SYMBOL]["short"]["entry_price"] = entry_price
+                            fresh["short_size"] = abs(size_dec)
+                            fresh["short_entry"] = entry_price
 
+            state.update("sync_position", **fresh)
             return True
            
         except Exception as e:
@@ -354,26 +564,36 @@ def sync_position(max_retries=3, retry_delay=2):
 # =============================================================================
 # 주문 취소
 # =============================================================================
-def cancel_all_orders():
+def cancel_orders_batched(orders):
+    """ BATCH_CANCEL_MAX건씩 배치 취소 (주문마다 왕복하지 않음) → 취소된 건수 """
+    cancelled = 0
+    for i in range(0, len(orders), BATCH_CANCEL_MAX):
+        chunk = orders[i:i + BATCH_CANCEL_MAX]
+        try:
+            results = api.cancel_batch_future_orders(SETTLE, [str(o.id) for o in chunk]) or []
+            failed = sum(1 for r in results
+                         if (r.get("succeeded") if isinstance(r, dict) else getattr(r, "succeeded", None)) is False)
+            cancelled += len(chunk) - failed
+        except Exception as e:
+            log("❌ CANCEL", "Batch cancel failed (%d): %s", len(chunk), e, event="cancel_error")
+    return cancelled
+
+def cancel_all_orders(keep_ladder=False):
+    """ keep_ladder=True 이면 래더 레벨 주문은 남겨둠 (다음 initialize_grid에서 차이만 조정) """
     try:
         orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
+        if keep_ladder:
+            orders = [o for o in orders or [] if grid_ladder.find(o.text)[1] is None]
         if not orders:
             return
         
         log("[❌ CANCEL]", f"Cancelling {len(orders)} orders...")
-        cancelled_count = 0
-        for order in orders:
-            try:
-                api.cancel_futures_order(SETTLE, order.id)
-                cancelled_count += 1
-                time.sleep(0.05)
-            except:
-                pass
-       
-        if SYMBOL in grid_orders:
-            grid_orders[SYMBOL] = {"long": [], "short": []}
-        if SYMBOL in average_tp_orders:
-            average_tp_orders[SYMBOL] = {"long": None, "short": None}
+        cancelled_count = cancel_orders_batched(orders)
+
+        if not keep_ladder:
+            grid_ladder.clear()
+        lot_ledger.release_tp(o.text for o in orders if o.is_reduce_only)
+        state.update("cancel_all", long_avg_tp_id=None, short_avg_tp_id=None)
        
         log("[✅ CANCEL]", f"{cancelled_count}/{len(orders)} orders cancelled")
        
@@ -390,114 +610,268 @@ def cancel_tp_only():
             return
        
         log("🗑️ TP", f"Cancelling {len(tp_orders)} TP orders")
-        for order in tp_orders:
-            try:
-                api.cancel_futures_order(SETTLE, order.id)
-                time.sleep(0.1)
-            except:
-                pass
+        cancel_orders_batched(tp_orders)
+        lot_ledger.release_tp(o.text for o in tp_orders)
     except Exception as e:
         log("❌", f"TP cancel error: {e}")
 
+def tp_orders_match(desired):
+    """ desired: [(size, price), ...] 가 현재 열린 TP 주문과 정확히 일치하는지 확인 """
+    try:
+        if not desired:
+            return False
+        orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
+        current = sorted((int(o.size), Decimal(str(o.price))) for o in orders if o.is_reduce_only)
+        return current == sorted((int(sz), Decimal(str(p))) for sz, p in desired)
+    except Exception as e:
+        log("⚠️ TP", f"TP compare error: {e}")
+        return False
+
 # ============================================================================
 # TP 새로고침 (동적 TP) - 계약 수 변환 로직 적용
 # ============================================================================
+def position_contracts(snap, side):
+    """ 스냅샷 포지션(코인 수량) → 계약 수 (평단이 없으면 0) """
+    return int(snap.size(side) / CONTRACT_MULTIPLIER) if snap.entry(side) > 0 else 0
+
+def reconcile_lots(snap=None, force=False):
+    """ 로트 원장을 거래소 포지션에 맞춤 (최근 체결 직후에는 체결 이벤트를 기다리며 보류) """
+    if not force and time.time() - lot_ledger.last_fill < LOT_RECONCILE_GRACE:
+        return
+    snap = snap or state.snapshot
+    for side in ("long", "short"):
+        lot_ledger.reconcile(side, position_contracts(snap, side), snap.entry(side))
+
+def compute_tp_targets(snap):
+    """
+    스냅샷 기준 목표 TP → {side: [(부호 포함 계약 수, 가격, 로트 id 튜플), ...]} (포지션 없는 방향은 제외)
+    로트 원장이 해당 방향 포지션과 일치하면 로트별 TP(가격 구간 묶음), 아니면 평단 TP 한 건 (로트 튜플 비움)
+    """
+    cfg = strategy_config.snapshot
+    tp_result = calculate_dynamic_tp_gap()
+    if isinstance(tp_result, (tuple, list)) and len(tp_result) >= 2:
+        long_tp_ratio = tp_result[0]
+        short_tp_ratio = tp_result[1]
+    else:
+        long_tp_ratio = cfg.TPMIN
+        short_tp_ratio = cfg.TPMIN
+
+    if not isinstance(long_tp_ratio, Decimal): long_tp_ratio = Decimal(str(long_tp_ratio))
+    if not isinstance(short_tp_ratio, Decimal): short_tp_ratio = Decimal(str(short_tp_ratio))
+
+    # 호가를 가로지르지 않도록 최우선 호가 바깥에 배치 (메이커 유지)
+    touch_sell = maker_price(-1)
+    touch_buy = maker_price(1)
+
+    targets = {}
+    for side, ratio in (("long", long_tp_ratio), ("short", short_tp_ratio)):
+        contracts = position_contracts(snap, side)
+        if contracts <= 0:
+            continue
+        if ENABLE_LOT_TP and lot_ledger.matches(side, contracts):
+            planned = lot_ledger.plan_tp(side, ratio, cfg.LOT_TP_BUCKET, GRID_PRICE_TICK, cfg.LOT_TP_MAX_ORDERS)
+        else:
+            # 목표 TP 계산 (가격/계약 수)
+            sign = Decimal("1") if side == "long" else Decimal("-1")
+            price = (snap.entry(side) * (Decimal("1") + sign * ratio)).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
+            planned = [(-contracts if side == "long" else contracts, price, ())]
+
+        # 호가 보정 후 같은 가격이 된 주문은 하나로 합침
+        merged = {}
+        for qty, price, lots in planned:
+            if side == "long" and touch_sell is not None and price < Decimal(str(touch_sell)):
+                price = Decimal(str(touch_sell))
+            if side == "short" and touch_buy is not None and price > Decimal(str(touch_buy)):
+                price = Decimal(str(touch_buy))
+            prev_qty, prev_lots = merged.get(price, (0, ()))
+            merged[price] = (prev_qty + qty, prev_lots + lots)
+        targets[side] = [(qty, price, lots) for price, (qty, lots) in merged.items()]
+    return targets
+
+def place_tp_orders(targets):
+    """ 목표 TP 주문을 배치 생성 (최대 BATCH_CREATE_MAX건/요청) → 로트 TP는 주문 text에 로트 배정 """
+    legs = [(side, qty, price, lots) for side, orders in targets.items() for qty, price, lots in orders]
+    for i in range(0, len(legs), BATCH_CREATE_MAX):
+        chunk = legs[i:i + BATCH_CREATE_MAX]
+        orders = [FuturesOrder(contract=SYMBOL, size=str(qty), price=str(price), tif="gtc", reduce_only=True,
+                               text=generate_order_id(INTENT_TP, side, qty))
+                  for side, qty, price, _ in chunk]
+        started = time.perf_counter()
+        try:
+            responses = api.create_batch_futures_order(SETTLE, orders) or []
+        except Exception as e:
+            log("❌ TP FAIL", "Batch create failed (%d): %s", len(orders), e, event="tp_order_error")
+            continue
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        for (side, qty, price, lots), order, resp in zip(chunk, orders, responses):
+            if getattr(resp, "succeeded", False):
+                if lots:
+                    lot_ledger.assign_tp(order.text, side, lots)
+                log(f"✅ TP {side.upper()}", "Qty: %d (Contract), Price: %.4f, Lots: %d", abs(qty), price, len(lots),
+                    event="tp_order", side=side, qty=abs(qty), price=price, lots=len(lots), latency_ms=latency_ms)
+            else:
+                log(f"❌ TP {side.upper()} FAIL", "Qty: %d, Error: %s", abs(qty),
+                    getattr(resp, "label", None) or getattr(resp, "detail", None),
+                    event="tp_order_error", side=side, qty=abs(qty))
+
 def refresh_all_tp_orders():
     try:
-        sync_position()
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
-            long_entry_price = position_state[SYMBOL]["long"]["entry_price"]
-            short_entry_price = position_state[SYMBOL]["short"]["entry_price"]
-       
-        if long_size == 0 and short_size == 0:
-            return
-       
-        tp_result = calculate_dynamic_tp_gap()
-        if isinstance(tp_result, (tuple, list)) and len(tp_result) >= 2:
-            long_tp_ratio = tp_result[0]
-            short_tp_ratio = tp_result[1]
-        else:
-            long_tp_ratio = TPMIN
-            short_tp_ratio = TPMIN
-            
-        if not isinstance(long_tp_ratio, Decimal): long_tp_ratio = Decimal(str(long_tp_ratio))
-        if not isinstance(short_tp_ratio, Decimal): short_tp_ratio = Decimal(str(short_tp_ratio))
+        with api.plan("tp_refresh", prefetch=(READ_POSITIONS, READ_OPEN_ORDERS)):
+            sync_position()
+            snap = state.snapshot
        
-        cancel_tp_only()
-        time.sleep(1.0)
-        
-        contract_multiplier = Decimal("0.001")
+            if snap.is_flat:
+                return
 
-        # --- LONG TP 설정 ---
-        if long_size > 0 and long_entry_price > 0:
-            tp_price_long = long_entry_price * (Decimal("1") + long_tp_ratio)
-            tp_price_long = tp_price_long.quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
-            
-            # ★ [수정] 무조건 0.001로 나누어 계약 수 변환
-            long_qty_contract = int(long_size / contract_multiplier)
-
-            if long_qty_contract > 0:
-                try:
-                    order = FuturesOrder(
-                        contract=SYMBOL,
-                        size=str(-long_qty_contract), # 음수 (매도)
-                        price=str(tp_price_long),
-                        tif="gtc",
-                        reduce_only=True,
-                        text=generate_order_id()
-                    )
-                    api.create_futures_order(SETTLE, order)
-                    log("✅ TP LONG", f"Qty: {long_qty_contract} (Contract), Price: {float(tp_price_long):.4f}")
-                except Exception as e:
-                    log("❌ TP LONG FAIL", f"Qty: {long_qty_contract}, Error: {e}")
-        
-        time.sleep(0.5)
-       
-        # --- SHORT TP 설정 ---
-        if short_size > 0 and short_entry_price > 0:
-            tp_price_short = short_entry_price * (Decimal("1") - short_tp_ratio)
-            tp_price_short = tp_price_short.quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
-            
-            # ★ [수정] 무조건 0.001로 나누어 계약 수 변환
-            short_qty_contract = int(short_size / contract_multiplier)
-
-            if short_qty_contract > 0:
-                try:
-                    order = FuturesOrder(
-                        contract=SYMBOL,
-                        size=str(short_qty_contract), # 양수 (매수)
-                        price=str(tp_price_short),
-                        tif="gtc",
-                        reduce_only=True,
-                        text=generate_order_id()
-                    )
-                    api.create_futures_order(SETTLE, order)
-                    log("✅ TP SHORT", f"Qty: {short_qty_contract} (Contract), Price: {float(tp_price_short):.4f}")
-                except Exception as e:
-                    log("❌ TP SHORT FAIL", f"Qty: {short_qty_contract}, Error: {e}")
+            reconcile_lots(snap)
+            targets = compute_tp_targets(snap)
+
+            # ★ 변동성/포지션 변화가 없으면 기존 TP 유지 (재주문 생략)
+            if tp_orders_match([(qty, price) for orders in targets.values() for qty, price, _ in orders]):
+                log("⏸️ TP", "TP unchanged → skip re-pricing")
+                return
+
+            cancel_tp_only()
+            time.sleep(1.0)
+
+            place_tp_orders(targets)
        
-        log("✅ TP", "TP refresh process completed")
+            log("✅ TP", "TP refresh process completed")
         
     except Exception as e:
         log("❌ TP REFRESH", f"Critical Error: {e}")
 
+def reprice_tp_orders(reason):
+    """
+    OBV 신호 변화 → 목표 가격이 달라진 TP 주문만 가격 amend (수량/주문 ID 유지, 취소/재생성 없음)
+    로트 묶음이 달라져 기존 주문과 대응되지 않으면 전체 TP 새로고침
+    """
+    snap = state.snapshot
+    if snap.is_flat:
+        return
+    targets = compute_tp_targets(snap)
+    by_lots = {(side, lots): price for side, orders in targets.items() for _, price, lots in orders}
+    amended = unmatched = 0
+    for o in open_order_index.tp_orders():
+        entry = order_registry.resolve(o["text"])
+        if entry is None or entry.intent != INTENT_TP:
+            continue
+        side = "long" if o["size"] < 0 else "short"
+        price = by_lots.get((side, lot_ledger.tp_lots(o["text"]) or ()))
+        if price is None:
+            unmatched += 1
+            continue
+        if Decimal(o["price"]) == price:
+            continue
+        try:
+            started = time.perf_counter()
+            api.amend_futures_order(SETTLE, str(o["id"]), FuturesOrderAmendment(price=str(price)))
+            amended += 1
+            log("🔁 TP REPRICE", "%s %s → %s (%s)", side.upper(), o["price"], price, reason,
+                event="tp_reprice", side=side, old_price=o["price"], price=price, reason=reason,
+                latency_ms=round((time.perf_counter() - started) * 1000, 2))
+        except Exception as e:
+            log("❌ TP REPRICE", "%s amend error: %s", side.upper(), e, event="tp_reprice_error", side=side)
+    if unmatched:
+        log("🔁 TP REPRICE", "%d TP orders no longer match lot groups (%s) → refresh", unmatched, reason,
+            event="tp_reprice_regroup", unmatched=unmatched, reason=reason)
+        refresh_all_tp_orders()
+    elif not amended:
+        log("⏸️ TP", "OBV signal (%s) → TP prices unchanged", reason, event="tp_reprice_skip", reason=reason)
+
+# OBV 갱신 → 구간 경계(히스테리시스) / 임계값 변화일 때만 TP 재가격 (최소 간격 내 트리거는 합침)
+obv_signal_gate = ObvSignalGate({"weight": OBV_WEIGHT_EDGES, "tp_gap": OBV_TP_EDGES},
+                                hysteresis=OBV_BUCKET_HYSTERESIS, threshold=float(OBV_CHANGE_THRESHOLD) * 100)
+tp_reprice_trigger = CoalescingTrigger(reprice_tp_orders, min_interval=TP_REPRICE_MIN_INTERVAL,
+                                       name="tp-reprice", logger=lambda tag, msg, *args, **fields: log(tag, msg, *args, **fields))
+
+def on_obv_changed(old, new, changed):
+    global last_adjusted_obv
+    reason = obv_signal_gate.evaluate(float(new.obv_macd) * 100)
+    if reason is None:
+        return
+    last_adjusted_obv = new.obv_macd
+    if not new.is_flat:
+        tp_reprice_trigger.fire(reason)
+
+state.subscribe(on_obv_changed, fields=("obv_macd",))
+
 # =============================================================================
-# 수량 계산 함수
+# 설정 교체 → 파생 값 재계산 (바뀐 필드에 해당하는 부분만)
 # =============================================================================
-def calculate_obv_macd_weight(obv_value):
-    obv_abs = abs(obv_value)
-    if obv_abs < 20: multiplier = Decimal("1.1")
-    elif obv_abs < 30: multiplier = Decimal("1.2")
-    elif obv_abs < 40: multiplier = Decimal("1.3")
-    elif obv_abs < 50: multiplier = Decimal("1.4")
-    elif obv_abs < 60: multiplier = Decimal("1.5")
-    elif obv_abs < 70: multiplier = Decimal("1.6")
-    elif obv_abs < 100: multiplier = Decimal("1.8")
-    else: multiplier = Decimal("2.0")
-    return multiplier
+TP_CONFIG_FIELDS = ("TPMIN", "TPMAX", "TP_VOL_MIN", "TP_VOL_MAX", "TP_ATR_MULTIPLIER", "TP_VOL_HYSTERESIS",
+                    "OBV_TP_EDGES", "OBV_TP_RATIOS", "LOT_TP_BUCKET", "LOT_TP_MAX_ORDERS")
+LADDER_CONFIG_FIELDS = ("GRID_LEVELS", "GRID_SPACING", "GRID_SIZE_GROWTH")
+
+def on_risk_config_changed(old, new, changed):
+    risk_gate.side_ratio = float(new.MAXPOSITIONRATIO)
+    risk_gate.gross_ratio = float(new.MAX_GROSS_POSITION_RATIO)
+    risk_gate.rate_limit = new.ORDER_RATE_LIMIT
+    if "MAXPOSITIONRATIO" in changed:
+        # 최대 포지션 잠금/해제는 불변식 엔진 스레드에서 (fix가 주문 취소를 할 수 있으므로 호출 스레드를 막지 않음)
+        invariant_engine.mark_changed("balance")
+
+def on_signal_config_changed(old, new, changed):
+    obv_signal_gate.bucket_edges = {"weight": new.OBV_WEIGHT_EDGES, "tp_gap": new.OBV_TP_EDGES}
+    obv_signal_gate.hysteresis = new.OBV_BUCKET_HYSTERESIS
+    obv_signal_gate.threshold = float(new.OBV_CHANGE_THRESHOLD) * 100
+    tp_reprice_trigger.min_interval = new.TP_REPRICE_MIN_INTERVAL
+
+def on_tp_config_changed(old, new, changed):
+    """ TP 갭 입력이 바뀜 → 변동성 모델 갱신(이전 갭 기준 히스테리시스 해제) 후 열린 TP 재가격 """
+    tp_vol_model.tp_min = new.TP_VOL_MIN
+    tp_vol_model.tp_max = new.TP_VOL_MAX
+    tp_vol_model.atr_multiplier = new.TP_ATR_MULTIPLIER
+    tp_vol_model.hysteresis = new.TP_VOL_HYSTERESIS
+    tp_vol_model.current_gap = None
+    if not state.snapshot.is_flat:
+        tp_reprice_trigger.fire("config")
+
+def on_timer_config_changed(old, new, changed):
+    if timers.remaining("idle_entry") is not None:
+        arm_idle_timer()
+    if "REBALANCE_SECONDS" in changed and last_no_position_time:
+        arm_rebalance_timer()
+
+def resync_ladder():
+    """ 래더 설정 교체 → 마지막 기준 수량으로 목표 래더를 다시 계산해 차이만 반영 (레벨이 있는 방향만) """
+    if not (grid_ladder.levels("long") or grid_ladder.levels("short")):
+        return
+    price = get_current_price()
+    if price <= 0:
+        return
+    cfg, snap = strategy_config.snapshot, state.snapshot
+    targets = grid_ladder.plan(price,
+                               0 if snap.long_locked else ladder_bases["long"],
+                               0 if snap.short_locked else ladder_bases["short"],
+                               cfg.GRID_LEVELS, cfg.GRID_SPACING, cfg.GRID_SIZE_GROWTH)
+    grid_ladder.sync({side: target for side, target in targets.items() if grid_ladder.levels(side)})
+
+strategy_config.subscribe(on_risk_config_changed, fields=("MAXPOSITIONRATIO", "MAX_GROSS_POSITION_RATIO",
+                                                          "ORDER_RATE_LIMIT"))
+strategy_config.subscribe(on_signal_config_changed, fields=("OBV_WEIGHT_EDGES", "OBV_TP_EDGES", "OBV_BUCKET_HYSTERESIS",
+                                                            "OBV_CHANGE_THRESHOLD", "TP_REPRICE_MIN_INTERVAL"))
+strategy_config.subscribe(on_tp_config_changed, fields=TP_CONFIG_FIELDS)
+strategy_config.subscribe(on_timer_config_changed, fields=("IDLE_TIME_SECONDS", "IDLE_ENTRY_COOLDOWN",
+                                                           "IDLE_RECHECK_SECONDS", "REBALANCE_SECONDS"))
+if recorder is not None:
+    # 교체된 필드를 기록 → 재생 시 같은 시점에 같은 설정으로 (출처 무관: 파일/엔드포인트)
+    strategy_config.subscribe(lambda old, new, changed: recorder.record(
+        "config", new.source, {k: v for k, v in new.to_dict().items() if k in changed}))
+# 래더 재배치는 REST 호출이 있으므로 타이머 스레드에서 (설정을 바꾼 요청/감시 스레드를 막지 않음)
+strategy_config.subscribe(lambda old, new, changed: ENABLE_GRID_LADDER and timers.schedule("ladder_resync", 0, resync_ladder),
+                          fields=LADDER_CONFIG_FIELDS)
+
+def watch_strategy_config():
+    """ 설정 파일 mtime 확인 → 바뀌었으면 다시 적용 (검증 실패 시 기존 설정 유지). CONFIG_WATCH_INTERVAL마다 """
+    try:
+        strategy_config.reload_if_changed()
+    finally:
+        timers.schedule("config_watch", CONFIG_WATCH_INTERVAL, watch_strategy_config)
 
+# =============================================================================
+# 수량 계산 함수
+# =============================================================================
 def safe_order_qty(qty, min_qty=MIN_QUANTITY):
     try:
         qty_float = float(qty)
@@ -519,10 +893,18 @@ def adjust_quantity_step(qty, step=QUANTITY_STEP, min_qty=MIN_QUANTITY):
 def calculate_grid_qty():
     return MIN_QUANTITY
 
+def get_cached_price():
+    """ 티커 스트림 가격 (PRICE_MAX_AGE 이내), 없으면 REST 조회 """
+    ticker = ws_manager.subscriptions.get("futures.tickers")
+    if last_price > 0 and ticker and time.time() - ticker.stats.last_message_at < PRICE_MAX_AGE:
+        return Decimal(str(last_price))
+    return get_current_price()
+
 def get_current_price():
     try:
         ticker = api.list_futures_tickers(SETTLE, contract=SYMBOL)
         if ticker and len(ticker) > 0 and ticker[0].last:
+            risk_ledger.on_price(float(ticker[0].last))
             return Decimal(str(ticker[0].last))
         return Decimal("0")
     except Exception as e:
@@ -533,15 +915,16 @@ def get_current_price():
 # 리밸런싱 로직 (손실 가중치 + 계약 수 변환 적용)
 # =============================================================================
 def check_rebalancing_condition(tp_profit, current_loss):
+    """ tp_profit: TP 실현 손익, current_loss: 반대 방향 미실현 손실 (둘 다 손익 엔진 USDT 값) """
     global last_no_position_time
     try:
         if last_no_position_time == 0:
             return False
         elapsed = time.time() - last_no_position_time
-        if elapsed < REBALANCE_SECONDS:
+        if elapsed < strategy_config.snapshot.REBALANCE_SECONDS:
             return False
             
-        loss_threshold = current_loss * Decimal("0.8")
+        loss_threshold = current_loss * 0.8
         if tp_profit > loss_threshold:
             log("🔔 REBALANCE", f"Aggressive Condition met: TP {tp_profit:.2f} > Loss {current_loss:.2f}")
             return True
@@ -551,52 +934,34 @@ def check_rebalancing_condition(tp_profit, current_loss):
         return False
 
 def execute_rebalancing_sl():
+    """ 양방향 전량 청산: 한 번의 배치 요청으로 동시에 전송, 주문 이벤트로 완료 확인 """
     try:
-        sync_position()
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
-        if long_size == 0 and short_size == 0:
+        # 호출 측(TP 체결 처리)에서 방금 동기화한 로컬 포지션 사용
+        snap = state.snapshot
+        sides = [side for side in ("long", "short") if snap.size(side) > 0]
+        if not sides:
             return
         
-        contract_multiplier = Decimal("0.001")
-        
-        log("🔔 REBALANCE", "Executing SL market orders...")
-        if long_size > 0:
-            # ★ [수정] 무조건 0.001로 나누어 계약 수 변환
-            close_qty_contract = int(long_size / contract_multiplier)
-                
-            order = FuturesOrder(contract=SYMBOL, size=f"-{str(close_qty_contract)}", price="0", tif="ioc", reduce_only=True, text=generate_order_id())
-            api.create_futures_order(SETTLE, order)
-            log("✅ REBALANCE", f"LONG {close_qty_contract} (Contract) SL executed")
-        
-        time.sleep(0.3)
-        
-        if short_size > 0:
-            # ★ [수정] 무조건 0.001로 나누어 계약 수 변환
-            close_qty_contract = int(short_size / contract_multiplier)
-                
-            order = FuturesOrder(contract=SYMBOL, size=str(close_qty_contract), price="0", tif="ioc", reduce_only=True, text=generate_order_id())
-            api.create_futures_order(SETTLE, order)
-            log("✅ REBALANCE", f"SHORT {close_qty_contract} (Contract) SL executed")
-            
-        time.sleep(0.5)
+        log("🔔 REBALANCE", "Executing SL (flatten %s)...", "+".join(s.upper() for s in sides))
+        result = flattener.flatten(sides, INTENT_REBALANCE, timeout=FLATTEN_CONFIRM_TIMEOUT)
         sync_position()
-        log("✅ REBALANCE", "Complete!")
+        if result.confirmed:
+            log("✅ REBALANCE", "Complete! Flat in %.1fms", result.elapsed_ms, event="rebalance", latency_ms=result.elapsed_ms)
+        else:
+            log("⚠️ REBALANCE", "Incomplete after %.1fms: %s", result.elapsed_ms, "; ".join(result.errors),
+                event="rebalance", latency_ms=result.elapsed_ms)
     except Exception as e:
         log("❌ REBALANCE", f"Execution error: {e}")
 
 
 def handle_non_main_position_tp(non_main_size_at_tp):
     try:
-        sync_position()
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
+        # 호출 측(TP 체결 처리)에서 방금 동기화한 로컬 포지션 사용
+        snap = state.snapshot
+        long_size, short_size = snap.long_size, snap.short_size
         
         # ★ [수정] Tier 계산 기준을 '초기 자본금'으로 고정
-        with balance_lock:
-            capital = initial_capital if initial_capital > 0 else account_balance
+        capital = snap.capital
        
         if long_size > short_size:
             main_size = long_size
@@ -605,21 +970,15 @@ def handle_non_main_position_tp(non_main_size_at_tp):
             main_size = short_size
             main_side = "short"
        
-        current_price = get_current_price()
-        if current_price == 0: return
-       
-        # 가치 계산
-        main_position_value = Decimal(str(main_size)) * current_price
+        # 가치 계산 (손익 엔진 마크 가격 기준)
+        main_position_value = Decimal(str(pnl_engine.snapshot.value(main_side)))
+        if main_position_value == 0: return
         
         # Tier 로직
-        if main_position_value < capital * Decimal("1.0"): return
-       
-        if capital * Decimal("1.0") <= main_position_value < capital * Decimal("2.0"):
-            sl_qty = Decimal(str(non_main_size_at_tp)) * Decimal("0.8")
-            tier = "Tier-1 (0.8x)"
-        else:
-            sl_qty = Decimal(str(non_main_size_at_tp)) * Decimal("1.5")
-            tier = "Tier-2 (1.5x)"
+        cfg = strategy_config.snapshot
+        sl_qty, tier = calculate_tier_sl_qty(main_position_value, capital, non_main_size_at_tp,
+                                             cfg.TIER1_SL_FACTOR, cfg.TIER2_SL_FACTOR)
+        if sl_qty is None: return
        
         contract_multiplier = Decimal("0.001")
         
@@ -634,84 +993,160 @@ def handle_non_main_position_tp(non_main_size_at_tp):
        
         log("💊 TP HANDLER", f"{tier}: {non_main_size_at_tp} TP → {main_side.upper()} {sl_qty_contract} (C) SL")
         
-        order_size_str = f"-{str(sl_qty_contract)}" if main_side == "long" else str(sl_qty_contract)
-        order = FuturesOrder(contract=SYMBOL, size=order_size_str, price="0", tif="ioc", reduce_only=True, text=generate_order_id())
-        api.create_futures_order(SETTLE, order)
-        log("✅ TP HANDLER", f"{main_side.upper()} {sl_qty_contract} SL 완료!")
-        time.sleep(0.5)
+        result = flattener.reduce(main_side, sl_qty_contract, INTENT_TIER_SL, timeout=FLATTEN_CONFIRM_TIMEOUT)
+        if result.confirmed:
+            log("✅ TP HANDLER", "%s %d SL 완료! (%.1fms)", main_side.upper(), sl_qty_contract, result.elapsed_ms,
+                event="tier_sl", side=main_side, qty=sl_qty_contract, latency_ms=result.elapsed_ms)
+        else:
+            log("⚠️ TP HANDLER", "%s %d SL 미확인: %s", main_side.upper(), sl_qty_contract, "; ".join(result.errors),
+                event="tier_sl", side=main_side, qty=sl_qty_contract, latency_ms=result.elapsed_ms)
         sync_position()
     except Exception as e:
         log("❌ TP HANDLER", f"Error: {e}")
 
 def update_no_position_time():
     global last_no_position_time
-    with position_lock:
-        long_size = position_state[SYMBOL]["long"]["size"]
-        short_size = position_state[SYMBOL]["short"]["size"]
-    if long_size == 0 and short_size == 0:
+    if state.snapshot.is_flat:
         if last_no_position_time == 0:
             last_no_position_time = time.time()
             log("📊 NO POSITION", "Time recorded for rebalancing")
+            arm_rebalance_timer()
     else:
         last_no_position_time = 0
+        timers.cancel("rebalance_window")
+
+def arm_rebalance_timer():
+    timers.schedule_at("rebalance_window", last_no_position_time + strategy_config.snapshot.REBALANCE_SECONDS,
+                       on_rebalance_window_open)
+
+def on_rebalance_window_open():
+    """ 리밸런싱 대기 시간 경과 → 다음 TP 체결부터 리밸런싱 조건 검사 """
+    log("🔔 REBALANCE", "Rebalance window open (%.1fh since flat)", strategy_config.snapshot.REBALANCE_SECONDS / 3600,
+        event="rebalance_window_open")
 
 def update_event_time():
     global last_event_time, idle_entry_count
     last_event_time = time.time()
     idle_entry_count = 0
+    arm_idle_timer()
 
-def validate_strategy_consistency():
-    try:
-        sync_position()
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
-        current_price = get_current_price()
-        if current_price == 0: return
-        
-        try:
-            # 필터링 수정
-            all_orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
-            grid_count = sum(1 for o in all_orders if not o.is_reduce_only)
-        except: return
-        
-        single_position = (long_size > 0 or short_size > 0) and not (long_size > 0 and short_size > 0)
-        if single_position and grid_count == 0:
-            log("🔧 VALIDATE", "Single position without grids → Creating grids!")
-            initialize_grid(current_price)
-    except Exception as e:
-        log("❌", f"Validation error: {e}")
+def arm_idle_timer():
+    """ 아이들 만료(마지막 이벤트 + IDLE_TIME_SECONDS)와 진입 쿨다운 중 늦은 시각에 아이들 진입 검사 """
+    cfg = strategy_config.snapshot
+    due = max(last_event_time + cfg.IDLE_TIME_SECONDS, last_idle_entry_time + cfg.IDLE_ENTRY_COOLDOWN)
+    if due <= time.time():
+        due = time.time() + cfg.IDLE_RECHECK_SECONDS
+    timers.schedule_at("idle_entry", due, check_idle_and_enter)
 
-def remove_duplicate_orders():
+# =============================================================================
+# 진입 주문 실행 (메이커 우선)
+# =============================================================================
+def maker_price(order_size):
+    """ 매수(+)는 최우선 매수호가, 매도(-)는 최우선 매도호가. 호가창을 쓸 수 없으면 None """
+    if not ENABLE_MAKER_ORDERS or not order_book.is_usable():
+        return None
+    best_bid, best_ask = order_book.top()
+    return best_bid if order_size > 0 else best_ask
+
+def place_market_order(side, size, intent, reduce_only=False):
     try:
-        orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
-        seen_orders = {}
-        duplicates = []
-        for o in orders:
-            key = f"{o.size}_{o.price}_{o.is_reduce_only}"
-            if key in seen_orders: duplicates.append(o.id)
-            else: seen_orders[key] = o.id
-        for order_id in duplicates:
-            try:
-                api.cancel_futures_order(SETTLE, SYMBOL, order_id)
-                time.sleep(0.1)
-            except: pass
-    except: pass
+        order = FuturesOrder(contract=SYMBOL, size=str(size), price="0", tif="ioc", reduce_only=reduce_only,
+                             text=generate_order_id(intent, side, size))
+        started = time.perf_counter()
+        api.create_futures_order(SETTLE, order)
+        log("✅GRID", "%s %d (C) market", side, abs(size), event="grid_order", side=side, qty=abs(size), tif="ioc",
+            latency_ms=round((time.perf_counter() - started) * 1000, 2))
+    except Exception as e: log("❌", f"{side} grid error: {e}")
 
-def cancel_stale_orders():
-    try:
-        orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
-        now = time.time()
-        for o in orders:
-            if hasattr(o, 'create_time') and o.create_time:
-                order_age = now - float(o.create_time)
-                if order_age > 86400:
-                    api.cancel_futures_order(SETTLE, SYMBOL, o.id)
-                    time.sleep(0.1)
-    except: pass
+def place_entry_orders(legs, intent):
+    """
+    legs: [(side, 부호 포함 계약 수), ...]
+    호가창이 유효하면 최우선 호가에 post-only(poc)로 배치하고 MAKER_ENTRY_TIMEOUT 동안
+    주문 이벤트(레지스트리)로 체결을 확인. 남은 수량은 취소 후 시장가(IOC)로 보충합니다.
+    """
+    resting = []
+    for side, size in legs:
+        if size == 0: continue
+        price = maker_price(size)
+        if price is None:
+            place_market_order(side, size, intent)
+            continue
+        text = generate_order_id(intent, side, size)
+        try:
+            order = FuturesOrder(contract=SYMBOL, size=str(size), price=str(price), tif="poc",
+                                 reduce_only=False, text=text)
+            started = time.perf_counter()
+            created = api.create_futures_order(SETTLE, order)
+            log("✅GRID", "%s %d (C) maker @ %s", side, abs(size), price, event="grid_order", side=side,
+                qty=abs(size), price=price, tif="poc", latency_ms=round((time.perf_counter() - started) * 1000, 2))
+            resting.append((side, size, text, created.id))
+        except RiskRejected:
+            continue
+        except Exception as e:
+            log("⚠️ GRID", f"{side} maker rejected ({e}) → market")
+            place_market_order(side, size, intent)
+
+    deadline = time.time() + strategy_config.snapshot.MAKER_ENTRY_TIMEOUT
+    while resting and time.time() < deadline:
+        if all(order_registry.resolve(text).is_finished for _, _, text, _ in resting):
+            break
+        time.sleep(0.1)
+
+    for side, size, text, order_id in resting:
+        entry = order_registry.resolve(text)
+        if entry.is_finished and entry.filled_size == size:
+            continue
+        try:
+            cancelled = api.cancel_futures_order(SETTLE, str(order_id))
+            remaining = int(cancelled.left or 0)
+        except Exception:
+            # 이미 체결/종료된 경우 → 최종 상태 재조회
+            try: remaining = int(api.get_futures_order(SETTLE, str(order_id)).left or 0)
+            except Exception as e:
+                log("❌ GRID", f"{side} maker status unknown: {e}")
+                continue
+        if remaining != 0:
+            log("⏱️ GRID", "%s maker unfilled %d/%d → market", side, abs(remaining), abs(size),
+                event="maker_fallback", side=side, qty=abs(remaining))
+            place_market_order(side, remaining, intent)
 
-def initialize_grid(current_price=None):
-    global last_grid_time, initial_capital
+def compute_entry_sizing(snap, price, calc_basis):
+    """
+    initialize_grid 진입 수량 계산 (REST/주문 없음)
+    → (LONG 계약 수, SHORT 계약 수, OBV 배수, {"main_side", "loss_rate", "loss_multiplier", "idle_multiplier"})
+    """
+    cfg = strategy_config.snapshot
+    long_size, short_size = snap.long_size, snap.short_size
+    obv_display = float(snap.obv_macd) * 100
+
+    # --- 1. 손실 가중치 (LOSS_WEIGHT 배 적용) ---
+    main_side = "none"
+    if long_size > short_size: main_side = "long"
+    elif short_size > long_size: main_side = "short"
+    try:
+        pnl = pnl_engine.snapshot
+        if main_side != "none" and pnl.mark > 0:
+            loss_rate = Decimal(str(pnl.loss_rate(main_side)))
+            loss_multiplier = loss_rate_multiplier(loss_rate, cfg.LOSS_WEIGHT)
+        else:
+            loss_multiplier, loss_rate = calculate_loss_multiplier(main_side, price, snap.long_entry, snap.short_entry, cfg.LOSS_WEIGHT)
+    except Exception as e:
+        log("⚠️ QTY", f"Loss multiplier error: {e}")
+        loss_multiplier, loss_rate = Decimal("1.0"), 0
+
+    # --- 2. 아이들 시간 가중치 ---
+    idle_multiplier = calculate_idle_multiplier(idle_entry_count)
+
+    # --- 최종 수량 계산 (계약 수) ---
+    long_qty_contract, short_qty_contract, obv_multiplier = calculate_entry_contracts(
+        calc_basis, price, obv_display, loss_multiplier, idle_multiplier, cfg.BASERATIO,
+        cfg.OBV_WEIGHT_EDGES, cfg.OBV_WEIGHTS)
+    return long_qty_contract, short_qty_contract, obv_multiplier, {
+        "main_side": main_side, "loss_rate": loss_rate,
+        "loss_multiplier": loss_multiplier, "idle_multiplier": idle_multiplier}
+
+def initialize_grid(current_price=None, intent=INTENT_GRID_ENTRY):
+    global last_grid_time
     if not initialize_grid_lock.acquire(blocking=False):
         log("🔒 GRID", "Already running → skip")
         return
@@ -720,118 +1155,73 @@ def initialize_grid(current_price=None):
         if now - last_grid_time < 10:
             return
         last_grid_time = now
-        price = current_price if current_price and current_price > 0 else get_current_price()
-        if price == 0:
-            return
-
-        sync_position()
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
-
-        # 현재 잔고 읽기
-        with balance_lock:
-            current_balance = account_balance
-
-        # 🔁 수정 포인트: 완전 무포지션이면 초기 자본을 '현재 잔고'로 리셋
-        if long_size == 0 and short_size == 0:
-            # 완전 플랫 상태에서 새로 진입하는 시점 → 기준 자본 리셋
-            initial_capital = current_balance
-            save_initial_capital()
-            log("💾 INIT", f"Initial Capital RESET (flat) -> {initial_capital:.2f} USDT")
-        else:
-            # 아직 포지션이 남아 있는 상태에서 초기 자본이 0이면 안전장치로 1회만 설정
-            if initial_capital <= 0:
-                initial_capital = current_balance
-                save_initial_capital()
-                log("💾 INIT", f"Initial Capital set -> {initial_capital:.2f} USDT")
-
-        # 이후 로직은 그대로 유지
-        calc_basis = initial_capital if initial_capital > 0 else current_balance
-        base_value = Decimal(str(calc_basis)) * BASERATIO
-        base_qty_bnb = base_value / Decimal(str(price))
-        
-        log("💰 CALC BASIS", f"Using Capital: {calc_basis:.2f} USDT (Current: {current_balance:.2f})")
-        log("🔢 BASE QTY", f"{base_value:.2f} USDT → {base_qty_bnb:.6f} BNB")
-
-        obv_display = float(obv_macd_value) * 100
-        obv_multiplier = float(calculate_obv_macd_weight(obv_display))
-
-        # --- 1. 손실 가중치 (20배 적용) ---
-        loss_multiplier = Decimal("1.0")
-        try:
-            with position_lock:
-                long_entry = position_state[SYMBOL]["long"]["entry_price"]
-                short_entry = position_state[SYMBOL]["short"]["entry_price"]
-                
-            main_side = "none"
-            if long_size > short_size: main_side = "long"
-            elif short_size > long_size: main_side = "short"
-                
-            if main_side == "long" and price < long_entry:
-                loss_rate = (long_entry - price) / long_entry
-                loss_multiplier = Decimal("1.0") + (loss_rate * Decimal("20"))
-                log("📉 LOSS WEIGHT", f"Main(LONG) Loss {loss_rate*100:.2f}% -> Multiplier {loss_multiplier:.2f}")
-
-            elif main_side == "short" and price > short_entry:
-                loss_rate = (price - short_entry) / short_entry
-                loss_multiplier = Decimal("1.0") + (loss_rate * Decimal("20"))
-                log("📉 LOSS WEIGHT", f"Main(SHORT) Loss {loss_rate*100:.2f}% -> Multiplier {loss_multiplier:.2f}")
-                
-        except Exception as e:
-            log("⚠️ QTY", f"Loss multiplier error: {e}")
-            loss_multiplier = Decimal("1.0")
-
-        # --- 2. 아이들 시간 가중치 ---
-        idle_multiplier = Decimal("1.0")
-        if idle_entry_count > 1:
-            added_weight = Decimal(str((idle_entry_count - 1) * 0.1))
-            idle_multiplier = Decimal("1.0") + added_weight
-            if idle_multiplier > Decimal("2.0"): idle_multiplier = Decimal("2.0")
-            log("⏳ IDLE WEIGHT", f"Count {idle_entry_count} -> {idle_multiplier:.1f}x")
-
-        # --- 최종 수량 계산 ---
-        final_long_bnb = base_qty_bnb * loss_multiplier * idle_multiplier
-        final_short_bnb = base_qty_bnb * loss_multiplier * idle_multiplier
-
-        if obv_display > 0:
-            final_short_bnb *= Decimal(str(obv_multiplier))
-            log("📊 OBV", f"OBV > 0 → SHORT × {obv_multiplier:.2f}")
-        elif obv_display < 0:
-            final_long_bnb *= Decimal(str(obv_multiplier))
-            log("📊 OBV", f"OBV < 0 → LONG × {obv_multiplier:.2f}")
-
-        # ★ [수정] 계약 수 변환 (무조건 0.001로 나눔)
-        contract_multiplier = Decimal("0.001")
-        
-        long_qty_contract = int(final_long_bnb / contract_multiplier)
-        short_qty_contract = int(final_short_bnb / contract_multiplier)
-        
-        if long_qty_contract < 1: long_qty_contract = 1 
-        if short_qty_contract < 1: short_qty_contract = 1 
+        prefetch = (READ_POSITIONS,) + balance_reads() + (() if current_price and current_price > 0 else (READ_TICKER,))
+        with api.plan("initialize_grid", prefetch=prefetch):
+            price = current_price if current_price and current_price > 0 else get_current_price()
+            if price == 0:
+                return
 
-        log("🔢 CONTRACT QTY", f"L: {long_qty_contract} / S: {short_qty_contract} (C)")
+            sync_position()
+            snap = state.snapshot
+            long_size, short_size = snap.long_size, snap.short_size
 
-        # ★ 주문 실행
-        try:
-            order = FuturesOrder(contract=SYMBOL, size=str(long_qty_contract), price="0", tif="ioc", reduce_only=False, text=generate_order_id())
-            api.create_futures_order(SETTLE, order)
-            log("✅GRID", f"long {long_qty_contract} (C)")
-        except Exception as e: log("❌", f"long grid error: {e}")
+            # 현재 잔고 읽기 (오래된 캐시면 REST 보정)
+            current_balance = get_sizing_balance()
 
-        time.sleep(0.2)
-        
-        try:
-            order = FuturesOrder(contract=SYMBOL, size=f"-{str(short_qty_contract)}", price="0", tif="ioc", reduce_only=False, text=generate_order_id())
-            api.create_futures_order(SETTLE, order)
-            log("✅GRID", f"short {short_qty_contract} (C)")
-        except Exception as e: log("❌", f"short grid error: {e}")
-
-        log("✅ GRID", "Entry completed")
-        update_event_time()
-        time.sleep(1.0)
-        sync_position()
-        refresh_all_tp_orders()
+            # 🔁 수정 포인트: 완전 무포지션이면 초기 자본을 '현재 잔고'로 리셋
+            if long_size == 0 and short_size == 0:
+                # 완전 플랫 상태에서 새로 진입하는 시점 → 기준 자본 리셋
+                snap = state.update("grid_reset_capital", initial_capital=current_balance)
+                save_initial_capital()
+                log("💾 INIT", f"Initial Capital RESET (flat) -> {current_balance:.2f} USDT")
+            elif snap.initial_capital <= 0:
+                # 아직 포지션이 남아 있는 상태에서 초기 자본이 0이면 안전장치로 1회만 설정
+                snap = state.update("grid_set_capital", initial_capital=current_balance)
+                save_initial_capital()
+                log("💾 INIT", f"Initial Capital set -> {current_balance:.2f} USDT")
+
+            # 이후 로직은 그대로 유지
+            calc_basis = snap.initial_capital if snap.initial_capital > 0 else current_balance
+            log("💰 CALC BASIS", f"Using Capital: {calc_basis:.2f} USDT (Current: {current_balance:.2f})")
+
+            obv_display = float(snap.obv_macd) * 100
+            long_qty_contract, short_qty_contract, obv_multiplier, sizing = compute_entry_sizing(snap, price, calc_basis)
+            if sizing["loss_rate"] > 0:
+                log("📉 LOSS WEIGHT", f"Main({sizing['main_side'].upper()}) Loss {sizing['loss_rate']*100:.2f}% -> Multiplier {sizing['loss_multiplier']:.2f}")
+            if sizing["idle_multiplier"] > Decimal("1.0"):
+                log("⏳ IDLE WEIGHT", f"Count {idle_entry_count} -> {sizing['idle_multiplier']:.1f}x")
+
+            if obv_display > 0:
+                log("📊 OBV", f"OBV > 0 → SHORT × {obv_multiplier:.2f}")
+            elif obv_display < 0:
+                log("📊 OBV", f"OBV < 0 → LONG × {obv_multiplier:.2f}")
+
+            log("🔢 CONTRACT QTY", f"L: {long_qty_contract} / S: {short_qty_contract} (C)")
+
+            legs = [("long", long_qty_contract), ("short", -short_qty_contract)]
+            if ENABLE_GRID_LADDER and intent == INTENT_IDLE_ENTRY:
+                # 포지션과 래더가 이미 있는 방향은 시장가 추가 대신 래더 재정렬만
+                held = {"long": long_size > 0, "short": short_size > 0}
+                legs = [(side, size) for side, size in legs if not (held[side] and grid_ladder.levels(side))]
+
+            # ★ 주문 실행 (메이커 우선, 미체결분 시장가)
+            place_entry_orders(legs, intent)
+
+            if ENABLE_GRID_LADDER:
+                ladder_bases.update(long=long_qty_contract, short=short_qty_contract)
+                cfg = strategy_config.snapshot
+                targets = grid_ladder.plan(
+                    price,
+                    0 if snap.long_locked else long_qty_contract,
+                    0 if snap.short_locked else short_qty_contract,
+                    cfg.GRID_LEVELS, cfg.GRID_SPACING, cfg.GRID_SIZE_GROWTH)
+                grid_ladder.sync(targets)
+
+            log("✅ GRID", "Entry completed")
+            update_event_time()
+            time.sleep(1.0)
+            sync_position()
+            refresh_all_tp_orders()
 
     except Exception as e:
         log("❌ GRID", f"Init error: {e}")
@@ -840,270 +1230,419 @@ def initialize_grid(current_price=None):
 
 def full_refresh(event_type, skip_grid=False):
     log_event_header(f"FULL REFRESH: {event_type}")
-    log("🔄 SYNC", "Syncing position...")
-    sync_position()
-    update_no_position_time()
-    log_position_state()
-    cancel_all_orders()
-    time.sleep(0.5)
-    if not skip_grid:
-        current_price = get_current_price()
-        if current_price > 0:
-            initialize_grid(current_price)
-    refresh_all_tp_orders()
-    sync_position()
-    log_position_state()
+    # 포지션/열린 주문/현재가(/잔고) 조회를 동시에 시작 → 아래 단계는 같은 결과를 재사용 (취소/주문 후에는 새로 조회)
+    prefetch = (READ_POSITIONS, READ_OPEN_ORDERS) + (() if skip_grid else (READ_TICKER,) + balance_reads())
+    with api.plan(f"full_refresh:{event_type}", prefetch=prefetch):
+        log("🔄 SYNC", "Syncing position...")
+        sync_position()
+        update_no_position_time()
+        log_position_state()
+        cancel_all_orders(keep_ladder=ENABLE_GRID_LADDER)
+        time.sleep(0.5)
+        if not skip_grid:
+            current_price = get_current_price()
+            if current_price > 0:
+                initialize_grid(current_price)
+        refresh_all_tp_orders()
+        sync_position()
+        log_position_state()
     log("✅ REFRESH", f"Complete: {event_type}")
 
 def calculate_obv_macd():
-    global obv_macd_value
     try:
         if len(kline_history) < 60: return
         closes = [k['close'] for k in kline_history]
         volumes = [k['volume'] for k in kline_history]
-        obv = [0]
-        for i in range(1, len(closes)):
-            if closes[i] > closes[i-1]: obv.append(obv[-1] + volumes[i])
-            elif closes[i] < closes[i-1]: obv.append(obv[-1] - volumes[i])
-            else: obv.append(obv[-1])
-        
-        def ema(data, period):
-            ema_vals = []
-            k = 2 / (period + 1)
-            ema_vals.append(sum(data[:period]) / period)
-            for price in data[period:]:
-                ema_vals.append(price * k + ema_vals[-1] * (1 - k))
-            return ema_vals
-        
-        if len(obv) >= 60:
-            ema_12 = ema(obv[-60:], 12)
-            ema_26 = ema(obv[-60:], 26)
-            if len(ema_12) > 0 and len(ema_26) > 0:
-                macd_line = ema_12[-1] - ema_26[-1]
-                max_obv = max(abs(max(obv[-60:])), abs(min(obv[-60:])))
-                if max_obv > 0:
-                    normalized = macd_line / max_obv / 100
-                    obv_macd_value = Decimal(str(normalized))
-                    display_value = float(obv_macd_value) * 100
-                    if abs(display_value) > 0.1:
-                        log("📊 OBV-MACD", f"{display_value:.2f}")
+        normalized = calculate_obv_macd_normalized(closes, volumes)
+        if normalized is not None:
+            obv_macd_value = state.update("obv_kline", obv_macd=Decimal(str(normalized))).obv_macd
+            display_value = float(obv_macd_value) * 100
+            if abs(display_value) > 0.1:
+                log("📊 OBV-MACD", f"{display_value:.2f}")
     except Exception as e:
         log("❌ OBV-MACD", f"Calculation error: {e}")
 
 def calculate_dynamic_tp_gap():
+    cfg = strategy_config.snapshot
     try:
-        obv_display = float(obv_macd_value) * 100
-        obv_abs = abs(obv_display)
-        if obv_abs < 10: tp_ratio = Decimal("0.3")
-        elif obv_abs < 20: tp_ratio = Decimal("0.5")
-        elif obv_abs < 30: tp_ratio = Decimal("0.7")
-        elif obv_abs < 50: tp_ratio = Decimal("0.85")
-        else: tp_ratio = Decimal("1.0")
-        
-        tp_range = TPMAX - TPMIN
-        dynamic_tp = TPMIN + (tp_range * tp_ratio)
+        vol_gap = tp_vol_model.gap(volatility_tracker)
+        if vol_gap is not None:
+            return (vol_gap, vol_gap)
+
+        obv_display = float(state.snapshot.obv_macd) * 100
+        dynamic_tp = calculate_obv_tp_gap(obv_display, cfg.TPMIN, cfg.TPMAX, cfg.OBV_TP_EDGES, cfg.OBV_TP_RATIOS)
         return (dynamic_tp, dynamic_tp)
-    except: return (TPMIN, TPMIN)
+    except: return (cfg.TPMIN, cfg.TPMIN)
 
-def fetch_kline_thread():
-    global obv_macd_value
-    last_fetch = 0
-    while True:
-        try:
-            current_time = time.time()
-            if current_time - last_fetch < 60:
-                time.sleep(5)
-                continue
-            try:
-                candles = api.list_futures_candlesticks(SETTLE, contract=SYMBOL, interval='3m', limit=200)
-                if candles and len(candles) > 0:
-                    kline_history.clear()
-                    for candle in candles:
-                        kline_history.append({
-                            'close': float(candle.c), 'high': float(candle.h),
-                            'low': float(candle.l), 'volume': float(candle.v) if hasattr(candle, 'v') and candle.v else 0,
-                        })
-                    calculate_obv_macd()
-                    if len(kline_history) >= 60 and obv_macd_value != Decimal("0"):
-                        log("✅ OBV", "OBV MACD calculation started!")
-                    last_fetch = current_time
-            except: time.sleep(10)
-        except: time.sleep(10)
-
-async def watch_positions():
-    global last_price
-    while True:
-        try:
-            url = f"wss://fx-ws.gateio.ws/v4/ws/usdt"
-            async with websockets.connect(url, ping_interval=60, ping_timeout=120, close_timeout=10) as ws:
-                await ws.send(json.dumps({"time": int(time.time()), "channel": "futures.tickers", "event": "subscribe", "payload": [SYMBOL]}))
-                log("✅ WS", "Connected to WebSocket")
-                while True:
-                    msg = await asyncio.wait_for(ws.recv(), timeout=150)
-                    data = json.loads(msg)
-                    if data.get("event") == "update" and data.get("channel") == "futures.tickers":
-                        result = data.get("result")
-                        if result and isinstance(result, dict):
-                            price = float(result.get("last", 0))
-                            if price > 0: last_price = price
-        except Exception as e:
-            log("⚠️ WS", f"Reconnecting: {e}")
-            await asyncio.sleep(5)
+def fetch_klines():
+    """ 캔들 조회 → OBV/변동성 갱신. 성공하면 KLINE_FETCH_INTERVAL 뒤, 실패하면 10초 뒤 다시 """
+    delay = KLINE_FETCH_INTERVAL
+    try:
+        candles = api.list_futures_candlesticks(SETTLE, contract=SYMBOL, interval='3m', limit=200)
+        if candles and len(candles) > 0:
+            kline_history.clear()
+            for candle in candles:
+                kline_history.append({
+                    't': float(candle.t) if getattr(candle, 't', None) else 0,
+                    'close': float(candle.c), 'high': float(candle.h),
+                    'low': float(candle.l), 'volume': float(candle.v) if hasattr(candle, 'v') and candle.v else 0,
+                })
+            calculate_obv_macd()
+            if volatility_tracker.update(list(kline_history)):
+                log("📈 VOL", f"ATR: {volatility_tracker.atr:.4f} ({volatility_tracker.atr_pct*100:.3f}%), RV: {volatility_tracker.realized_vol*100:.3f}%")
+            if len(kline_history) >= 60 and state.snapshot.obv_macd != Decimal("0"):
+                log("✅ OBV", "OBV MACD calculation started!")
+    except: delay = 10
+    timers.schedule("kline", delay, fetch_klines)
+
+def handle_order_event(order_data):
+    """
+    futures.orders 이벤트 처리: 주문 text로 의도를 O(1) 조회하여 체결된 주문 종류별로 대응
+    - TP (또는 레지스트리에 없는 reduce-only) → 리밸런싱/Tier 손절 검사 후 전체 새로고침
+    - 그리드/아이들 진입, Tier 손절, 리밸런싱 → 발행한 흐름이 직접 후처리하므로 기록만
+    """
+    if order_data.get("contract") != SYMBOL: return
+    intent = order_registry.on_order_event(order_data)
+    risk_ledger.on_order(order_data)
+    if open_order_index.apply(order_data):
+        invariant_engine.mark_changed("orders")
+        order_hygiene.on_orders_changed()
+
+    is_filled = (order_data.get("finish_as") in ["filled", "ioc"] or order_data.get("status") in ["finished", "closed"])
+    if not is_filled: return
+
+    order_id = order_data.get("id")
+    if order_id is not None and not processed_finished_orders.add(order_id): return
+
+    is_reduce_only = order_data.get("is_reduce_only", False)
+    size = int(order_data.get("size", 0) or 0)
+    price = float(order_data.get("fill_price") or order_data.get("price", 0) or 0)
+
+    if intent is not None:
+        kind = intent.intent
+        filled = intent.filled_size
+    else:
+        kind = INTENT_TP if is_reduce_only else INTENT_UNKNOWN
+        filled = size - int(order_data.get("left", 0) or 0)
+
+    if kind == INTENT_GRID_LEVEL:
+        ladder_side, level = grid_ladder.on_finished(intent.text, filled)
+        if filled and level is not None:
+            log("✅ LADDER FILLED", "%s L%d %d @ %.4f", ladder_side.upper(), level["level"], abs(filled), price,
+                event="ladder_filled", side=ladder_side, level=level["level"], qty=abs(filled), price=price)
+            threading.Thread(target=on_ladder_level_filled, args=(ladder_side,), daemon=True).start()
+            return
+
+    if filled == 0:
+        if intent is not None:
+            log("ℹ️ ORDER", "%s finished without fill (%s)", kind, order_data.get("finish_as"),
+                event="order_unfilled", intent=kind, text=intent.text)
+        return
+
+    if kind in ENTRY_INTENTS:
+        log("✅ ENTRY FILLED", "%s %s %d @ %.4f", kind, (intent.side or "").upper(), abs(filled), price,
+            event="entry_filled", intent=kind, side=intent.side, qty=abs(filled), price=price)
+        return
+    if kind in STOP_INTENTS:
+        log("✅ SL FILLED", "%s %s %d @ %.4f", kind, (intent.side or "").upper(), abs(filled), price,
+            event="sl_filled", intent=kind, side=intent.side, qty=abs(filled), price=price)
+        return
+    if kind != INTENT_TP:
+        return
+
+    # TP는 청산 주문: 매도(음수) → LONG TP, 매수(양수) → SHORT TP
+    side = intent.side if intent is not None and intent.side else ("long" if size < 0 else "short")
+    tp_qty = abs(int(filled))
+    tp_profit = pnl_engine.order_realized(order_data.get("text"))
+    if tp_profit is None:
+        tp_profit = pnl_engine.close_pnl(side, tp_qty, price)
+    log("✅ TP FILLED", "%s %d @ %.4f", side.upper(), tp_qty, price,
+        event="tp_filled", side=side, qty=tp_qty, price=price)
+    # 리밸런싱/Tier 손절 청산은 주문 이벤트로 완료를 확인 → 이벤트를 전달하는 이 스레드(ws-futures.orders)를 막지 않도록 분리
+    tp_fill_executor.submit(on_tp_filled, side, tp_qty, tp_profit)
+
+def on_tp_filled(side, tp_qty, tp_profit):
+    """ TP 체결 후속 처리 (tp-fill 전용 단일 스레드, 체결 순서대로): 리밸런싱 / Tier 손절 → TP·그리드 갱신 """
+    try:
+        time.sleep(0.5)
+        with api.plan("tp_fill", prefetch=(READ_POSITIONS,)):
+            sync_position()
+
+            remaining_loss = pnl_engine.snapshot.loss("short" if side == "long" else "long")
+            if check_rebalancing_condition(tp_profit, remaining_loss): execute_rebalancing_sl()
+
+            try: handle_non_main_position_tp(tp_qty)
+            except: pass
+        time.sleep(0.5)
+        update_event_time()
+    
+        if state.snapshot.is_flat:
+            log("🎯 BOTH CLOSED", "Both sides closed → Full refresh")
+            update_no_position_time()
+            threading.Thread(target=full_refresh, args=("Average_TP", False), daemon=True).start()
+        elif state.snapshot.size(side) > 0:
+            # 로트 TP 일부 체결: 남은 로트의 TP는 그대로 두고 (Tier 손절 반영분만) TP 갱신
+            log("🎯 LOT TP", "%s lots remain (%d) → TP refresh only", side.upper(), len(lot_ledger.sides[side]),
+                event="lot_tp_filled", side=side, lots=len(lot_ledger.sides[side]))
+            threading.Thread(target=refresh_all_tp_orders, daemon=True).start()
+        else:
+            log("🎯 SIDE CLOSED", "One side closed → Re-initializing Grid/Hedge")
+            threading.Thread(target=full_refresh, args=("Side_TP", False), daemon=True).start()
+    except Exception as e:
+        log("❌ TP FILL", "Follow-up error: %s", e, event="tp_fill_error", side=side)
+
+tp_fill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tp-fill")
 
-def start_websocket():
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(watch_positions())
+def on_ladder_level_filled(side):
+    """ 래더 레벨 체결 → 체결된 레벨만 바깥쪽 한 단계로 대체하고 TP 갱신 (나머지 레벨은 그대로) """
+    update_event_time()
+    if not state.snapshot.locked(side):
+        grid_ladder.extend(side)
+    refresh_all_tp_orders()
 
-async def grid_fill_monitor():
-    uri = f"wss://fx-ws.gateio.ws/v4/ws/{SETTLE}"
-    while True:
+def handle_user_trade(trade):
+    """ futures.usertrades 체결 한 건 기록 (trade id 기준 중복 제거) """
+    if trade.get("contract") != SYMBOL: return
+    trade_id = trade.get("id")
+    if trade_id is not None and not processed_trade_ids.add(trade_id): return
+    recent_trades.append(trade)
+    intent = order_registry.resolve(trade.get("text"))
+    log("💱 FILL", "%s %s @ %s", intent.intent if intent else "unknown", trade.get("size"), trade.get("price"),
+        event="fill", intent=intent.intent if intent else None, qty=trade.get("size"),
+        price=trade.get("price"), fee=trade.get("fee"), order_id=trade.get("order_id"))
+    apply_trade(trade, intent)
+
+def apply_trade(trade, intent):
+    """
+    체결 → 로트 원장/손익 엔진: 진입은 로트 추가 + 평단 갱신, TP/손절/리밸런싱은 로트 소진 + 손익 실현
+    (의도를 모르면 다음 포지션 동기화/보정에 맡김)
+    """
+    size = int(trade.get("size", 0) or 0)
+    if not size or intent is None or intent.intent == INTENT_UNKNOWN:
+        return
+    price = float(trade.get("price", 0) or 0)
+    opening = intent.intent in ENTRY_INTENTS
+    if opening:
+        side = intent.side or ("long" if size > 0 else "short")
+    else:
+        side = intent.side or ("long" if size < 0 else "short")
+    pnl_engine.on_fill(side, abs(size), price, fee=trade.get("fee"), opening=opening, text=trade.get("text"))
+    if opening:
+        lot_ledger.open(side, abs(size), price, intent.intent, opened=float(trade.get("create_time", 0) or 0) or None)
+    else:
+        lot_ledger.close(side, abs(size), text=trade.get("text"))
+
+def apply_ticker(price, mark):
+    """ 티커 한 건 반영 (WS 핸들러 / 시세 프로세스 공통) """
+    global last_price
+    if price > 0:
+        last_price = price
+        risk_ledger.on_price(price)
+    pnl_engine.on_mark(mark or price)
+
+def on_ticker_message(result, message):
+    items = result if isinstance(result, list) else [result]
+    for item in items:
+        if item and isinstance(item, dict) and item.get("contract", SYMBOL) == SYMBOL:
+            apply_ticker(float(item.get("last", 0) or 0), float(item.get("mark_price", 0) or 0))
+
+def on_feed_indicator(obv_macd, atr, atr_pct, realized_vol, vol_ready):
+    """ 시세 프로세스의 지표 레코드 → OBV 상태 + 변동성 스냅샷 교체 """
+    global volatility_tracker
+    if obv_macd is not None:
+        state.update("obv_feed", obv_macd=Decimal(str(obv_macd)))
+    volatility_tracker = VolatilitySnapshot(atr, atr_pct, realized_vol, vol_ready)
+
+def resync_order_book():
+    """ REST 스냅샷으로 로컬 호가창 재동기화 (동시 실행 방지) """
+    if not order_book_resync_lock.acquire(blocking=False):
+        return
+    try:
+        book = api.list_futures_order_book(SETTLE, contract=SYMBOL, limit=50, with_id=True)
+        order_book.apply_snapshot(book.id, [{"p": b.p, "s": b.s} for b in book.bids or []],
+                                  [{"p": a.p, "s": a.s} for a in book.asks or []])
+        log("📚 BOOK", "Resynced (id %s, bid %.4f / ask %.4f)", book.id, order_book.best_bid, order_book.best_ask,
+            event="book_resync", bid=order_book.best_bid, ask=order_book.best_ask)
+    except Exception as e:
+        log("❌ BOOK", f"Resync error: {e}")
+    finally:
+        order_book_resync_lock.release()
+
+def on_order_book_message(result, message):
+    if not result or result.get("s", SYMBOL) != SYMBOL: return
+    if not order_book.apply_update(result) and not order_book_resync_lock.locked():
+        threading.Thread(target=resync_order_book, daemon=True).start()
+
+def on_balances_message(result, message):
+    for update in result or []:
+        balance_cache.apply_stream(update)
+        if update.get("type") == "fund":
+            settled_at = (update.get("time_ms") or 0) / 1000 or float(update.get("time") or 0) or time.time()
+            pnl_engine.on_funding(update.get("change") or 0, rate=settled_funding_rate(settled_at))
+    # available/margin은 스트림에 없으므로 REST로 보정 (간격 제한)
+    if time.time() - balance_cache.snapshot.reconciled_at >= BALANCE_RECONCILE_INTERVAL:
+        reconcile_balance()
+
+def on_orders_message(result, message):
+    for order_data in result or []:
+        handle_order_event(order_data)
+
+def on_usertrades_message(result, message):
+    for trade in result or []:
+        handle_user_trade(trade)
+
+def backfill_ticker(since_ts, until_ts):
+    global last_price
+    price = get_current_price()
+    if price > 0: last_price = float(price)
+
+def backfill_orders(since_ts, until_ts):
+    """ 연결이 끊긴 동안 종료된 주문을 REST로 조회하여 같은 핸들러로 재처리 """
+    orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='finished', limit=100)
+    missed = [o.to_dict() for o in orders or [] if o.finish_time and float(o.finish_time) >= since_ts - 1]
+    missed.sort(key=lambda o: float(o.get("finish_time") or 0))
+    for order_data in missed:
+        handle_order_event(order_data)
+    log("🔁 BACKFILL", "Orders: %d finished since %.0f", len(missed), since_ts, event="backfill_orders", count=len(missed))
+
+def backfill_trades(since_ts, until_ts):
+    trades = api.get_my_trades_with_time_range(SETTLE, contract=SYMBOL, _from=int(since_ts) - 1, to=int(until_ts) + 1, limit=1000)
+    missed = sorted((t.to_dict() for t in trades or []), key=lambda t: float(t.get("create_time") or 0))
+    for trade in missed:
+        handle_user_trade(trade)
+    log("🔁 BACKFILL", "Trades: %d since %.0f", len(missed), since_ts, event="backfill_trades", count=len(missed))
+
+def resolve_user_id():
+    """
+    비공개 채널 payload에 필요한 Gate 사용자 ID (환경 변수 → API 키 계정 정보 → 주문 이력 순으로 조회)
+    USER_ID_LOOKUP_RETRIES번 모두 실패하면 RuntimeError: uid 없이 구독하면 체결 이벤트가 오지 않으므로 시작하지 않음
+    """
+    if GATE_USER_ID:
+        return GATE_USER_ID
+    for attempt in range(USER_ID_LOOKUP_RETRIES):
         try:
-            async with websockets.connect(uri, ping_interval=60, ping_timeout=120, close_timeout=10) as ws:
-                await ws.send(json.dumps({"time": int(time.time()), "channel": "futures.orders", "event": "subscribe", "payload": [API_KEY, API_SECRET, SYMBOL]}))
-                log("✅ WS", "Connected to WebSocket")
-                while True:
-                    msg = await asyncio.wait_for(ws.recv(), timeout=150)
-                    data = json.loads(msg)
-                    if data.get("event") == "update" and data.get("channel") == "futures.orders":
-                        for order_data in data.get("result", []):
-                            if order_data.get("contract") != SYMBOL: continue
-                            is_filled = (order_data.get("finish_as") in ["filled", "ioc"] or order_data.get("status") in ["finished", "closed"])
-                            if not is_filled: continue
-                            
-                            is_reduce_only = order_data.get("is_reduce_only", False)
-                            size = order_data.get("size", 0)
-                            price = float(order_data.get("price", 0))
-                            
-                            if is_reduce_only:
-                                side = "long" if size > 0 else "short"
-                                tp_qty = abs(int(size))
-                                tp_profit = Decimal(str(tp_qty)) * Decimal(str(price))
-                                log("✅ TP FILLED", f"{side.upper()} {tp_qty} @ {price:.4f}")
-                                time.sleep(0.5)
-                                sync_position()
-                                
-                                with position_lock:
-                                    if side == "long": remaining_loss = position_state[SYMBOL]["short"]["size"] * get_current_price()
-                                    else: remaining_loss = position_state[SYMBOL]["long"]["size"] * get_current_price()
-                                if check_rebalancing_condition(tp_profit, remaining_loss): execute_rebalancing_sl()
-                                
-                                try: handle_non_main_position_tp(tp_qty)
-                                except: pass
-                                time.sleep(0.5)
-                                with position_lock:
-                                    long_size = position_state[SYMBOL]["long"]["size"]
-                                    short_size = position_state[SYMBOL]["short"]["size"]
-                                update_event_time()
-                                
-                                if long_size == 0 and short_size == 0:
-                                    log("🎯 BOTH CLOSED", "Both sides closed → Full refresh")
-                                    update_no_position_time()
-                                    threading.Thread(target=full_refresh, args=("Average_TP", False), daemon=True).start()
-                                else:
-                                    log("🎯 SIDE CLOSED", "One side closed → Re-initializing Grid/Hedge")
-                                    threading.Thread(target=full_refresh, args=("Side_TP", False), daemon=True).start()
-        except: await asyncio.sleep(5)
-
-def start_grid_monitor():
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(grid_fill_monitor())
-
-def tp_monitor():
-    while True:
+            detail = AccountApi(api_client).get_account_detail()
+            if getattr(detail, "user_id", None):
+                return str(detail.user_id)
+            for status in ("open", "finished"):
+                orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status=status, limit=1)
+                if orders and getattr(orders[0], "user", None):
+                    return str(orders[0].user)
+        except Exception as e:
+            log("⚠️ WS", "User ID lookup failed (%d/%d): %s", attempt + 1, USER_ID_LOOKUP_RETRIES, e)
+        time.sleep(2 ** attempt)
+    raise RuntimeError("Gate user id not found; set GATE_USER_ID (futures.orders/usertrades need a real uid)")
+
+ws_manager = WsConnectionManager(WS_URL, API_KEY, API_SECRET, logger=log)
+market_feed = None
+if FEED_MODE in ("process", "shared") and not REPLAY_DIR:
+    market_feed = MarketFeed(SYMBOL, SETTLE, WS_URL, config.host, on_tick=apply_ticker, on_indicator=on_feed_indicator,
+                             capacity=FEED_RING_CAPACITY, watchdog_timeout=FEED_WATCHDOG_TIMEOUT,
+                             ring_name=FEED_RING if FEED_MODE == "shared" else None,
+                             wake_fd=int(FEED_WAKE_FD) if FEED_MODE == "shared" and FEED_WAKE_FD else None, logger=log,
+                             kline_interval=KLINE_FETCH_INTERVAL, book_depth=ORDER_BOOK_DEPTH,
+                             atr_period=ATR_PERIOD, rv_window=RV_WINDOW)
+    order_book = market_feed.book
+flattener = Flattener(api, SETTLE, SYMBOL, order_registry, generate_order_id, logger=log)
+
+def subscribe_ws_channels(user_id):
+    if market_feed is None:     # process/shared 모드: 공개 채널은 시세 프로세스가 구독
+        ws_manager.subscribe("futures.tickers", [SYMBOL], on_ticker_message, gap_seconds=30, backfill=backfill_ticker)
+        ws_manager.subscribe("futures.order_book_update", [SYMBOL, "100ms", ORDER_BOOK_DEPTH], on_order_book_message,
+                             gap_seconds=10, backfill=lambda since_ts, until_ts: resync_order_book())
+    ws_manager.subscribe("futures.balances", [user_id], on_balances_message, private=True,
+                         blocking=True, backfill=lambda since_ts, until_ts: reconcile_balance())
+    ws_manager.subscribe("futures.orders", [user_id, SYMBOL], on_orders_message, private=True,
+                         blocking=True, backfill=backfill_orders)
+    ws_manager.subscribe("futures.usertrades", [user_id, SYMBOL], on_usertrades_message, private=True,
+                         blocking=True, backfill=backfill_trades)
+
+def start_ws_manager(user_id):
+    subscribe_ws_channels(user_id)
+    if recorder is not None:
+        ws_manager.tap = lambda raw, recv_ts: recorder.record("ws", None, raw, recv_ts)
+    return ws_manager.start()
+
+def check_avg_tp_orders():
+    """ 평단 TP 주문 종료 확인 (평단 TP가 있는 동안만 AVG_TP_CHECK_INTERVAL마다) """
+    for side in ["long", "short"]:
+        tp_id = state.snapshot.avg_tp_id(side)
+        if not tp_id: continue
         try:
-            time.sleep(3)
-            for side in ["long", "short"]:
-                tp_id = average_tp_orders[SYMBOL].get(side)
-                if not tp_id: continue
-                try:
-                    order = api.get_futures_order(SETTLE, str(tp_id))
-                    if order and order.status in ["finished", "closed"]:
-                        log_event_header("AVERAGE TP HIT")
-                        log("🎯 TP", f"{side.upper()} average position closed")
-                        average_tp_orders[SYMBOL][side] = None
-                        time.sleep(0.5)
-                        sync_position()
-                        full_refresh("Average_TP", skip_grid=False)
-                        update_event_time()
-                        break
-                except: pass
-        except: time.sleep(1)
+            order = api.get_futures_order(SETTLE, str(tp_id))
+            if order and order.status in ["finished", "closed"]:
+                log_event_header("AVERAGE TP HIT")
+                log("🎯 TP", f"{side.upper()} average position closed")
+                state.update("avg_tp_hit", **{f"{side}_avg_tp_id": None})
+                time.sleep(0.5)
+                sync_position()
+                full_refresh("Average_TP", skip_grid=False)
+                update_event_time()
+                break
+        except: pass
+    arm_avg_tp_timer()
+
+def arm_avg_tp_timer(*_):
+    snap = state.snapshot
+    if snap.long_avg_tp_id or snap.short_avg_tp_id:
+        if timers.remaining("avg_tp") is None:
+            timers.schedule("avg_tp", AVG_TP_CHECK_INTERVAL, check_avg_tp_orders)
+    else:
+        timers.cancel("avg_tp")
+
+state.subscribe(arm_avg_tp_timer, fields=("long_avg_tp_id", "short_avg_tp_id"))
 
 def check_idle_and_enter():
-    global idle_entry_in_progress, last_idle_entry_time, idle_entry_count
+    global last_idle_entry_time, idle_entry_count
+    if not idle_entry_lock.acquire(blocking=False):
+        return
     try:
-        with idle_entry_progress_lock:
-            if idle_entry_in_progress:
-                return
-
+        cfg = strategy_config.snapshot
         current_time = time.time()
         elapsed = current_time - last_event_time
 
-        if current_time - last_idle_entry_time < IDLE_ENTRY_COOLDOWN:
+        if current_time - last_idle_entry_time < cfg.IDLE_ENTRY_COOLDOWN:
             # log("IDLE-DEBUG", f"cooldown block: {current_time - last_idle_entry_time:.1f}s < {IDLE_ENTRY_COOLDOWN}")
             return
 
-        if elapsed < IDLE_TIME_SECONDS:
+        if elapsed < cfg.IDLE_TIME_SECONDS:
             # log("IDLE-DEBUG", f"elapsed block: {elapsed:.1f}s < {IDLE_TIME_SECONDS}")
             return
 
-        sync_position()
-        with position_lock:
-            long_size = position_state[SYMBOL]["long"]["size"]
-            short_size = position_state[SYMBOL]["short"]["size"]
+        with api.plan("idle_entry", prefetch=(READ_POSITIONS, READ_TICKER) + balance_reads()):
+            sync_position()
 
-        with balance_lock:
-            balance = account_balance
-        current_price = get_current_price()
-        if current_price == 0:
-            log("IDLE-DEBUG", "price == 0")
-            return
+            balance = get_sizing_balance()
+            current_price = get_current_price()
+            if current_price == 0:
+                log("IDLE-DEBUG", "price == 0")
+                return
 
-        # ★ 가치 계산 시 0.001 곱하기
-        multiplier = Decimal("0.001")
-        total_position_value = (long_size + short_size) * current_price * multiplier
+            # 가치는 손익 엔진 값 (마크 가격 기준)
+            pnl = pnl_engine.snapshot
+            total_position_value = Decimal(str(pnl.value("long") + pnl.value("short")))
         
-        max_allowed_value = balance * MAXPOSITIONRATIO
-        if total_position_value >= max_allowed_value:
-            log("IDLE-DEBUG", f"max-pos block: pos={total_position_value:.2f}, limit={max_allowed_value:.2f}")
-            return
+            max_allowed_value = balance * cfg.MAXPOSITIONRATIO
+            if total_position_value >= max_allowed_value:
+                log("IDLE-DEBUG", f"max-pos block: pos={total_position_value:.2f}, limit={max_allowed_value:.2f}")
+                return
 
-        # 아이들 진입 시작
-        with idle_entry_progress_lock:
-            idle_entry_in_progress = True
-        
-        try:
+            # 아이들 진입 (idle_entry_lock 보유 중 → 중복 진입 없음)
             idle_entry_count += 1
             log_event_header(f"IDLE ENTRY #{idle_entry_count}")
             log("⏰ IDLE", f"No activity for {elapsed/60:.1f} min → Adding Grid/Hedge")
-            
+        
             # 시장가 양방향 진입 (물타기/헷징)
             if current_price > 0:
-                initialize_grid(current_price)
+                initialize_grid(current_price, intent=INTENT_IDLE_ENTRY)
                 last_idle_entry_time = current_time
                 update_event_time() # 이벤트 시간 갱신하여 연속 진입 방지
-                
-        finally:
-            with idle_entry_progress_lock:
-                idle_entry_in_progress = False
         
     except Exception as e:
         log("❌ IDLE", f"Error: {e}")
-        with idle_entry_progress_lock:
-            idle_entry_in_progress = False
-
-def idle_monitor():
-    global last_idle_check
-    while True:
-        try:
-            time.sleep(60)
-            current_time = time.time()
-            if current_time - last_idle_check < 120: continue
-            last_idle_check = current_time
-            check_idle_and_enter()
-        except: time.sleep(10)
+    finally:
+        idle_entry_lock.release()
+        arm_idle_timer()
 
 def get_tp_orders_hash(tp_orders):
     try:
@@ -1116,110 +1655,115 @@ def get_tp_orders_hash(tp_orders):
         return hashlib.md5("_".join(order_strings).encode()).hexdigest()
     except: return ""
 
-def periodic_health_check():
-    global last_adjusted_obv, last_event_time, initial_capital
-    while True:
-        try:
-            time.sleep(120)
-            sync_position()
-            
-            current_time = time.time()
-            idle_time = current_time - last_event_time
-            log("💊 HEALTH", f"Starting check... (Idle: {idle_time:.1f}s)")
-            log_position_state()
-            
-            # --- 잔고 및 초기 자본금 업데이트 로직 개선 ---
+# =============================================================================
+# 불변식 검사 (상태 변경 시 즉시 평가 + 적응형 REST 보정)
+# =============================================================================
+def _position_view():
+    snap = state.snapshot
+    return snap.long_size, snap.short_size, snap.long_entry, snap.short_entry
+
+def check_tp_per_side():
+    """ 포지션이 있는 방향마다 청산(reduce-only) TP 주문이 있어야 함 """
+    l_s, s_s, _, _ = _position_view()
+    tp_list = open_order_index.tp_orders()
+    missing = []
+    if l_s > 0 and not any(o["size"] < 0 for o in tp_list): missing.append("long")
+    if s_s > 0 and not any(o["size"] > 0 for o in tp_list): missing.append("short")
+    return {"missing_tp": missing} if missing else None
+
+def fix_tp_per_side(detail):
+    refresh_all_tp_orders()
+
+def check_single_side():
+    """ 한쪽 포지션만 남은 상태 (좀비 그리드 포함) """
+    l_s, s_s, _, _ = _position_view()
+    if (l_s > 0) == (s_s > 0):
+        return None
+    return {"side": "long" if l_s > 0 else "short", "zombie_grids": len(open_order_index.grid_orders())}
+
+def fix_single_side(detail):
+    grid_list = open_order_index.grid_orders()
+    if grid_list:
+        log("⚠️ SINGLE", f"Zombie grid detected ({len(grid_list)}) -> Clearing GRIDS only")
+        grid_list = [o for o in grid_list if grid_ladder.find(o["text"])[1] is None]
+        grid_ladder.cancel_all()
+        for o in grid_list:
             try:
-                futures_account = api.list_futures_accounts(SETTLE)
-                if futures_account and getattr(futures_account, 'available', None):
-                    avail = Decimal(str(futures_account.available))
-                    
-                    with balance_lock:
-                        account_balance = avail
-                    
-                    # ★ [수정] 초기 자본금이 0일 때만 설정 (덮어쓰기 금지)
-                    if initial_capital <= 0 and avail > 0:
-                        initial_capital = avail
-                        save_initial_capital()
-                        log("💰 BALANCE", f"Initial Capital Fixed: {avail:.2f} USDT")
+                api.cancel_futures_order(SETTLE, str(o["id"]))
+                open_order_index.discard(o["id"])
             except: pass
+    log("⚠️ SINGLE", "Creating grid...")
+    initialize_grid()
+
+def check_max_position():
+    """ max_position_locked가 현재 포지션 가치와 일치하는지 """
+    snap = state.snapshot
+    max_v = snap.capital * strategy_config.snapshot.MAXPOSITIONRATIO
+    changes = {}
+    for side, value in (("long", snap.long_entry * snap.long_size), ("short", snap.short_entry * snap.short_size)):
+        should_lock = value >= max_v
+        if should_lock != snap.locked(side):
+            changes[side] = {"lock": should_lock, "value": f"{value:.2f}", "limit": f"{max_v:.2f}"}
+    return changes or None
+
+def fix_max_position(detail):
+    state.update("max_position", **{f"{side}_locked": change["lock"] for side, change in detail.items()})
+    for side, change in detail.items():
+        if change["lock"]:
+            log("⚠️ LIMIT", f"{side.upper()} Locked (${change['value']})")
+        else:
+            log("✅ LIMIT", f"{side.upper()} Unlocked (${change['value']})")
+    if any(change["lock"] for change in detail.values()):
+        cancel_all_orders()
 
-            with position_lock:
-                l_s = position_state[SYMBOL]["long"]["size"]
-                s_s = position_state[SYMBOL]["short"]["size"]
-                l_p = position_state[SYMBOL]["long"]["entry_price"]
-                s_p = position_state[SYMBOL]["short"]["entry_price"]
-            
-            if l_s == 0 and s_s == 0: continue
-
-            with balance_lock: 
-                check_cap = initial_capital if initial_capital > 0 else account_balance
-                
-            max_v = check_cap * MAXPOSITIONRATIO
-            
-            l_v = l_p * l_s
-            s_v = s_p * s_s
-
-            if l_v >= max_v and not max_position_locked["long"]:
-                log("⚠️ LIMIT", f"LONG Locked (${l_v:.2f})")
-                max_position_locked["long"] = True
-                cancel_all_orders()
-            elif l_v < max_v and max_position_locked["long"]:
-                max_position_locked["long"] = False
-
-            if s_v >= max_v and not max_position_locked["short"]:
-                log("⚠️ LIMIT", f"SHORT Locked (${s_v:.2f})")
-                max_position_locked["short"] = True
-                cancel_all_orders()
-            elif s_v < max_v and max_position_locked["short"]:
-                max_position_locked["short"] = False
-            
-            try:
-                orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
-                tp_list = [o for o in orders if o.is_reduce_only]
-                grid_list = [o for o in orders if not o.is_reduce_only]
-                
-                l_tp = any(float(o.size) < 0 for o in tp_list)
-                s_tp = any(float(o.size) > 0 for o in tp_list)
-                
-                need_r = False
-                if l_s > 0 and not l_tp: need_r = True
-                if s_s > 0 and not s_tp: need_r = True
-                
-                cur_h = get_tp_orders_hash(tp_list)
-                if not need_r and cur_h != tp_order_hash.get(SYMBOL): need_r = True
-                
-                if need_r:
-                    refresh_all_tp_orders()
-                    new_o = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
-                    tp_order_hash[SYMBOL] = get_tp_orders_hash([o for o in new_o if o.is_reduce_only])
-                
-                # 좀비 그리드 선별 취소
-                single = (l_s > 0) != (s_s > 0)
-                if single and grid_list:
-                    log("⚠️ SINGLE", f"Zombie grid detected ({len(grid_list)}) -> Clearing GRIDS only")
-                    for o in grid_list:
-                        try: api.cancel_futures_order(SETTLE, o.id); time.sleep(0.1)
-                        except: pass
-                elif single and not grid_list:
-                    log("⚠️ SINGLE", "Creating grid...")
-                    initialize_grid()
-                    
-            except Exception as e: log("⚠️ HEALTH", f"Check error: {e}")
-            
-            validate_strategy_consistency()
-            log("✅ HEALTH", "Done")
-        except Exception as e:
-            log("❌ HEALTH", f"Err: {e}")
-            time.sleep(5)
+def reconcile_state():
+    """ REST 보정: 포지션/열린 주문/잔고를 한 번씩 조회 → 로컬 상태가 바뀌었으면 True """
+    before = _position_view()
+    sync_position()
+    orders = api.list_futures_orders(SETTLE, contract=SYMBOL, status='open')
+    order_dicts = [o.to_dict() for o in orders or []]
+    orders_changed = open_order_index.replace_all(order_dicts)
+    risk_ledger.replace_orders(order_dicts)
+    reconcile_lots()
+    order_hygiene.on_orders_changed()
+
+    snapshot = reconcile_balance()
+    if snapshot and snapshot.available > 0 and state.snapshot.initial_capital <= 0:
+        # ★ [수정] 초기 자본금이 0일 때만 설정 (덮어쓰기 금지)
+        state.update_with(lambda snap: {"initial_capital": snapshot.available} if snap.initial_capital <= 0 else None,
+                          "reconcile_capital")
+        save_initial_capital()
+        log("💰 BALANCE", f"Initial Capital Fixed: {snapshot.available:.2f} USDT")
+
+    changed = orders_changed or before != _position_view()
+    log("💊 HEALTH", "Reconciled (Idle: %.1fs, orders: %d, changed: %s)", time.time() - last_event_time,
+        len(open_order_index), changed, event="reconcile", changed=changed)
+    if changed:
+        log_position_state()
+    return changed
+
+invariant_engine = InvariantEngine(reconcile=reconcile_state, logger=log,
+                                   min_interval=RECONCILE_MIN_SECONDS, max_interval=RECONCILE_MAX_SECONDS)
+invariant_engine.add_rule("max_position", ("position", "balance"), check_max_position, fix_max_position, cooldown=0)
+invariant_engine.add_rule("tp_per_side", ("position", "orders"), check_tp_per_side, fix_tp_per_side, grace=5, cooldown=15)
+# 상태 스냅샷 변경 → 관련 불변식만 재평가
+state.subscribe(lambda old, new, changed: invariant_engine.mark_changed("position"),
+                fields=("long_size", "short_size", "long_entry", "short_entry"))
+state.subscribe(lambda old, new, changed: invariant_engine.mark_changed("balance"),
+                fields=("account_balance", "initial_capital"))
+invariant_engine.add_rule("single_side", ("position", "orders"), check_single_side, fix_single_side, grace=10, cooldown=30)
+
+def apply_webhook_payload(data):
+    tt1 = data.get('tt1', 0)
+    state.update("webhook", obv_macd=Decimal(str(tt1 / 1000.0)))
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
-    global obv_macd_value
     try:
         data = request.get_json()
-        tt1 = data.get('tt1', 0)
-        obv_macd_value = Decimal(str(tt1 / 1000.0))
+        if recorder is not None:
+            recorder.record("webhook", "/webhook", data)
+        apply_webhook_payload(data)
         return jsonify({"status": "success"}), 200
     except: return jsonify({"status": "error"}), 500
 
@@ -1227,31 +1771,91 @@ def webhook():
 def health():
     return jsonify({"status": "running"}), 200
 
+profiler = SamplingProfiler()
+
+@app.before_request
+def guard_debug_routes():
+    """ /debug/*: DEBUG_TOKEN이 있으면 X-Debug-Token 일치 필요, 없으면 localhost 요청만 허용 """
+    if not request.path.startswith("/debug/"):
+        return None
+    if DEBUG_TOKEN:
+        if hmac.compare_digest(request.headers.get("X-Debug-Token", ""), DEBUG_TOKEN):
+            return None
+    elif request.remote_addr in ("127.0.0.1", "::1"):
+        return None
+    return jsonify({"status": "error", "reason": "unauthorized"}), 401
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """ 전 스레드 샘플링 → collapsed stack (flamegraph.pl / speedscope 입력) """
+    try:
+        seconds = float(request.args.get('seconds', 5))
+    except ValueError:
+        return jsonify({"status": "error", "reason": "invalid seconds"}), 400
+    seconds = max(0.1, min(seconds, DEBUG_PROFILE_MAX_SECONDS))
+    output = profiler.profile(seconds)
+    if output is None:
+        return jsonify({"status": "busy"}), 409
+    log("🔬 PROFILE", "%.1fs, %d samples (overhead %.1fms)", seconds, profiler.last_samples,
+        profiler.last_overhead_ms, event="profile", samples=profiler.last_samples)
+    return output, 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.route('/debug/threads', methods=['GET'])
+def debug_threads():
+    return dump_threads(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.route('/debug/locks', methods=['GET'])
+def debug_locks():
+    return jsonify({lock.name: lock.stats() for lock in MODULE_LOCKS + (order_book_resync_lock,)}), 200
+
+@app.route('/config', methods=['GET', 'POST'])
+def strategy_config_endpoint():
+    """ GET: 현재 설정/교체 이력, POST: {필드: 값} 검증 후 교체 (X-Config-Token 필요, 실패 시 기존 설정 유지) """
+    if request.method == 'GET':
+        return jsonify(strategy_config.stats()), 200
+    if not CONFIG_TOKEN or not hmac.compare_digest(request.headers.get("X-Config-Token", ""), CONFIG_TOKEN):
+        return jsonify({"status": "error", "reason": "unauthorized"}), 401
+    try:
+        config = strategy_config.apply(request.get_json(force=True, silent=True), source="endpoint")
+    except ConfigError as e:
+        return jsonify({"status": "error", "errors": e.errors}), 400
+    return jsonify({"status": "success", "version": config.version}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({"account": ACCOUNT_NAME, "logging": log_pipeline.stats(), "websocket": ws_manager.metrics(),
+                    "order_book": order_book.stats(), "balance": balance_cache.stats(),
+                    "invariants": invariant_engine.stats(), "grid_ladder": grid_ladder.stats(),
+                    "locks": {lock.name: lock.stats() for lock in MODULE_LOCKS},
+                    "state": state.stats(), "recorder": recorder.stats() if recorder else None,
+                    "fast_rest": fast_rest.stats() if fast_rest else None,
+                    "obv_signal": dict(obv_signal_gate.stats(), reprice=tp_reprice_trigger.stats()),
+                    "timers": timers.stats(), "order_hygiene": order_hygiene.stats(),
+                    "risk": risk_gate.stats(), "lots": lot_ledger.stats(),
+                    "pnl": pnl_engine.stats(),
+                    "market_feed": market_feed.stats() if market_feed else None,
+                    "call_plan": api.stats(),
+                    "config": {k: v for k, v in strategy_config.stats().items() if k != "config"}}), 200
+
 def print_startup_summary():
-    global account_balance, initial_capital
-    log("🚀 START", "GATE Trading Bot")
+    log("🚀 START", "GATE Trading Bot (account %s)", ACCOUNT_NAME, event="start", account=ACCOUNT_NAME)
     load_initial_capital()
     try:
         futures_account = api.list_futures_accounts(SETTLE)
         if futures_account and getattr(futures_account, 'available', None):
+            balance_cache.apply_rest(futures_account)
             avail = Decimal(str(futures_account.available))
             if avail > 0:
                 sync_position()
-                with position_lock:
-                    l_s = position_state[SYMBOL]["long"]["size"]
-                    s_s = position_state[SYMBOL]["short"]["size"]
-                if l_s == 0 and s_s == 0:
-                    with balance_lock:
-                        initial_capital = avail
-                        account_balance = avail
+                snap = state.snapshot
+                if snap.is_flat:
+                    state.update("startup", initial_capital=avail, account_balance=avail)
                     save_initial_capital()
                 else:
-                    if initial_capital > 0:
-                        with balance_lock: account_balance = initial_capital
+                    if snap.initial_capital > 0:
+                        state.update("startup", account_balance=snap.initial_capital)
                     else:
-                        with balance_lock:
-                            initial_capital = avail
-                            account_balance = avail
+                        state.update("startup", initial_capital=avail, account_balance=avail)
                         save_initial_capital()
     except: pass
     
@@ -1261,9 +1865,10 @@ def print_startup_summary():
             log("💵 PRICE", f"{current_price:.4f}")
             cancel_all_orders()
             time.sleep(0.5)
-            with position_lock:
-                l_s = position_state[SYMBOL]["long"]["size"]
-                s_s = position_state[SYMBOL]["short"]["size"]
+            snap = state.snapshot
+            # 재시작: 체결 이력이 없으므로 현재 포지션을 합성 로트 하나로 시작
+            reconcile_lots(snap, force=True)
+            l_s, s_s = snap.long_size, snap.short_size
             if l_s > 0 or s_s > 0:
                 refresh_all_tp_orders()
                 if (l_s > 0 and s_s == 0) or (l_s == 0 and s_s > 0):
@@ -1274,12 +1879,37 @@ def print_startup_summary():
 
 if __name__ == '__main__':
     if not API_KEY or not API_SECRET: exit(1)
+    # 주문을 내기 전에 확인: uid 없이는 체결 이벤트를 받을 수 없음
+    try:
+        user_id = resolve_user_id()
+    except RuntimeError as e:
+        log("❌ START", "%s", e, event="start_failed")
+        log_pipeline.stop()                 # 큐에 남은 로그 flush 후 종료
+        exit(1)
+    if recorder is not None:
+        recorder.start()
+    timers.start()
+    if ENABLE_DEADMAN_SWITCH:
+        order_hygiene.heartbeat()
+    if STRATEGY_CONFIG_FILE:
+        try:
+            strategy_config.load_file(STRATEGY_CONFIG_FILE)
+        except ConfigError:
+            log("⚠️ CONFIG", "Starting with defaults (%s invalid)", STRATEGY_CONFIG_FILE)
+        timers.schedule("config_watch", CONFIG_WATCH_INTERVAL, watch_strategy_config)
     update_event_time()
     print_startup_summary()
-    threading.Thread(target=fetch_kline_thread, daemon=True).start()
-    threading.Thread(target=start_websocket, daemon=True).start()
-    threading.Thread(target=start_grid_monitor, daemon=True).start()
-    threading.Thread(target=tp_monitor, daemon=True).start()
-    threading.Thread(target=idle_monitor, daemon=True).start()
-    threading.Thread(target=periodic_health_check, daemon=True).start()
-    app.run(host="0.0.0.0", port=8080, debug=False, use_reloader=False)
+    if market_feed is not None:
+        market_feed.start()
+    else:
+        timers.schedule("kline", 0, fetch_klines)
+    start_ws_manager(user_id)
+    tp_reprice_trigger.start()
+    invariant_engine.start()
+    # SIGTERM(배포 교체/계정 관리자 종료)에도 finally에서 데드맨 스위치를 해제하도록 예외로 바꿈
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        app.run(host="0.0.0.0", port=PORT, debug=False, use_reloader=False)
+    finally:
+        if ENABLE_DEADMAN_SWITCH:
+            order_hygiene.disarm()
@@ -0,0 +1,374 @@
+"""
+시세 전용 프로세스 + 공유 메모리 링 (FEED_MODE=process)
+
+실행 프로세스의 GIL을 시세 JSON 디코딩/호가창 갱신/지표 계산과 나누지 않도록 별도 프로세스로 분리합니다.
+- 시세 프로세스(run_feed_process): 공개 WS(티커/호가 증분) 수신 → 디코딩 → 로컬 호가창 유지,
+  캔들 REST 조회 → OBV MACD / ATR / 실현 변동성 계산 → 고정 크기 레코드로 ShmRing에 기록
+  · TICK: a=최종 체결가, b=마크 가격
+  · BOOK: a=최우선 매수, b=최우선 매도 (최우선 호가가 바뀔 때만), flags bit0 = 호가창 사용 가능
+  · INDICATOR: a=OBV MACD(정규화), b=ATR, c=ATR%, d=실현 변동성, flags bit0 = 변동성 준비, bit1 = OBV 유효
+  부모 프로세스가 사라지면 스스로 종료. 링 이름을 여러 개 주면 같은 레코드를 모든 링에 기록 (계정 관리자, accounts.py)
+  · 기록 후 링별 깨우기 파이프(wake_fds, Popen pass_fds로 전달)에 1바이트 → 소비 측은 폴링 없이 select로 대기
+  실행 프로세스가 `python market_feed.py <kwargs JSON>`으로 띄움 (multiprocessing spawn은 main.py 전체를 다시 import하므로 사용 안 함)
+- 실행 프로세스(MarketFeed): 소비 스레드가 링에서 레코드를 바로 읽어 콜백 호출 + 수신→반영 지연 측정
+  · 링이 비면 깨우기 파이프를 select (타임아웃 = 감시 주기 1초). 파이프가 없으면(wake_fd 미지정 공유 모드) idle_sleep 폴링
+  · 감시: 생산자 heartbeat가 watchdog_timeout 이상 멈추거나 프로세스가 죽으면 재시작 (링은 그대로 이어 씀)
+  · ring_name 지정 시: 계정 관리자가 만든 링에 붙어 읽기만 함 (재시작은 관리자 담당, 여기서는 경고만)
+  · FeedBook: LocalOrderBook과 같은 조회 인터페이스(is_usable/top/stats)의 최우선 호가 뷰
+"""
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+
+from shm_ring import ShmRing
+
+KIND_TICK = 1
+KIND_BOOK = 2
+KIND_INDICATOR = 3
+KIND_NAMES = {KIND_TICK: "tick", KIND_BOOK: "book", KIND_INDICATOR: "indicator"}
+
+FLAG_USABLE = 1
+FLAG_VOL_READY = 1
+FLAG_OBV_VALID = 2
+
+
+# =============================================================================
+# 시세 프로세스
+# =============================================================================
+def run_feed_process(ring_name, symbol, settle, ws_url, host, kline_interval=60, candle_interval="3m",
+                     book_depth="20", atr_period=14, rv_window=30, heartbeat_interval=0.5, block_timeout=0.05,
+                     wake_fds=None):
+    """ 시세 프로세스 진입점. 메인 모듈(main.py)은 import하지 않음 """
+    from gate_api import ApiClient, Configuration, FuturesApi
+
+    from order_book import LocalOrderBook
+    from strategy import calculate_obv_macd_normalized
+    from volatility import VolatilityTracker
+    from ws_manager import WsConnectionManager
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] [%(levelname)s] [feed] %(message)s")
+    feed_logger = logging.getLogger("market_feed")
+
+    def log(tag, msg, *args, **fields):
+        feed_logger.info(f"[{tag}] {msg}", *args)
+
+    names = ring_name if isinstance(ring_name, (list, tuple)) else [ring_name]
+    rings = [ShmRing.attach(name) for name in names]
+    # 여러 계정에 분배할 때는 느린 소비자 하나가 나머지를 붙잡지 않도록 기다리지 않고 버림
+    wait = block_timeout if len(rings) == 1 else 0.0
+    wakes = list(wake_fds or [])
+    for fd in wakes:
+        os.set_blocking(fd, False)
+
+    def publish(kind, recv_ts, server_ts, a, b=0.0, c=0.0, d=0.0, flags=0, timeout=None):
+        for ring in rings:
+            ring.write(kind, recv_ts, server_ts, a, b, c, d, flags=flags,
+                       block_timeout=wait if timeout is None else timeout)
+        for fd in wakes:
+            try:
+                os.write(fd, b"\0")
+            except OSError:
+                pass    # 파이프가 가득 참 = 소비 측이 아직 읽지 않은 깨우기 신호가 남아 있음
+
+    config = Configuration()
+    config.host = host
+    api = FuturesApi(ApiClient(config))
+    book = LocalOrderBook(symbol)
+    tracker = VolatilityTracker(atr_period=atr_period, rv_window=rv_window)
+    resync_lock = threading.Lock()
+    last_top = [0.0, 0.0, False, 0.0]      # bid, ask, usable, 발행 시각
+
+    def publish_book(recv_ts, server_ts):
+        """ 최우선 호가가 바뀌었거나 1초 이상 발행이 없었을 때만 기록 (실행 측 신선도 유지) """
+        bid, ask = book.top()
+        usable = book.is_usable()
+        if [bid, ask, usable] != last_top[:3] or recv_ts - last_top[3] >= 1.0:
+            last_top[:] = [bid, ask, usable, recv_ts]
+            publish(KIND_BOOK, recv_ts, server_ts, bid, ask, flags=FLAG_USABLE if usable else 0)
+
+    def resync_book():
+        if not resync_lock.acquire(blocking=False):
+            return
+        try:
+            snap = api.list_futures_order_book(settle, contract=symbol, limit=50, with_id=True)
+            book.apply_snapshot(snap.id, [{"p": b.p, "s": b.s} for b in snap.bids or []],
+                                [{"p": a.p, "s": a.s} for a in snap.asks or []])
+            publish_book(time.time(), 0.0)
+        except Exception as e:
+            log("❌ FEED", "Book resync error: %s", e)
+        finally:
+            resync_lock.release()
+
+    def on_ticker(result, message):
+        recv_ts = time.time()
+        server_ts = (message.get("time_ms") or 0) / 1000
+        for item in result if isinstance(result, list) else [result]:
+            if item and item.get("contract", symbol) == symbol:
+                last = float(item.get("last", 0) or 0)
+                mark = float(item.get("mark_price", 0) or 0) or last
+                if last > 0:
+                    publish(KIND_TICK, recv_ts, server_ts, last, mark)
+
+    def on_book(result, message):
+        if not result or result.get("s", symbol) != symbol:
+            return
+        if book.apply_update(result):
+            publish_book(time.time(), (message.get("time_ms") or 0) / 1000)
+        elif not resync_lock.locked():
+            threading.Thread(target=resync_book, daemon=True).start()
+
+    def fetch_indicators():
+        candles = api.list_futures_candlesticks(settle, contract=symbol, interval=candle_interval, limit=200)
+        history = [{"t": float(c.t) if getattr(c, "t", None) else 0, "close": float(c.c), "high": float(c.h),
+                    "low": float(c.l), "volume": float(c.v) if getattr(c, "v", None) else 0} for c in candles or []]
+        if not history:
+            return
+        obv = calculate_obv_macd_normalized([k["close"] for k in history],
+                                            [k["volume"] for k in history]) if len(history) >= 60 else None
+        tracker.update(history)
+        flags = (FLAG_VOL_READY if tracker.ready else 0) | (FLAG_OBV_VALID if obv is not None else 0)
+        publish(KIND_INDICATOR, time.time(), history[-1]["t"], obv or 0.0, tracker.atr, tracker.atr_pct,
+                tracker.realized_vol, flags=flags, timeout=1.0 if len(rings) == 1 else 0.0)
+
+    ws = WsConnectionManager(ws_url, logger=log)
+    ws.subscribe("futures.tickers", [symbol], on_ticker, gap_seconds=30)
+    ws.subscribe("futures.order_book_update", [symbol, "100ms", book_depth], on_book, gap_seconds=10,
+                 backfill=lambda since_ts, until_ts: resync_book())
+    ws.start()
+    resync_book()
+
+    parent = os.getppid()
+    next_kline = 0.0
+    log("🚀 FEED", "Market data process started (pid %d, rings %s)", os.getpid(), ",".join(names))
+    while os.getppid() == parent:
+        for ring in rings:
+            ring.beat()
+        if time.time() >= next_kline:
+            try:
+                fetch_indicators()
+                next_kline = time.time() + kline_interval
+            except Exception as e:
+                log("❌ FEED", "Kline error: %s", e)
+                next_kline = time.time() + 10
+        time.sleep(heartbeat_interval)
+
+
+# =============================================================================
+# 실행 프로세스 측
+# =============================================================================
+class FeedBook:
+    """ 시세 프로세스가 보내는 최우선 호가 (LocalOrderBook 조회 인터페이스) """
+
+    def __init__(self, max_age=5.0):
+        self.max_age = max_age
+        self.best_bid = 0.0
+        self.best_ask = 0.0
+        self.synced = False
+        self.updated_at = 0.0
+        self.updates = 0
+
+    def apply(self, bid, ask, usable):
+        self.best_bid, self.best_ask, self.synced = bid, ask, usable
+        self.updated_at = time.time()
+        self.updates += 1
+
+    def is_usable(self):
+        return (self.synced and self.best_bid > 0 and self.best_ask > self.best_bid
+                and time.time() - self.updated_at < self.max_age)
+
+    def top(self):
+        return self.best_bid, self.best_ask
+
+    def stats(self):
+        return {"source": "feed_process", "synced": self.synced, "best_bid": self.best_bid,
+                "best_ask": self.best_ask, "updates": self.updates,
+                "age_s": round(time.time() - self.updated_at, 3) if self.updated_at else None}
+
+
+class LatencyStats:
+    __slots__ = ("count", "last_ms", "avg_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        self.count += 1
+        self.last_ms = ms
+        self.max_ms = max(self.max_ms, ms)
+        self.avg_ms = ms if self.count == 1 else self.avg_ms * 0.95 + ms * 0.05
+
+    def to_dict(self):
+        return {"count": self.count, "last_ms": round(self.last_ms, 3), "avg_ms": round(self.avg_ms, 3),
+                "max_ms": round(self.max_ms, 3)}
+
+
+class MarketFeed:
+    def __init__(self, symbol, settle, ws_url, host, on_tick=None, on_indicator=None, capacity=4096,
+                 watchdog_timeout=5.0, idle_sleep=0.0005, book_max_age=5.0, ring_name=None, wake_fd=None,
+                 logger=None, **process_kwargs):
+        self.symbol = symbol
+        self.settle = settle
+        self.ws_url = ws_url
+        self.host = host
+        self.on_tick = on_tick              # on_tick(last, mark)
+        self.on_indicator = on_indicator    # on_indicator(obv_macd|None, atr, atr_pct, realized_vol, vol_ready)
+        self.capacity = capacity
+        self.watchdog_timeout = watchdog_timeout
+        self.idle_sleep = idle_sleep
+        self.process_kwargs = process_kwargs
+        self.ring_name = ring_name          # 지정 시 공유 시세 링에 붙기만 함 (프로세스 관리 없음)
+        self.wake_fd = wake_fd              # 공유 모드: 계정 관리자가 넘겨준 깨우기 파이프 읽기 끝 (없으면 폴링)
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.book = FeedBook(max_age=book_max_age)
+        self.ring = None
+        self.process = None
+        self._wake_r = None
+        self._wake_w = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._spawned_at = 0.0
+        self._stalled = False
+        self.restarts = 0
+        self.max_backlog = 0
+        self.latency = {name: LatencyStats() for name in KIND_NAMES.values()}
+
+    # -------------------------------------------------------------------------
+    # 프로세스 관리
+    # -------------------------------------------------------------------------
+    def start(self):
+        if self.ring_name:
+            self.ring = ShmRing.attach(self.ring_name)
+            self._wake_r = self.wake_fd
+            self._spawned_at = time.time()
+        else:
+            self.ring = ShmRing.create(self.capacity)
+            # 재시작해도 같은 파이프를 넘김 (쓰기 끝은 부모도 들고 있어 stop()에서 소비 스레드를 깨움)
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_w, False)
+            self._spawn()
+        self._thread = threading.Thread(target=self._consume, name="market-feed", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _spawn(self):
+        kwargs = dict(self.process_kwargs, ring_name=self.ring.name, symbol=self.symbol, settle=self.settle,
+                      ws_url=self.ws_url, host=self.host, wake_fds=[self._wake_w])
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), json.dumps(kwargs)],
+                                        cwd=os.path.dirname(os.path.abspath(__file__)), pass_fds=(self._wake_w,))
+        self._spawned_at = time.time()
+        self.log("🚀 FEED", "Market data process spawned (pid %d)", self.process.pid,
+                 event="feed_spawn", pid=self.process.pid)
+
+    def _check_liveness(self):
+        """ 프로세스 종료 또는 heartbeat 정지 → 재시작 (기동 직후 watchdog_timeout×2 동안은 유예) """
+        if self.ring_name:
+            stalled = self.ring.heartbeat_age() >= self.watchdog_timeout
+            if stalled and not self._stalled:
+                self.log("⚠️ FEED", "Shared market data feed stalled (heartbeat age %.1fs)", self.ring.heartbeat_age(),
+                         event="feed_stalled", ring=self.ring_name)
+            self._stalled = stalled
+            return
+        alive = self._alive()
+        age = self.ring.heartbeat_age()
+        if alive and (age < self.watchdog_timeout or time.time() - self._spawned_at < self.watchdog_timeout * 2):
+            return
+        self.log("⚠️ FEED", "Market data process %s (heartbeat age %.1fs) → restart",
+                 "alive but stalled" if alive else "dead", age if age != float("inf") else -1,
+                 event="feed_restart", alive=alive)
+        self._terminate()
+        self.restarts += 1
+        self._spawn()
+
+    def _alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def _terminate(self):
+        if self.process is None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait(timeout=2)
+
+    def stop(self):
+        self._stop.set()
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"\0")
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._terminate()
+        if self.ring is not None:
+            self.ring.close()
+        if self._wake_w is not None:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+    # -------------------------------------------------------------------------
+    # 소비
+    # -------------------------------------------------------------------------
+    def _apply(self, kind, flags, recv_ts, server_ts, a, b, c, d):
+        stats = self.latency.get(KIND_NAMES.get(kind))
+        try:
+            if kind == KIND_TICK:
+                if self.on_tick is not None:
+                    self.on_tick(a, b)
+            elif kind == KIND_BOOK:
+                self.book.apply(a, b, bool(flags & FLAG_USABLE))
+            elif kind == KIND_INDICATOR and self.on_indicator is not None:
+                self.on_indicator(a if flags & FLAG_OBV_VALID else None, b, c, d, bool(flags & FLAG_VOL_READY))
+        except Exception as e:
+            self.log("❌ FEED", "Handler error (%s): %s", KIND_NAMES.get(kind), e, event="feed_handler_error")
+        if stats is not None:
+            stats.record((time.time() - recv_ts) * 1000)
+
+    def _consume(self):
+        next_check = time.time() + 1.0
+        while not self._stop.is_set():
+            backlog = self.ring.backlog()
+            if backlog > self.max_backlog:
+                self.max_backlog = backlog
+            if not backlog or not self.ring.read_batch(self._apply):
+                self._wait(next_check - time.time())
+            now = time.time()
+            if now >= next_check:
+                next_check = now + 1.0
+                try:
+                    self._check_liveness()
+                except Exception as e:
+                    self.log("❌ FEED", "Watchdog error: %s", e, event="feed_watchdog_error")
+
+    def _wait(self, timeout):
+        """ 링이 비었을 때: 생산자의 깨우기 바이트 또는 감시 시각까지 대기 """
+        if self._wake_r is None:
+            time.sleep(self.idle_sleep)
+            return
+        ready, _, _ = select.select([self._wake_r], [], [], max(0.0, timeout))
+        if ready:
+            os.read(self._wake_r, 4096)     # 쌓인 신호는 한 번에 비움 (레코드는 링에서 읽음)
+
+    def stats(self):
+        return {"pid": self.process.pid if self.process else None,
+                "alive": not self._stalled if self.ring_name else self._alive(),
+                "shared_ring": self.ring_name,
+                "restarts": self.restarts, "max_backlog": self.max_backlog,
+                "ring": self.ring.stats() if self.ring else None,
+                "latency": {name: s.to_dict() for name, s in self.latency.items()},
+                "book": self.book.stats()}
+
+
+if __name__ == "__main__":
+    run_feed_process(**json.loads(sys.argv[1]))
@@ -0,0 +1,149 @@
+"""
+로컬 L2 호가창 (futures.order_book_update 증분 + REST 스냅샷 재동기화)
+
+- depth_at(price): dict 조회 O(1)
+- best_bid / best_ask: 캐시된 최우선 호가 O(1), 최우선 레벨이 사라질 때만 힙에서 재탐색
+- 업데이트 id(U/u) 불연속 시 stale 표시 → 스냅샷으로 재동기화
+"""
+import heapq
+import threading
+import time
+
+
+class LocalOrderBook:
+    def __init__(self, contract, max_age=5.0):
+        self.contract = contract
+        self.max_age = max_age              # 이 시간 이상 갱신이 없으면 사용하지 않음
+        self._lock = threading.Lock()
+        self._reset()
+        self.resyncs = 0
+        self.gaps = 0
+
+    def _reset(self):
+        self.bids = {}                      # price -> size
+        self.asks = {}
+        self._bid_heap = []                 # (-price)
+        self._ask_heap = []                 # (price)
+        self._best_bid = 0.0
+        self._best_ask = 0.0
+        self.last_id = 0
+        self.updated_at = 0.0
+        self.synced = False
+        self._pending = []                  # 스냅샷 대기 중 버퍼링된 업데이트
+
+    # -------------------------------------------------------------------------
+    # 조회
+    # -------------------------------------------------------------------------
+    @property
+    def best_bid(self):
+        return self._best_bid
+
+    @property
+    def best_ask(self):
+        return self._best_ask
+
+    def depth_at(self, price):
+        price = float(price)
+        size = self.bids.get(price)
+        if size is None:
+            size = self.asks.get(price, 0)
+        return size
+
+    def is_usable(self):
+        return (self.synced and self._best_bid > 0 and self._best_ask > self._best_bid
+                and time.time() - self.updated_at < self.max_age)
+
+    def top(self):
+        return self._best_bid, self._best_ask
+
+    # -------------------------------------------------------------------------
+    # 갱신
+    # -------------------------------------------------------------------------
+    def _set_level(self, book, heap, is_bid, price, size):
+        if size == 0:
+            book.pop(price, None)
+            if is_bid and price == self._best_bid:
+                self._best_bid = self._next_best(book, heap, is_bid)
+            elif not is_bid and price == self._best_ask:
+                self._best_ask = self._next_best(book, heap, is_bid)
+            return
+        if price not in book:
+            heapq.heappush(heap, -price if is_bid else price)
+        book[price] = size
+        if is_bid and price > self._best_bid:
+            self._best_bid = price
+        elif not is_bid and (self._best_ask == 0 or price < self._best_ask):
+            self._best_ask = price
+
+    @staticmethod
+    def _next_best(book, heap, is_bid):
+        # 힙의 지연 삭제: 이미 사라진 레벨은 버림
+        while heap:
+            price = -heap[0] if is_bid else heap[0]
+            if price in book:
+                return price
+            heapq.heappop(heap)
+        return 0.0
+
+    def _apply_levels(self, bids, asks):
+        for level in bids:
+            self._set_level(self.bids, self._bid_heap, True, float(level["p"]), abs(int(level["s"])))
+        for level in asks:
+            self._set_level(self.asks, self._ask_heap, False, float(level["p"]), abs(int(level["s"])))
+
+    def apply_snapshot(self, snapshot_id, bids, asks):
+        """ bids/asks: [{"p": price, "s": size}, ...] """
+        with self._lock:
+            pending = self._pending
+            self._reset()
+            self._apply_levels(bids, asks)
+            self.last_id = int(snapshot_id)
+            self.synced = True
+            self.updated_at = time.time()
+            self.resyncs += 1
+            # 스냅샷 이후의 버퍼 업데이트 재적용
+            for update in pending:
+                if int(update["u"]) <= self.last_id:
+                    continue
+                if not self._apply_update_locked(update):
+                    break
+
+    def _apply_update_locked(self, update):
+        first_id, last_id = int(update["U"]), int(update["u"])
+        if last_id <= self.last_id:
+            return True                     # 이미 반영된 구간
+        if first_id > self.last_id + 1:
+            self.gaps += 1
+            self.synced = False
+            self._pending = [update]
+            return False
+        self._apply_levels(update.get("b", []), update.get("a", []))
+        self.last_id = last_id
+        self.updated_at = time.time()
+        return True
+
+    def apply_update(self, update):
+        """
+        update: futures.order_book_update result ({"U","u","b","a",...})
+        연속성이 깨졌거나 스냅샷 전이면 False (호출 측에서 재동기화)
+        """
+        with self._lock:
+            if not self.synced:
+                self._pending.append(update)
+                if len(self._pending) > 1000:
+                    del self._pending[:500]
+                return False
+            return self._apply_update_locked(update)
+
+    def stats(self):
+        return {
+            "synced": self.synced,
+            "best_bid": self._best_bid,
+            "best_ask": self._best_ask,
+            "bid_levels": len(self.bids),
+            "ask_levels": len(self.asks),
+            "last_id": self.last_id,
+            "age_s": round(time.time() - self.updated_at, 3) if self.updated_at else None,
+            "resyncs": self.resyncs,
+            "gaps": self.gaps,
+        }
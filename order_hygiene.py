@@ -0,0 +1,154 @@
+"""
+주문 위생 관리: 데드맨 스위치 + 중복/오래된 주문 배치 정리
+
+- 데드맨 스위치: Gate countdown cancel-all(계약 단위)을 heartbeat_interval마다 timeout초로 갱신
+  → 프로세스가 죽거나 멈춰 갱신이 끊기면 timeout 뒤 거래소가 해당 계약의 열린 주문을 모두 취소
+- 정리 대상은 로컬 열린 주문 인덱스(OpenOrderIndex)에서 판정 (REST 목록 조회 없음)
+  · 중복: (size, price, reduce_only)가 같은 주문 중 가장 먼저 생성된 것만 남김
+  · 오래됨: create_time + stale_seconds 경과
+- 취소는 cancel_batch_future_orders로 최대 20건씩 → 결과를 last_report / 누적 카운터로 보고
+- 타이머 휠에 등록: 주문 인덱스 변경 후 debounce초 뒤 중복 검사, 가장 오래된 주문의 만료 시각에 정리
+"""
+import time
+
+from gate_api import CountdownCancelAllFuturesTask
+
+BATCH_CANCEL_MAX = 20
+
+
+def _field(result, name):
+    """ 배치 취소 결과 한 건 (SDK 모델 또는 dict) → 필드 값 """
+    return result.get(name) if isinstance(result, dict) else getattr(result, name, None)
+
+
+def find_duplicates(orders):
+    """ (size, price, reduce_only)가 같은 주문 중 가장 오래된 것을 제외한 나머지 """
+    keep = {}
+    duplicates = []
+    for o in sorted(orders, key=lambda o: (o["create_time"], str(o["id"]))):
+        key = (o["size"], o["price"], o["is_reduce_only"])
+        if key in keep:
+            duplicates.append(o)
+        else:
+            keep[key] = o
+    return duplicates
+
+
+def find_stale(orders, now, max_age):
+    return [o for o in orders if o["create_time"] > 0 and now - o["create_time"] >= max_age]
+
+
+class OrderHygiene:
+    def __init__(self, api, settle, contract, index, timers, logger=None,
+                 heartbeat_timeout=30, heartbeat_interval=10, stale_seconds=86400, debounce=1.0, stale_retry=60):
+        self.api = api
+        self.settle = settle
+        self.contract = contract
+        self.index = index                  # OpenOrderIndex
+        self.timers = timers                # TimerWheel
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_seconds = stale_seconds
+        self.debounce = debounce
+        self.stale_retry = stale_retry
+        self.heartbeats = 0
+        self.heartbeat_errors = 0
+        self.last_heartbeat = 0.0
+        self.sweeps = 0
+        self.cancelled = {"duplicate": 0, "stale": 0}
+        self.failed = 0
+        self.last_report = None
+
+    # -------------------------------------------------------------------------
+    # 데드맨 스위치
+    # -------------------------------------------------------------------------
+    def heartbeat(self):
+        """ countdown 갱신 후 다음 갱신 예약 (실패 시 짧은 간격으로 재시도) """
+        delay = self.heartbeat_interval
+        try:
+            self.api.countdown_cancel_all_futures(
+                self.settle, CountdownCancelAllFuturesTask(timeout=self.heartbeat_timeout, contract=self.contract))
+            self.heartbeats += 1
+            self.last_heartbeat = time.time()
+        except Exception as e:
+            self.heartbeat_errors += 1
+            delay = min(2.0, self.heartbeat_interval)
+            self.log("⚠️ DEADMAN", "Countdown refresh failed: %s", e, event="deadman_error")
+        self.timers.schedule("deadman_heartbeat", delay, self.heartbeat)
+
+    def disarm(self):
+        """ 정상 종료: 타이머 해제 + countdown 해제 (timeout=0) """
+        self.timers.cancel("deadman_heartbeat")
+        try:
+            self.api.countdown_cancel_all_futures(
+                self.settle, CountdownCancelAllFuturesTask(timeout=0, contract=self.contract))
+        except Exception as e:
+            self.log("⚠️ DEADMAN", "Countdown disarm failed: %s", e, event="deadman_error")
+
+    # -------------------------------------------------------------------------
+    # 정리
+    # -------------------------------------------------------------------------
+    def on_orders_changed(self):
+        """ 주문 인덱스 변경 → debounce 뒤 중복 검사 (연속 이벤트는 합쳐짐) + 만료 시각 재등록 """
+        self.timers.schedule("order_hygiene", self.debounce, self.sweep)
+        self._arm_stale()
+
+    def _arm_stale(self):
+        created = [o["create_time"] for o in self.index.orders() if o["create_time"] > 0]
+        if created:
+            # 취소에 실패한 만료 주문이 남아 있으면 stale_retry 뒤 재시도
+            due = min(created) + self.stale_seconds
+            if due <= time.time():
+                due = time.time() + self.stale_retry
+            self.timers.schedule_at("stale_orders", due, self.sweep)
+        else:
+            self.timers.cancel("stale_orders")
+
+    def sweep(self):
+        """ 로컬 인덱스 기준 중복/오래된 주문 배치 취소 → 보고 dict """
+        orders = self.index.orders()
+        reasons = {}
+        for o in find_stale(orders, time.time(), self.stale_seconds):
+            reasons[o["id"]] = "stale"
+        for o in find_duplicates(orders):
+            reasons.setdefault(o["id"], "duplicate")
+        report = {"checked": len(orders), "duplicate": 0, "stale": 0, "failed": 0, "ids": []}
+        ids = list(reasons)
+        for i in range(0, len(ids), BATCH_CANCEL_MAX):
+            chunk = ids[i:i + BATCH_CANCEL_MAX]
+            try:
+                results = self.api.cancel_batch_future_orders(self.settle, [str(order_id) for order_id in chunk]) or []
+                failed = {str(_field(r, "id")) for r in results if _field(r, "succeeded") is False}
+            except Exception as e:
+                self.log("❌ HYGIENE", "Batch cancel failed (%d): %s", len(chunk), e, event="hygiene_error")
+                failed = {str(order_id) for order_id in chunk}
+            for order_id in chunk:
+                if str(order_id) in failed:
+                    report["failed"] += 1
+                    continue
+                report[reasons[order_id]] += 1
+                report["ids"].append(order_id)
+                self.index.discard(order_id)
+        self.sweeps += 1
+        self.cancelled["duplicate"] += report["duplicate"]
+        self.cancelled["stale"] += report["stale"]
+        self.failed += report["failed"]
+        if ids:
+            self.last_report = dict(report, at=time.time())
+            self.log("🧹 HYGIENE", "Cancelled %d duplicate / %d stale orders (failed %d)",
+                     report["duplicate"], report["stale"], report["failed"], event="order_hygiene",
+                     duplicate=report["duplicate"], stale=report["stale"], failed=report["failed"])
+        self._arm_stale()
+        return report
+
+    def stats(self):
+        return {
+            "heartbeats": self.heartbeats,
+            "heartbeat_errors": self.heartbeat_errors,
+            "heartbeat_age_s": round(time.time() - self.last_heartbeat, 1) if self.last_heartbeat else None,
+            "sweeps": self.sweeps,
+            "cancelled": dict(self.cancelled),
+            "failed": self.failed,
+            "last_report": self.last_report,
+        }
@@ -0,0 +1,233 @@
+"""
+주문 의도(intent) 레지스트리
+
+클라이언트 주문 text(t-...)마다 어떤 목적의 주문인지(그리드 진입/래더 레벨, TP, Tier 손절,
+리밸런싱, 아이들 진입)와 예상 수량/시각을 기록합니다.
+- 조회: dict 기반 O(1)
+- 만료: 삽입 순서(OrderedDict) 앞쪽부터 나이 기준으로 제거 (amortized O(1))
+- text 자체에도 의도 코드를 넣어 재시작 후에도 대략적인 분류가 가능
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+INTENT_GRID_ENTRY = "grid_entry"
+INTENT_GRID_LEVEL = "grid_level"
+INTENT_IDLE_ENTRY = "idle_entry"
+INTENT_TP = "tp"
+INTENT_TIER_SL = "tier_sl"
+INTENT_REBALANCE = "rebalance"
+INTENT_UNKNOWN = "unknown"
+
+# text 안에 들어가는 2글자 코드 (Gate text 최대 28자: t- + 코드 + ms + _ + seq)
+INTENT_CODES = {
+    INTENT_GRID_ENTRY: "ge",
+    INTENT_GRID_LEVEL: "gl",
+    INTENT_IDLE_ENTRY: "ie",
+    INTENT_TP: "tp",
+    INTENT_TIER_SL: "ts",
+    INTENT_REBALANCE: "rb",
+}
+CODE_INTENTS = {code: intent for intent, code in INTENT_CODES.items()}
+
+ENTRY_INTENTS = (INTENT_GRID_ENTRY, INTENT_GRID_LEVEL, INTENT_IDLE_ENTRY)
+STOP_INTENTS = (INTENT_TIER_SL, INTENT_REBALANCE)
+
+
+class OrderIntent:
+    __slots__ = ("text", "intent", "side", "expected_size", "created_at", "updated_at",
+                 "order_id", "filled_size", "fill_price", "status", "finish_as")
+
+    def __init__(self, text, intent, side=None, expected_size=0, created_at=None):
+        self.text = text
+        self.intent = intent
+        self.side = side                    # 의도 대상 포지션 방향 (long/short)
+        self.expected_size = expected_size  # 부호 포함 계약 수
+        self.created_at = created_at or time.time()
+        self.updated_at = self.created_at
+        self.order_id = None
+        self.filled_size = 0
+        self.fill_price = 0.0
+        self.status = "pending"
+        self.finish_as = None
+
+    @property
+    def is_finished(self):
+        return self.status == "finished"
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class BoundedSet:
+    """ 최근 N개 키만 기억하는 O(1) 중복 검사용 집합 """
+
+    def __init__(self, maxlen=1000):
+        self.maxlen = maxlen
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """ 새 키면 True, 이미 본 키면 False """
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.maxlen:
+                self._keys.popitem(last=False)
+            return True
+
+
+class OrderRegistry:
+    def __init__(self, max_age=86400, max_entries=20000):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._finished = threading.Condition()
+        self._seq = itertools.count(1)
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def next_text(self, intent=INTENT_UNKNOWN, side=None, expected_size=0):
+        """ 고유 text 생성 후 등록 (스레드 안전) """
+        code = INTENT_CODES.get(intent, "")
+        text = f"t-{code}{int(time.time() * 1000)}_{next(self._seq)}"
+        self.register(text, intent, side, expected_size)
+        return text
+
+    def register(self, text, intent, side=None, expected_size=0):
+        entry = OrderIntent(text, intent, side, expected_size)
+        with self._lock:
+            self._entries[text] = entry
+            self._evict_locked(entry.created_at)
+        return entry
+
+    def resolve(self, text):
+        """ text → OrderIntent. 미등록이면 text의 의도 코드로 임시 분류 (등록하지 않음) """
+        if not text:
+            return None
+        entry = self._entries.get(text)
+        if entry is not None:
+            return entry
+        if text.startswith("t-") and len(text) > 4 and text[2:4] in CODE_INTENTS:
+            return OrderIntent(text, CODE_INTENTS[text[2:4]])
+        return None
+
+    def on_order_event(self, order_data):
+        """ futures.orders 이벤트 한 건 반영 → 해당 OrderIntent (없으면 None) """
+        entry = self.resolve(order_data.get("text"))
+        if entry is None:
+            return None
+        size = int(order_data.get("size", 0) or 0)
+        left = int(order_data.get("left", 0) or 0)
+        entry.order_id = order_data.get("id", entry.order_id)
+        entry.filled_size = size - left
+        fill_price = order_data.get("fill_price") or order_data.get("price")
+        if fill_price:
+            entry.fill_price = float(fill_price)
+        entry.status = order_data.get("status", entry.status)
+        entry.finish_as = order_data.get("finish_as", entry.finish_as)
+        entry.updated_at = time.time()
+        if entry.side is None and entry.intent == INTENT_TP and size:
+            # TP는 반대 방향 주문: 매도(음수) → LONG 청산
+            entry.side = "long" if size < 0 else "short"
+        if entry.is_finished:
+            with self._finished:
+                self._finished.notify_all()
+        return entry
+
+    def wait_finished(self, texts, timeout):
+        """ texts 주문이 모두 종료 이벤트를 받을 때까지 대기 → 아직 종료되지 않은 text 리스트 """
+        def pending():
+            return [t for t in texts if not (self._entries.get(t) and self._entries[t].is_finished)]
+        with self._finished:
+            self._finished.wait_for(lambda: not pending(), timeout=timeout)
+        return pending()
+
+    def _evict_locked(self, now):
+        cutoff = now - self.max_age
+        entries = self._entries
+        while entries:
+            text, oldest = next(iter(entries.items()))
+            if oldest.created_at >= cutoff and len(entries) <= self.max_entries:
+                break
+            entries.popitem(last=False)
+            self.evicted += 1
+
+    def evict(self, now=None):
+        with self._lock:
+            self._evict_locked(now or time.time())
+
+    def snapshot(self, limit=50):
+        with self._lock:
+            items = list(self._entries.values())[-limit:]
+        return [e.to_dict() for e in items]
+
+
+class OpenOrderIndex:
+    """
+    열린 주문 로컬 인덱스 (주문 이벤트로 증분 갱신, REST 목록으로 전체 보정)
+    order id → {id, text, size, left, price, is_reduce_only, create_time}
+    """
+
+    def __init__(self):
+        self._orders = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._orders)
+
+    @staticmethod
+    def _record(order_data):
+        return {
+            "id": order_data.get("id"),
+            "text": order_data.get("text"),
+            "size": int(order_data.get("size", 0) or 0),
+            "left": int(order_data.get("left", 0) or 0),
+            "price": str(order_data.get("price", "0")),
+            "is_reduce_only": bool(order_data.get("is_reduce_only", False)),
+            "create_time": float(order_data.get("create_time", 0) or 0),
+        }
+
+    def apply(self, order_data):
+        """ 주문 이벤트 한 건 반영 → 인덱스가 바뀌었으면 True """
+        order_id = order_data.get("id")
+        if order_id is None:
+            return False
+        with self._lock:
+            if order_data.get("status") == "open":
+                self._orders[order_id] = self._record(order_data)
+            elif self._orders.pop(order_id, None) is None:
+                return False
+            self.version += 1
+        return True
+
+    def replace_all(self, orders):
+        """ REST 열린 주문 목록(dict 리스트)으로 교체 → 달라졌으면 True """
+        fresh = {o.get("id"): self._record(o) for o in orders if o.get("id") is not None}
+        with self._lock:
+            changed = fresh.keys() != self._orders.keys()
+            self._orders = fresh
+            if changed:
+                self.version += 1
+        return changed
+
+    def discard(self, order_id):
+        with self._lock:
+            if self._orders.pop(order_id, None) is not None:
+                self.version += 1
+
+    def orders(self):
+        with self._lock:
+            return list(self._orders.values())
+
+    def tp_orders(self):
+        return [o for o in self.orders() if o["is_reduce_only"]]
+
+    def grid_orders(self):
+        return [o for o in self.orders() if not o["is_reduce_only"]]
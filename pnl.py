@@ -0,0 +1,242 @@
+"""
+스트리밍 손익/자산 엔진 (틱/체결마다 증분 갱신, REST 호출 없음)
+
+- 방향별: 계약 수, 평단, 실현 손익, 수수료, 펀딩, 미실현 손익 (USDT)
+  · 진입 체결 → 평단 가중 평균 갱신 / 청산 체결 → (체결가 - 평단) × 수량 × 승수 만큼 실현
+  · 마크 가격(티커 스트림) → 양방향 미실현 손익만 다시 계산 (O(1))
+  · REST 포지션 동기화 → 계약 수/평단을 거래소 값으로 덮어씀 (실현/수수료/펀딩은 유지)
+  · 펀딩(잔고 스트림 type=fund) → 계정 합계에 기록. 정산 펀딩비율을 알면 방향별로도 귀속
+    (롱 = -비율 × 롱 명목, 숏 = +비율 × 숏 명목, 헤지 모드에서 명목 비율 배분은 부호가 틀림)
+- 갱신마다 불변 PnlSnapshot 발행 → 전략 계산과 /metrics가 같은 숫자를 읽음
+  equity = 지갑 잔고(잔고 스트림) + 양방향 미실현 손익
+"""
+import threading
+import time
+from collections import OrderedDict
+
+SIDES = ("long", "short")
+
+
+class SidePnl:
+    __slots__ = ("contracts", "entry", "realized", "fees", "funding", "unrealized")
+
+    def __init__(self, contracts=0.0, entry=0.0, realized=0.0, fees=0.0, funding=0.0, unrealized=0.0):
+        self.contracts = contracts
+        self.entry = entry
+        self.realized = realized
+        self.fees = fees                    # 지불한 수수료 (리베이트는 음수)
+        self.funding = funding              # 받은 펀딩 (지불은 음수, 정산 펀딩비율로 귀속된 몫만)
+        self.unrealized = unrealized
+
+    def copy(self):
+        return SidePnl(self.contracts, self.entry, self.realized, self.fees, self.funding, self.unrealized)
+
+    @property
+    def net(self):
+        return self.realized + self.unrealized - self.fees + self.funding
+
+    def to_dict(self):
+        data = {k: round(getattr(self, k), 6) for k in self.__slots__}
+        data["net"] = round(self.net, 6)
+        return data
+
+
+class PnlSnapshot:
+    __slots__ = ("mark", "multiplier", "long", "short", "wallet", "funding", "updated_at", "version")
+
+    def __init__(self, mark=0.0, multiplier=0.001, long=None, short=None, wallet=0.0, funding=0.0, updated_at=0.0,
+                 version=0):
+        self.mark = mark
+        self.multiplier = multiplier
+        self.long = long or SidePnl()
+        self.short = short or SidePnl()
+        self.wallet = wallet
+        self.funding = funding              # 계정 펀딩 합계 (잔고 스트림 정산액, 방향 귀속 여부와 무관)
+        self.updated_at = updated_at
+        self.version = version
+
+    def side(self, side):
+        return self.long if side == "long" else self.short
+
+    @property
+    def unrealized(self):
+        return self.long.unrealized + self.short.unrealized
+
+    @property
+    def equity(self):
+        return self.wallet + self.unrealized
+
+    def value(self, side):
+        """ 명목 가치 (마크 가격, 마크가 없으면 평단 기준) """
+        s = self.side(side)
+        return s.contracts * self.multiplier * (self.mark or s.entry)
+
+    def loss(self, side):
+        """ 미실현 손실 (이익이면 0) """
+        return max(0.0, -self.side(side).unrealized)
+
+    def loss_rate(self, side):
+        """ 평단 대비 불리한 가격 변화율 (이익이면 0) """
+        s = self.side(side)
+        if s.entry <= 0 or s.contracts <= 0 or self.mark <= 0:
+            return 0.0
+        move = (s.entry - self.mark) if side == "long" else (self.mark - s.entry)
+        return max(0.0, move / s.entry)
+
+    def to_dict(self):
+        return {"mark": self.mark, "wallet": round(self.wallet, 6), "funding": round(self.funding, 6),
+                "unrealized": round(self.unrealized, 6),
+                "equity": round(self.equity, 6), "long": self.long.to_dict(), "short": self.short.to_dict(),
+                "updated_at": self.updated_at, "version": self.version}
+
+
+class PnlEngine:
+    def __init__(self, contract_multiplier=0.001, order_history=200):
+        self.multiplier = float(contract_multiplier)
+        self._lock = threading.Lock()
+        self._snapshot = PnlSnapshot(multiplier=self.multiplier)
+        self._order_realized = OrderedDict()   # 주문 text → 실현 손익 합계 (최근 order_history건)
+        self._order_history = order_history
+        self._listeners = []
+        self.ticks = 0
+        self.fills = 0
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def on_update(self, callback):
+        """ callback(snapshot) - 체결/포지션/펀딩/잔고 갱신마다 호출 (락 밖에서, 틱마다는 아님) """
+        self._listeners.append(callback)
+
+    def _unrealized(self, side, s, mark):
+        if mark <= 0 or s.contracts <= 0:
+            return 0.0
+        sign = 1.0 if side == "long" else -1.0
+        return sign * (mark - s.entry) * s.contracts * self.multiplier
+
+    def _publish(self, long, short, mark=None, wallet=None, funding=None, notify=True):
+        """ 락 안에서 호출 → 새 스냅샷 (리스너 호출은 반환 후 호출 측에서) """
+        old = self._snapshot
+        mark = old.mark if mark is None else mark
+        long.unrealized = self._unrealized("long", long, mark)
+        short.unrealized = self._unrealized("short", short, mark)
+        self._snapshot = PnlSnapshot(mark, self.multiplier, long, short, old.wallet if wallet is None else wallet,
+                                     old.funding if funding is None else funding, time.time(), old.version + 1)
+        return self._snapshot
+
+    def _notify(self, snapshot):
+        for callback in self._listeners:
+            callback(snapshot)
+
+    def _sides(self):
+        old = self._snapshot
+        return {"long": old.long.copy(), "short": old.short.copy()}
+
+    # -------------------------------------------------------------------------
+    # 입력
+    # -------------------------------------------------------------------------
+    def on_mark(self, price):
+        """ 마크 가격 틱 → 미실현 손익만 갱신 (리스너 호출 없음) """
+        price = float(price)
+        if price <= 0:
+            return self._snapshot
+        with self._lock:
+            self.ticks += 1
+            sides = self._sides()
+            return self._publish(sides["long"], sides["short"], mark=price)
+
+    def on_fill(self, side, contracts, price, fee=0.0, opening=True, text=None):
+        """ 체결 한 건 (계약 수 양수) → 이번 체결의 실현 손익 """
+        contracts = abs(float(contracts))
+        price = float(price)
+        if contracts <= 0 or price <= 0:
+            return 0.0
+        with self._lock:
+            self.fills += 1
+            sides = self._sides()
+            s = sides[side]
+            s.fees += float(fee or 0)
+            realized = 0.0
+            if opening:
+                total = s.contracts + contracts
+                s.entry = (s.entry * s.contracts + price * contracts) / total
+                s.contracts = total
+            else:
+                qty = min(contracts, s.contracts)
+                sign = 1.0 if side == "long" else -1.0
+                realized = sign * (price - s.entry) * qty * self.multiplier
+                s.realized += realized
+                s.contracts -= qty
+                if s.contracts <= 0:
+                    s.contracts, s.entry = 0.0, 0.0
+                if text:
+                    history = self._order_realized
+                    history[text] = history.get(text, 0.0) + realized
+                    history.move_to_end(text)
+                    while len(history) > self._order_history:
+                        history.popitem(last=False)
+            snapshot = self._publish(sides["long"], sides["short"])
+        self._notify(snapshot)
+        return realized
+
+    def on_position(self, side, contracts, entry):
+        """ REST 포지션 동기화 → 계약 수/평단 덮어쓰기 """
+        contracts, entry = float(contracts), float(entry)
+        with self._lock:
+            s = self._snapshot.side(side)
+            if s.contracts == contracts and s.entry == entry:
+                return self._snapshot
+            sides = self._sides()
+            sides[side].contracts, sides[side].entry = contracts, (entry if contracts > 0 else 0.0)
+            snapshot = self._publish(sides["long"], sides["short"])
+        self._notify(snapshot)
+        return snapshot
+
+    def on_funding(self, amount, rate=None):
+        """
+        펀딩 정산 (받으면 +, 내면 -) → 계정 합계
+        rate(정산 펀딩비율)를 알면 방향별 귀속: 롱은 +비율을 내고 숏은 받음 (명목 = 계약 × 승수 × 마크)
+        모르면 방향별 값은 건드리지 않음 (헤지 모드에서 정산액만으로는 방향을 나눌 수 없음)
+        """
+        amount = float(amount)
+        with self._lock:
+            old = self._snapshot
+            sides = self._sides()
+            if rate is not None:
+                rate = float(rate)
+                sides["long"].funding -= rate * old.value("long")
+                sides["short"].funding += rate * old.value("short")
+            snapshot = self._publish(sides["long"], sides["short"], funding=old.funding + amount)
+        self._notify(snapshot)
+        return snapshot
+
+    def on_wallet(self, balance):
+        with self._lock:
+            old = self._snapshot
+            if old.wallet == float(balance):
+                return old
+            snapshot = self._publish(old.long.copy(), old.short.copy(), wallet=float(balance))
+        self._notify(snapshot)
+        return snapshot
+
+    # -------------------------------------------------------------------------
+    # 조회
+    # -------------------------------------------------------------------------
+    def order_realized(self, text):
+        """ 주문 text 기준 누적 실현 손익 (체결 기록이 없으면 None) """
+        return self._order_realized.get(text) if text else None
+
+    def close_pnl(self, side, contracts, price):
+        """ 현재 평단 기준 contracts를 price에 청산했을 때의 손익 (체결 기록 없을 때 추정용) """
+        s = self._snapshot.side(side)
+        if s.entry <= 0:
+            return 0.0
+        sign = 1.0 if side == "long" else -1.0
+        return sign * (float(price) - s.entry) * abs(float(contracts)) * self.multiplier
+
+    def stats(self):
+        data = self._snapshot.to_dict()
+        data["ticks"] = self.ticks
+        data["fills"] = self.fills
+        return data
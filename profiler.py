@@ -0,0 +1,150 @@
+"""
+운영 중 진단 도구 (재시작 없이 멈춤 원인 파악)
+
+- SamplingProfiler: sys._current_frames()를 주기적으로 샘플링 → collapsed stack
+  ("스레드;파일:함수:줄;... 횟수") 형식. flamegraph.pl / speedscope에 바로 사용 가능
+- dump_threads(): 모든 스레드의 현재 스택
+- TimedLock: threading.Lock 대체. 대기 시간/경합 횟수/최대 대기/현재 소유 스레드 기록
+"""
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+
+# =============================================================================
+# 샘플링 프로파일러
+# =============================================================================
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """ 한 번에 하나의 프로파일만 실행 (동시 요청은 거절) """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._running = threading.Lock()
+        self.last_samples = 0
+        self.last_overhead_ms = 0.0
+
+    def _sample(self, counts, names, own_ident):
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident) or f"thread-{ident}")
+            counts[";".join(reversed(stack))] += 1
+
+    def profile(self, seconds):
+        """ seconds 동안 모든 스레드를 샘플링 → collapsed stack 텍스트 (실행 중이면 None) """
+        if not self._running.acquire(blocking=False):
+            return None
+        try:
+            counts = Counter()
+            own_ident = threading.get_ident()
+            deadline = time.perf_counter() + seconds
+            samples = 0
+            spent = 0.0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                names = {t.ident: t.name for t in threading.enumerate()}
+                self._sample(counts, names, own_ident)
+                samples += 1
+                spent += time.perf_counter() - started
+                time.sleep(self.interval)
+            self.last_samples = samples
+            self.last_overhead_ms = spent * 1000
+            return "\n".join(f"{stack} {n}" for stack, n in counts.most_common()) + "\n"
+        finally:
+            self._running.release()
+
+
+def dump_threads():
+    """ 모든 스레드의 현재 스택 텍스트 """
+    frames = sys._current_frames()
+    parts = []
+    for thread in sorted(threading.enumerate(), key=lambda t: t.name):
+        frame = frames.get(thread.ident)
+        header = f"--- {thread.name} (ident={thread.ident}, daemon={thread.daemon})"
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "  <no frame>\n"
+        parts.append(f"{header}\n{stack}")
+    return "\n".join(parts)
+
+
+# =============================================================================
+# 대기 시간 측정 락
+# =============================================================================
+class TimedLock:
+    """ threading.Lock과 같은 인터페이스 + 대기 시간 통계 (with / acquire / release / locked) """
+
+    __slots__ = ("name", "_lock", "acquisitions", "contended", "total_wait", "max_wait",
+                 "owner", "acquired_at", "max_hold")
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.owner = None
+        self.acquired_at = 0.0
+        self.max_hold = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking=False):
+            wait = 0.0
+        elif not blocking:
+            return False
+        else:
+            started = time.perf_counter()
+            if not self._lock.acquire(True, timeout):
+                self.contended += 1
+                self.total_wait += time.perf_counter() - started
+                return False
+            wait = time.perf_counter() - started
+            self.contended += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+        self.acquisitions += 1
+        self.owner = threading.current_thread().name
+        self.acquired_at = time.perf_counter()
+        return True
+
+    def release(self):
+        held = time.perf_counter() - self.acquired_at
+        if held > self.max_hold:
+            self.max_hold = held
+        self.owner = None
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        held_for = time.perf_counter() - self.acquired_at if self.owner else 0.0
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "total_wait_ms": round(self.total_wait * 1000, 2),
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "max_hold_ms": round(self.max_hold * 1000, 2),
+            "owner": self.owner,
+            "held_for_ms": round(held_for * 1000, 2),
+        }
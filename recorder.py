@@ -0,0 +1,180 @@
+"""
+수신 메시지 기록기 (WS / 웹훅 / REST 응답 → 압축 세그먼트 파일)
+
+- record()는 큐에 넣고 즉시 반환 (포맷/압축/디스크 쓰기는 백그라운드 스레드)
+- 한 줄 = 한 메시지 JSON: {"ts": 수신 시각, "src": ws|webhook|rest|config, "ch": 채널/메서드, "data": ...}
+  WS는 수신한 원문 문자열을 그대로 저장 (재직렬화 없음)
+- gzip 세그먼트(rec-YYYYmmdd-HHMMSS-NNNN.jsonl.gz)가 segment_bytes를 넘으면 새 파일로 교체,
+  max_segments 초과 시 가장 오래된 세그먼트 삭제
+- 큐가 가득 차면 기록을 버리고 dropped로 집계 (거래 경로를 막지 않음)
+"""
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+SEGMENT_PATTERN = "rec-*.jsonl.gz"
+
+
+def _to_plain(value):
+    """ SDK 모델/리스트 → JSON 가능한 값 """
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    return value
+
+
+class StreamRecorder:
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, max_segments=48,
+                 queue_size=100000, compress_level=1, flush_interval=1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.compress_level = compress_level
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._raw = None
+        self._gz = None
+        self._segment_seq = 0
+        self._thread = None
+        self.recorded = 0
+        self.dropped = 0
+        self.segments = 0
+        self.bytes_written = 0
+        self.current_segment = None
+
+    def record(self, src, channel, data, ts=None):
+        try:
+            self._queue.put_nowait((ts or time.time(), src, channel, data))
+        except queue.Full:
+            self.dropped += 1
+
+    # -------------------------------------------------------------------------
+    # 백그라운드 쓰기
+    # -------------------------------------------------------------------------
+    def _open_segment(self):
+        self._close_segment()
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment_seq += 1
+        name = f"rec-{time.strftime('%Y%m%d-%H%M%S')}-{self._segment_seq:04d}.jsonl.gz"
+        self.current_segment = os.path.join(self.directory, name)
+        self._raw = open(self.current_segment, "wb")
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=self.compress_level)
+        self.segments += 1
+        self._prune()
+
+    def _close_segment(self):
+        if self._gz is not None:
+            self._gz.close()
+            self._raw.close()
+            self._gz = self._raw = None
+
+    def _prune(self):
+        paths = list_segments(self.directory)
+        for path in paths[:max(0, len(paths) - self.max_segments)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _write(self, item):
+        ts, src, channel, data = item
+        if src == "ws" and isinstance(data, str):
+            # 원문을 그대로 삽입 (JSON 문자열이므로 유효한 JSON 라인)
+            line = f'{{"ts":{ts:.6f},"src":"ws","ch":{json.dumps(channel)},"data":{data}}}\n'
+        else:
+            line = json.dumps({"ts": round(ts, 6), "src": src, "ch": channel, "data": _to_plain(data)},
+                              default=str, separators=(",", ":")) + "\n"
+        encoded = line.encode()
+        if self._gz is None or self._raw.tell() >= self.segment_bytes:
+            self._open_segment()
+        self._gz.write(encoded)
+        self.bytes_written += len(encoded)
+        self.recorded += 1
+
+    def run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                try:
+                    self._write(item)
+                except Exception:
+                    self.dropped += 1
+            now = time.time()
+            if self._gz is not None and now - last_flush >= self.flush_interval:
+                # 프로세스가 죽어도 마지막 flush까지는 읽을 수 있도록
+                self._gz.flush()
+                last_flush = now
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="stream-recorder", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self):
+        return {
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "segments": self.segments,
+            "bytes_uncompressed": self.bytes_written,
+            "current_segment": self.current_segment,
+        }
+
+
+class RecordingApi:
+    """ FuturesApi 프록시: 모든 호출의 응답(또는 예외)을 기록한 뒤 그대로 반환 """
+
+    def __init__(self, api, recorder):
+        self._api = api
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        target = getattr(self._api, name)
+        if not callable(target) or name.startswith("_"):
+            return target
+
+        def call(*args, **kwargs):
+            try:
+                result = target(*args, **kwargs)
+            except Exception as e:
+                self._recorder.record("rest", name, {"error": str(e), "status": getattr(e, "status", None)})
+                raise
+            self._recorder.record("rest", name, {"result": result})
+            return result
+        return call
+
+
+# =============================================================================
+# 읽기
+# =============================================================================
+def list_segments(path):
+    """ 디렉터리면 세그먼트 파일을 이름(=시간) 순으로, 파일이면 그 파일만 """
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, SEGMENT_PATTERN)))
+    return [path]
+
+
+def read_records(path):
+    """ 세그먼트 순서대로 기록을 하나씩 (잘린 마지막 줄은 무시) """
+    for segment in list_segments(path):
+        try:
+            with gzip.open(segment, "rt") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except (EOFError, OSError):
+            # 기록 중이던(닫히지 않은) 세그먼트의 끝
+            continue
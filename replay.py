@@ -0,0 +1,139 @@
+"""
+기록 재생 도구 (recorder.py 세그먼트 → 같은 핸들러로 다시 흘려보냄)
+
+사용법:
+    python replay.py recordings/ --speed 1       # 기록된 시간 간격 그대로
+    python replay.py recordings/ --speed 20      # 20배속
+    python replay.py recordings/ --speed 0       # 대기 없이 최대 속도 (처리량 측정)
+    python replay.py recordings/ --target count  # 봇 로직 없이 읽기/분배 처리량만
+
+- --target main: REPLAY_DIR을 설정한 뒤 main을 import → api가 ReplayApi로 대체되어
+  REST 호출은 기록된 응답을 메서드별 기록 순서대로 돌려받고 실제 주문은 나가지 않음
+- WS/웹훅/설정 교체 메시지는 기록 순서대로 한 스레드에서 핸들러를 직접 호출 (WS 실행기 미사용)
+"""
+import argparse
+import os
+import time
+from collections import Counter, defaultdict, deque
+
+from recorder import read_records
+
+
+class ReplayRecord(dict):
+    """ 기록된 SDK 응답 dict를 속성 접근(o.size)과 to_dict()로 읽을 수 있게 감쌈 """
+
+    def __getattr__(self, name):
+        try:
+            return _wrap(self[name])
+        except KeyError:
+            return None
+
+    def to_dict(self):
+        return dict(self)
+
+
+def _wrap(value):
+    if isinstance(value, dict):
+        return ReplayRecord(value)
+    if isinstance(value, list):
+        return [_wrap(v) for v in value]
+    return value
+
+
+class ReplayApi:
+    """ FuturesApi 대체: 메서드별로 기록된 응답을 순서대로 반환 (없으면 list_* → [], 그 외 None) """
+
+    def __init__(self, records):
+        self._responses = defaultdict(deque)
+        for record in records:
+            if record.get("src") == "rest":
+                self._responses[record["ch"]].append(record["data"])
+        self.calls = Counter()
+        self.misses = Counter()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self.calls[name] += 1
+            queue = self._responses.get(name)
+            if not queue:
+                self.misses[name] += 1
+                return [] if name.startswith("list_") else None
+            data = queue.popleft()
+            if "error" in data:
+                raise RuntimeError(f"[replay] {name}: {data['error']}")
+            return _wrap(data.get("result"))
+        return call
+
+
+class Replayer:
+    def __init__(self, records, speed=1.0):
+        self.records = records
+        self.speed = speed                  # 0 → 대기 없음
+        self.counts = Counter()
+        self.errors = Counter()
+        self.max_behind_ms = 0.0
+        self.elapsed = 0.0
+
+    def run(self, dispatch):
+        """ dispatch: {"ws": fn(data), "webhook": fn(data), "config": fn(data)} - 없는 src는 건너뜀 """
+        started = time.perf_counter()
+        first_ts = None
+        for record in self.records:
+            handler = dispatch.get(record.get("src"))
+            if handler is None:
+                continue
+            if self.speed > 0:
+                if first_ts is None:
+                    first_ts = record["ts"]
+                due = started + (record["ts"] - first_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.max_behind_ms = max(self.max_behind_ms, -delay * 1000)
+            try:
+                handler(record["data"])
+                self.counts[record["src"]] += 1
+            except Exception:
+                self.errors[record["src"]] += 1
+        self.elapsed = time.perf_counter() - started
+        return self.stats()
+
+    def stats(self):
+        total = sum(self.counts.values())
+        return {
+            "messages": dict(self.counts),
+            "errors": dict(self.errors),
+            "elapsed_s": round(self.elapsed, 3),
+            "rate_per_sec": round(total / self.elapsed, 1) if self.elapsed else None,
+            "max_behind_ms": round(self.max_behind_ms, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded WS/webhook/REST streams")
+    parser.add_argument("path", help="세그먼트 디렉터리 또는 .jsonl.gz 파일")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0 = 최대 속도)")
+    parser.add_argument("--target", choices=("main", "count"), default="main")
+    args = parser.parse_args()
+
+    if args.target == "count":
+        dispatch = {"ws": lambda data: None, "webhook": lambda data: None, "config": lambda data: None}
+    else:
+        os.environ["REPLAY_DIR"] = args.path
+        import main as bot
+        bot.subscribe_ws_channels("replay")
+        dispatch = {"ws": bot.ws_manager.replay, "webhook": bot.apply_webhook_payload,
+                    "config": lambda data: bot.strategy_config.apply(data, source="replay")}
+
+    result = Replayer(read_records(args.path), args.speed).run(dispatch)
+    print(result)
+    if args.target == "main":
+        print({"rest_calls": dict(bot.api.calls), "rest_misses": dict(bot.api.misses)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+주문 전 리스크 게이트 (로컬 노출 원장 기반, REST 호출 없음)
+
+- RiskLedger: 방향별 포지션 계약 수 / 열린 진입 주문 잔량 / 승인 후 이벤트 대기 중인 예약분,
+  기준 자본, 최대 포지션 잠금, 기준 가격을 증분 갱신 (상태 스냅샷 구독 / 주문 이벤트 / 티커)
+- RiskGate.check(order): 새 노출을 늘리는 주문만 검사 (reduce-only는 통과)
+  · 잠금: 해당 방향이 최대 포지션 잠금 상태
+  · 방향 한도: (포지션 + 열린 주문 + 예약 + 신규) × 승수 × 가격 > 자본 × side_ratio
+  · 총 한도: 양방향 합계 > 자본 × gross_ratio
+  · 주문 속도: 최근 rate_window초 안의 주문 수 ≥ rate_limit (reduce-only는 집계만)
+  승인되면 text 기준으로 예약 → 해당 주문 이벤트가 오면 열린 주문/포지션으로 넘어감
+- RiskGatedApi: FuturesApi 프록시. 생성/배치 생성/수량 amend를 게이트에 통과시키고,
+  차단된 단건은 RiskRejected, 배치는 차단된 자리에 succeeded=False 결과를 넣어 순서를 유지
+"""
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+LABEL_BLOCKED = "RISK_BLOCKED"
+
+
+class RiskRejected(Exception):
+    def __init__(self, reason, order_text=None):
+        super().__init__(f"{LABEL_BLOCKED}: {reason}")
+        self.reason = reason
+        self.order_text = order_text
+
+
+class BlockedOrder:
+    """ 배치 응답 자리 채움 (SDK 배치 결과와 같은 속성 이름) """
+    __slots__ = ("text", "size", "succeeded", "label", "detail", "id", "status", "finish_as", "left")
+
+    def __init__(self, text, size, reason):
+        self.text = text
+        self.size = size
+        self.succeeded = False
+        self.label = LABEL_BLOCKED
+        self.detail = reason
+        self.id = None
+        self.status = None
+        self.finish_as = None
+        self.left = None
+
+
+def _get(order, name):
+    return order.get(name) if isinstance(order, dict) else getattr(order, name, None)
+
+
+def _order_fields(order):
+    """ FuturesOrder 모델 또는 dict → (size, reduce_only, price, text) """
+    if isinstance(order, dict):
+        get = order.get
+        return (get("size"), get("reduce_only") or get("close") or get("auto_size"),
+                get("price"), get("text"))
+    return order.size, order.reduce_only or order.close or order.auto_size, order.price, order.text
+
+
+class RiskLedger:
+    def __init__(self, contract_multiplier=0.001, reservation_ttl=10.0):
+        self.contract_multiplier = contract_multiplier
+        self.reservation_ttl = reservation_ttl
+        self.position = {"long": 0.0, "short": 0.0}     # 계약 수
+        self.open_orders = {"long": 0.0, "short": 0.0}  # 열린 진입 주문 잔량 (계약 수)
+        self.reserved = {"long": 0.0, "short": 0.0}     # 승인 후 주문 이벤트 대기 (계약 수)
+        self.locked = {"long": False, "short": False}
+        self.capital = 0.0
+        self.price = 0.0
+        self._orders = {}                   # str(order id) → (side, 잔량, 전체 수량, reduce_only) - reduce_only는 노출 합계 제외
+        self._reservations = OrderedDict()  # text → (side, 계약 수, 승인 시각)
+        self.lock = threading.Lock()        # 원장 갱신과 게이트 검사가 공유
+
+    def on_state(self, snap):
+        mult = self.contract_multiplier
+        with self.lock:
+            self.position["long"] = float(snap.long_size) / mult
+            self.position["short"] = float(snap.short_size) / mult
+            self.locked["long"] = snap.long_locked
+            self.locked["short"] = snap.short_locked
+            self.capital = float(snap.capital)
+
+    def on_price(self, price):
+        if price > 0:
+            self.price = float(price)
+
+    def on_order(self, order_data):
+        """ futures.orders 이벤트 / REST 주문 dict 한 건 → 열린 진입 주문 잔량과 예약 갱신 """
+        with self.lock:
+            self._apply_order(order_data)
+
+    def _apply_order(self, order_data):
+        self._release(order_data.get("text"))
+        order_id = order_data.get("id")
+        if order_id is None:
+            return
+        order_id = str(order_id)            # WS/REST JSON은 정수, amend/취소 호출은 문자열 → 문자열로 통일
+        previous = self._orders.pop(order_id, None)
+        if previous is not None and not previous[3]:
+            self.open_orders[previous[0]] -= previous[1]
+        left = int(order_data.get("left", 0) or 0)
+        if order_data.get("status") == "open" and left:
+            side = "long" if left > 0 else "short"
+            reduce_only = bool(order_data.get("is_reduce_only"))
+            size = abs(int(order_data.get("size", 0) or 0)) or abs(left)
+            self._orders[order_id] = (side, abs(left), size, reduce_only)
+            if not reduce_only:
+                self.open_orders[side] += abs(left)
+
+    def replace_orders(self, orders):
+        """ REST 열린 주문 목록(dict)으로 열린 주문 잔량 재구성 """
+        with self.lock:
+            self._orders.clear()
+            self.open_orders = {"long": 0.0, "short": 0.0}
+            for o in orders:
+                self._apply_order(o)
+
+    def reserve(self, text, side, contracts, now):
+        if not text:
+            return
+        self._release(text)
+        self._reservations[text] = (side, contracts, now)
+        self.reserved[side] += contracts
+
+    def _release(self, text):
+        item = self._reservations.pop(text, None) if text else None
+        if item is not None:
+            self.reserved[item[0]] -= item[1]
+
+    def expire(self, now):
+        """ 이벤트가 오지 않은 오래된 예약 제거 (앞쪽부터, amortized O(1)) """
+        reservations = self._reservations
+        while reservations:
+            text, (side, contracts, at) = next(iter(reservations.items()))
+            if now - at < self.reservation_ttl:
+                break
+            reservations.popitem(last=False)
+            self.reserved[side] -= contracts
+
+    def open_order(self, order_id):
+        """ 열린 주문 → (side, 잔량, 전체 수량(체결분 포함), reduce_only), 모르는 주문은 None """
+        return self._orders.get(str(order_id))
+
+    def exposure(self, side):
+        return self.position[side] + self.open_orders[side] + self.reserved[side]
+
+    def to_dict(self):
+        return {"position": dict(self.position), "open_orders": dict(self.open_orders),
+                "reserved": dict(self.reserved), "locked": dict(self.locked),
+                "capital": self.capital, "price": self.price}
+
+
+class RiskGate:
+    def __init__(self, ledger, side_ratio=3.0, gross_ratio=6.0, rate_limit=50, rate_window=1.0, logger=None):
+        self.ledger = ledger
+        self.side_ratio = float(side_ratio)
+        self.gross_ratio = float(gross_ratio)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self._recent = deque()              # 최근 주문 시각 (rate_window 안)
+        self.checked = 0
+        self.passed = 0
+        self.blocked = Counter()
+        self.last_blocked = deque(maxlen=20)
+
+    def check(self, order, price=None):
+        """ 주문 한 건 → 차단 사유 (통과면 None, 통과 시 예약까지 처리) """
+        size, reduce_only, order_price, text = _order_fields(order)
+        size = int(size or 0)
+        now = time.monotonic()
+        ledger = self.ledger
+        with ledger.lock:
+            self.checked += 1
+            recent = self._recent
+            cutoff = now - self.rate_window
+            while recent and recent[0] < cutoff:
+                recent.popleft()
+            if reduce_only or size == 0:
+                recent.append(now)
+                self.passed += 1
+                return None
+            if len(recent) >= self.rate_limit:
+                return self._block(order, "rate_limit", f"{len(recent)} orders/{self.rate_window:g}s")
+            side = "long" if size > 0 else "short"
+            if ledger.locked[side]:
+                return self._block(order, "side_locked", side)
+            if price is None:
+                price = float(order_price or 0) or ledger.price
+            if price <= 0:
+                return self._block(order, "no_price", side)
+            ledger.expire(now)
+            contracts = abs(size)
+            unit = ledger.contract_multiplier * price
+            side_value = (ledger.exposure(side) + contracts) * unit
+            side_limit = ledger.capital * self.side_ratio
+            if side_value > side_limit:
+                return self._block(order, "side_limit", f"{side} {side_value:.2f} > {side_limit:.2f}")
+            other = "short" if side == "long" else "long"
+            gross_value = side_value + ledger.exposure(other) * unit
+            gross_limit = ledger.capital * self.gross_ratio
+            if gross_value > gross_limit:
+                return self._block(order, "gross_limit", f"{gross_value:.2f} > {gross_limit:.2f}")
+            recent.append(now)
+            ledger.reserve(text, side, contracts, now)
+            self.passed += 1
+            return None
+
+    def release(self, order):
+        """ 승인했지만 전송에 실패한 주문의 예약 해제 """
+        with self.ledger.lock:
+            self.ledger._release(_get(order, "text"))
+
+    def _block(self, order, reason, detail):
+        self.blocked[reason] += 1
+        text = _get(order, "text")
+        self.last_blocked.append({"at": time.time(), "reason": reason, "detail": detail,
+                                  "text": text, "size": _get(order, "size")})
+        self.log("🛑 RISK", "Order blocked (%s): %s %s", reason, text, detail,
+                 event="risk_blocked", reason=reason, detail=detail, text=text)
+        return f"{reason}: {detail}"
+
+    def stats(self):
+        return {"checked": self.checked, "passed": self.passed, "blocked": dict(self.blocked),
+                "last_blocked": list(self.last_blocked), "ledger": self.ledger.to_dict()}
+
+
+class RiskGatedApi:
+    """ 주문 생성/배치 생성/수량 amend를 RiskGate에 통과시키는 FuturesApi 프록시 """
+
+    def __init__(self, api, gate):
+        self._api = api
+        self._gate = gate
+
+    def __getattr__(self, name):
+        return getattr(self._api, name)
+
+    def create_futures_order(self, settle, order):
+        reason = self._gate.check(order)
+        if reason is not None:
+            raise RiskRejected(reason, _get(order, "text"))
+        try:
+            return self._api.create_futures_order(settle, order)
+        except Exception:
+            self._gate.release(order)
+            raise
+
+    def create_batch_futures_order(self, settle, orders):
+        results = [None] * len(orders)
+        allowed = []
+        for i, order in enumerate(orders):
+            reason = self._gate.check(order)
+            if reason is None:
+                allowed.append(i)
+            else:
+                results[i] = BlockedOrder(_get(order, "text"), _get(order, "size"), reason)
+        if allowed:
+            try:
+                responses = self._api.create_batch_futures_order(settle, [orders[i] for i in allowed]) or []
+            except Exception:
+                for i in allowed:
+                    self._gate.release(orders[i])
+                raise
+            for i, resp in zip(allowed, responses):
+                results[i] = resp
+        return results
+
+    def amend_futures_order(self, settle, order_id, amendment):
+        size = _get(amendment, "size")
+        if size is not None:
+            # amend size는 체결분 포함 새 전체 수량 → 기존 전체 수량 대비 증가분만 새 노출로 검사
+            # reduce_only 주문은 노출을 늘리지 않으므로 검사 없음 (열린 주문 정보는 주문 이벤트로 갱신됨)
+            known = self._gate.ledger.open_order(order_id)
+            increase = 0 if known is not None and known[3] else abs(int(size)) - (known[2] if known else 0)
+            if increase > 0:
+                price = _get(amendment, "price")
+                probe = {"size": increase if int(size) > 0 else -increase, "text": None}
+                reason = self._gate.check(probe, price=float(price) if price else None)
+                if reason is not None:
+                    raise RiskRejected(reason)
+        return self._api.amend_futures_order(settle, order_id, amendment)
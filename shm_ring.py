@@ -0,0 +1,139 @@
+"""
+공유 메모리 단일 생산자/단일 소비자 링 버퍼 (고정 크기 레코드)
+
+- multiprocessing.shared_memory 위에 헤더 + capacity개 64바이트 레코드
+  헤더: 생산자 영역(write_seq/heartbeat/dropped/pid, 캐시 라인 0)과 소비자 영역(read_seq, 캐시 라인 1)을 분리
+- 레코드: kind, flags, seq, 수신 시각, 서버 시각, 값 4개 (의미는 kind별)
+  생산자는 레코드를 쓴 뒤 write_seq를 올림 → 소비자는 read_seq ~ write_seq 구간을 공유 버퍼에서 바로 unpack
+  (파이프/피클 복사 없음). 레코드 seq가 기대값과 다르면 아직 쓰는 중으로 보고 다음에 다시 읽음
+- 백프레셔: 소비자가 읽지 않은 레코드는 덮어쓰지 않음. 가득 차면 block_timeout까지 기다린 뒤 버리고 dropped 증가
+- heartbeat: 생산자가 주기적으로 시각 기록 → 소비자 측 감시(watchdog)가 나이로 생존 판단
+"""
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+RECORD = struct.Struct("<BB6xQdddddd")     # kind, flags, seq, recv_ts, server_ts, a, b, c, d
+RECORD_SIZE = RECORD.size                   # 64
+HEADER_SIZE = 128
+_U64 = struct.Struct("<Q")
+_F64 = struct.Struct("<d")
+# 생산자 캐시 라인
+OFF_WRITE_SEQ = 0
+OFF_HEARTBEAT = 8
+OFF_DROPPED = 16
+OFF_PID = 24
+OFF_CAPACITY = 32
+# 소비자 캐시 라인
+OFF_READ_SEQ = 64
+
+
+class ShmRing:
+    _created = set()                        # 이 프로세스가 만든 링 이름 (같은 프로세스 attach는 추적 유지)
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self._buf = shm.buf
+        self.owner = owner
+        self.name = shm.name
+        self.capacity = _U64.unpack_from(self._buf, OFF_CAPACITY)[0]
+        self.high_water = 0                 # 생산자 측 최대 backlog
+
+    @classmethod
+    def create(cls, capacity=4096, name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * RECORD_SIZE)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        _U64.pack_into(shm.buf, OFF_CAPACITY, capacity)
+        cls._created.add(shm.name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:                   # Python < 3.13: track 인자 없음 → 자식 종료 시 unlink되지 않도록 추적 해제
+            shm = shared_memory.SharedMemory(name=name)
+            # 생성자 자신과 multiprocessing 자식은 생성자와 같은 resource tracker를 공유 → 해제하면 생성자의 등록이
+            # 지워짐 (생성자 unlink 시 tracker KeyError). 별도 프로세스(subprocess)만 자기 tracker에서 해제
+            if name not in cls._created and multiprocessing.parent_process() is None:
+                resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    def _get(self, offset):
+        return _U64.unpack_from(self._buf, offset)[0]
+
+    # -------------------------------------------------------------------------
+    # 생산자
+    # -------------------------------------------------------------------------
+    def write(self, kind, recv_ts, server_ts=0.0, a=0.0, b=0.0, c=0.0, d=0.0, flags=0, block_timeout=0.0):
+        """ 레코드 한 건 기록 → 가득 차서 버렸으면 False """
+        buf = self._buf
+        seq = _U64.unpack_from(buf, OFF_WRITE_SEQ)[0]
+        backlog = seq - _U64.unpack_from(buf, OFF_READ_SEQ)[0]
+        if backlog >= self.capacity:
+            deadline = time.monotonic() + block_timeout
+            while True:
+                backlog = seq - _U64.unpack_from(buf, OFF_READ_SEQ)[0]
+                if backlog < self.capacity:
+                    break
+                if time.monotonic() >= deadline:
+                    _U64.pack_into(buf, OFF_DROPPED, _U64.unpack_from(buf, OFF_DROPPED)[0] + 1)
+                    return False
+                time.sleep(0.0002)
+        RECORD.pack_into(buf, HEADER_SIZE + (seq % self.capacity) * RECORD_SIZE,
+                         kind, flags, seq, recv_ts, server_ts, a, b, c, d)
+        _U64.pack_into(buf, OFF_WRITE_SEQ, seq + 1)
+        if backlog + 1 > self.high_water:
+            self.high_water = backlog + 1
+        return True
+
+    def beat(self, pid=None):
+        _F64.pack_into(self._buf, OFF_HEARTBEAT, time.time())
+        _U64.pack_into(self._buf, OFF_PID, pid or os.getpid())
+
+    # -------------------------------------------------------------------------
+    # 소비자
+    # -------------------------------------------------------------------------
+    def read_batch(self, handler, max_records=256):
+        """ 새 레코드를 handler(kind, flags, recv_ts, server_ts, a, b, c, d)로 처리 → 처리 건수 """
+        buf = self._buf
+        read_seq = _U64.unpack_from(buf, OFF_READ_SEQ)[0]
+        available = _U64.unpack_from(buf, OFF_WRITE_SEQ)[0] - read_seq
+        if available <= 0:
+            return 0
+        n = 0
+        capacity = self.capacity
+        unpack = RECORD.unpack_from
+        for seq in range(read_seq, read_seq + min(available, max_records)):
+            kind, flags, rec_seq, recv_ts, server_ts, a, b, c, d = unpack(buf, HEADER_SIZE + (seq % capacity) * RECORD_SIZE)
+            if rec_seq != seq:
+                break
+            handler(kind, flags, recv_ts, server_ts, a, b, c, d)
+            n += 1
+        _U64.pack_into(buf, OFF_READ_SEQ, read_seq + n)
+        return n
+
+    def backlog(self):
+        return self._get(OFF_WRITE_SEQ) - self._get(OFF_READ_SEQ)
+
+    def heartbeat_age(self):
+        beat = _F64.unpack_from(self._buf, OFF_HEARTBEAT)[0]
+        return time.time() - beat if beat else float("inf")
+
+    def stats(self):
+        write_seq, read_seq = self._get(OFF_WRITE_SEQ), self._get(OFF_READ_SEQ)
+        age = self.heartbeat_age()
+        return {"capacity": self.capacity, "written": write_seq, "read": read_seq,
+                "backlog": write_seq - read_seq, "dropped": self._get(OFF_DROPPED),
+                "producer_pid": self._get(OFF_PID), "heartbeat_age_s": round(age, 3) if age != float("inf") else None}
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
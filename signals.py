@@ -0,0 +1,114 @@
+"""
+OBV 신호 버스: 지표 갱신 → 필요한 경우에만 TP 재가격 트리거
+
+- ObvSignalGate: 마지막으로 반영한 OBV(기준값)와 새 값을 비교하여
+  · 구간 경계(가중치 / TP 갭 구간)를 넘었거나
+  · 기준값 대비 변화가 threshold 이상이면 트리거
+  구간 판정에는 히스테리시스를 적용: 새 값을 기준 구간 쪽으로 hysteresis만큼 당겨도
+  여전히 다른 구간일 때만 넘은 것으로 봄 → 경계 근처 진동으로 재가격이 반복되지 않음
+- CoalescingTrigger: 전용 스레드에서 action(reason) 실행, 최소 실행 간격(rate cap)을 지키고
+  간격 안에 들어온 트리거는 하나로 합쳐 간격이 끝난 뒤 마지막 사유로 한 번 실행 (trailing)
+"""
+import threading
+import time
+from bisect import bisect_right
+
+
+class ObvSignalGate:
+    def __init__(self, bucket_edges, hysteresis=1.0, threshold=5.0):
+        """ bucket_edges: {이름: 절대값 구간 경계 tuple}, 값 단위는 OBV 표시 단위(×100) """
+        self.bucket_edges = bucket_edges
+        self.hysteresis = hysteresis
+        self.threshold = threshold
+        self.reference = None               # 마지막으로 트리거된(반영된) 값
+        self.evaluated = 0
+        self.triggered = 0
+        self.suppressed = 0                 # 경계는 넘었지만 히스테리시스 안쪽이라 무시한 횟수
+
+    def _crossed(self, edges, value):
+        ref_bucket = bisect_right(edges, abs(self.reference))
+        bucket = bisect_right(edges, abs(value))
+        if bucket > ref_bucket:
+            return bisect_right(edges, abs(value) - self.hysteresis) > ref_bucket
+        if bucket < ref_bucket:
+            return bisect_right(edges, abs(value) + self.hysteresis) < ref_bucket
+        return None
+
+    def evaluate(self, value):
+        """ 새 OBV 값 → 트리거 사유 문자열 (트리거 없으면 None). 트리거 시 기준값 갱신 """
+        self.evaluated += 1
+        if self.reference is None:
+            self.reference = value
+            self.triggered += 1
+            return "initial"
+        reason = None
+        for name, edges in self.bucket_edges.items():
+            crossed = self._crossed(edges, value)
+            if crossed:
+                reason = f"{name}_bucket"
+                break
+            if crossed is False:
+                self.suppressed += 1
+        if reason is None and abs(value - self.reference) >= self.threshold:
+            reason = "threshold"
+        if reason is None:
+            return None
+        self.reference = value
+        self.triggered += 1
+        return reason
+
+    def stats(self):
+        return {"reference": self.reference, "evaluated": self.evaluated,
+                "triggered": self.triggered, "suppressed": self.suppressed}
+
+
+class CoalescingTrigger:
+    def __init__(self, action, min_interval=0.5, name="trigger", logger=None):
+        self.action = action
+        self.min_interval = min_interval
+        self.name = name
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._last_run = 0.0
+        self._thread = None
+        self.fired = 0
+        self.coalesced = 0
+        self.runs = 0
+        self.errors = 0
+
+    def fire(self, reason):
+        """ 즉시 반환. 실행 대기 중인 트리거가 있으면 사유만 교체 (합쳐짐) """
+        with self._cond:
+            self.fired += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = reason
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                wait = self._last_run + self.min_interval - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                reason, self._pending = self._pending, None
+                self._last_run = time.monotonic()
+            try:
+                self.action(reason)
+                self.runs += 1
+            except Exception as e:
+                self.errors += 1
+                self.log("❌ SIGNAL", "%s action error: %s", self.name, e, event="signal_error", trigger=self.name)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self):
+        return {"fired": self.fired, "coalesced": self.coalesced, "runs": self.runs,
+                "errors": self.errors, "pending": self._pending is not None}
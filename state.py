@@ -0,0 +1,141 @@
+"""
+불변(immutable) 버전 상태 스냅샷
+
+- BotState: 포지션/잔고/초기 자본/OBV/최대 포지션 잠금/평단 TP 주문을 담는 __slots__ 객체.
+  생성 후 수정 불가 → 읽는 쪽은 락 없이 snapshot 참조 하나로 일관된 값을 얻음
+- StateStore: 쓰기는 update() 한 곳으로만 (쓰기끼리는 직렬화 = 단일 writer),
+  새 스냅샷을 만든 뒤 참조를 한 번에 교체하여 발행 (CPython 참조 대입은 원자적)
+- subscribe(callback, fields): 관심 필드가 바뀐 발행마다 callback(old, new, changed)
+"""
+import threading
+import time
+from decimal import Decimal
+
+ZERO = Decimal("0")
+
+
+class BotState:
+    __slots__ = ("version", "updated_at", "source",
+                 "long_size", "long_entry", "short_size", "short_entry",
+                 "account_balance", "initial_capital", "obv_macd",
+                 "long_locked", "short_locked", "long_avg_tp_id", "short_avg_tp_id")
+
+    FIELDS = __slots__[3:]
+
+    def __init__(self, version=0, updated_at=0.0, source="init",
+                 long_size=ZERO, long_entry=ZERO, short_size=ZERO, short_entry=ZERO,
+                 account_balance=ZERO, initial_capital=ZERO, obv_macd=ZERO,
+                 long_locked=False, short_locked=False, long_avg_tp_id=None, short_avg_tp_id=None):
+        setter = object.__setattr__
+        setter(self, "version", version)
+        setter(self, "updated_at", updated_at)
+        setter(self, "source", source)
+        setter(self, "long_size", long_size)
+        setter(self, "long_entry", long_entry)
+        setter(self, "short_size", short_size)
+        setter(self, "short_entry", short_entry)
+        setter(self, "account_balance", account_balance)
+        setter(self, "initial_capital", initial_capital)
+        setter(self, "obv_macd", obv_macd)
+        setter(self, "long_locked", long_locked)
+        setter(self, "short_locked", short_locked)
+        setter(self, "long_avg_tp_id", long_avg_tp_id)
+        setter(self, "short_avg_tp_id", short_avg_tp_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BotState is immutable; use StateStore.update()")
+
+    # -------------------------------------------------------------------------
+    # 방향별 조회
+    # -------------------------------------------------------------------------
+    def size(self, side):
+        return self.long_size if side == "long" else self.short_size
+
+    def entry(self, side):
+        return self.long_entry if side == "long" else self.short_entry
+
+    def locked(self, side):
+        return self.long_locked if side == "long" else self.short_locked
+
+    def avg_tp_id(self, side):
+        return self.long_avg_tp_id if side == "long" else self.short_avg_tp_id
+
+    @property
+    def capital(self):
+        """ 계산 기준 자본: 초기 자본이 있으면 초기 자본, 없으면 현재 잔고 """
+        return self.initial_capital if self.initial_capital > 0 else self.account_balance
+
+    @property
+    def main_side(self):
+        if self.long_size > self.short_size: return "long"
+        if self.short_size > self.long_size: return "short"
+        return "none"
+
+    @property
+    def is_flat(self):
+        return self.long_size == 0 and self.short_size == 0
+
+    def evolve(self, source, **changes):
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(changes)
+        return BotState(self.version + 1, time.time(), source, **values)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        for k, v in data.items():
+            if isinstance(v, Decimal):
+                data[k] = str(v)
+        return data
+
+
+class StateStore:
+    def __init__(self, initial=None, logger=None):
+        self._state = initial or BotState()
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self._writer = threading.Lock()     # 쓰기 직렬화 전용 (읽기에는 사용하지 않음)
+        self._subscribers = []
+        self.publishes = 0
+
+    @property
+    def snapshot(self):
+        """ 현재 스냅샷 (락 없음, 반환된 객체는 절대 바뀌지 않음) """
+        return self._state
+
+    def subscribe(self, callback, fields=None):
+        """ callback(old, new, changed) - fields 중 하나라도 바뀐 발행마다 호출 (None이면 전부) """
+        self._subscribers.append((callback, frozenset(fields) if fields else None))
+
+    def update(self, source="", **changes):
+        """ 바뀐 필드가 있을 때만 새 스냅샷 발행 → 발행된(또는 기존) 스냅샷 """
+        unknown = set(changes) - set(BotState.FIELDS)
+        if unknown:
+            raise AttributeError(f"Unknown state fields: {sorted(unknown)}")
+        return self.update_with(lambda old: changes, source)
+
+    def update_with(self, fn, source=""):
+        """ 읽고-바꾸기: fn(현재 스냅샷) → 바꿀 필드 dict (None/빈 dict면 발행 안 함). writer 안에서 실행 """
+        with self._writer:
+            old = self._state
+            changes = fn(old) or {}
+            changed = frozenset(k for k, v in changes.items() if getattr(old, k) != v)
+            if not changed:
+                return old
+            new = old.evolve(source, **{k: changes[k] for k in changed})
+            self._state = new
+            self.publishes += 1
+        self._notify(old, new, changed)
+        return new
+
+    def _notify(self, old, new, changed):
+        for callback, fields in self._subscribers:
+            if fields is None or fields & changed:
+                try:
+                    callback(old, new, changed)
+                except Exception as e:
+                    self.log("❌ STATE", "Subscriber error: %s", e, event="state_subscriber_error")
+
+    def stats(self):
+        data = self._state.to_dict()
+        data["publishes"] = self.publishes
+        data["subscribers"] = len(self._subscribers)
+        return data
@@ -0,0 +1,115 @@
+"""
+전략 수량/TP 계산 (순수 함수)
+
+main.py의 실거래 로직과 sweep.py의 파라미터 스윕이 같은 계산을 사용하도록
+API/전역 상태에 의존하지 않는 계산만 모아둡니다.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+
+CONTRACT_MULTIPLIER = Decimal("0.001")      # 1 계약 = 0.001 코인
+
+# OBV 절대값(표시 단위, ×100) 구간 경계와 구간별 값
+OBV_WEIGHT_EDGES = (20, 30, 40, 50, 60, 70, 100)
+OBV_WEIGHTS = tuple(Decimal(v) for v in ("1.1", "1.2", "1.3", "1.4", "1.5", "1.6", "1.8", "2.0"))
+OBV_TP_EDGES = (10, 20, 30, 50)
+OBV_TP_RATIOS = tuple(Decimal(v) for v in ("0.3", "0.5", "0.7", "0.85", "1.0"))
+
+
+def obv_bucket(obv_abs, edges):
+    """ 구간 번호 (edges[i-1] <= obv_abs < edges[i] → i) """
+    return bisect_right(edges, obv_abs)
+
+
+def calculate_obv_macd_weight(obv_value, edges=OBV_WEIGHT_EDGES, weights=OBV_WEIGHTS):
+    return weights[obv_bucket(abs(obv_value), edges)]
+
+
+def calculate_obv_macd_normalized(closes, volumes):
+    """ OBV의 EMA(12) - EMA(26)을 최근 60개 OBV 최대 절대값으로 정규화. 데이터 부족 시 None """
+    if len(closes) < 60:
+        return None
+    obv = [0]
+    for i in range(1, len(closes)):
+        if closes[i] > closes[i-1]: obv.append(obv[-1] + volumes[i])
+        elif closes[i] < closes[i-1]: obv.append(obv[-1] - volumes[i])
+        else: obv.append(obv[-1])
+
+    def ema(data, period):
+        ema_vals = []
+        k = 2 / (period + 1)
+        ema_vals.append(sum(data[:period]) / period)
+        for price in data[period:]:
+            ema_vals.append(price * k + ema_vals[-1] * (1 - k))
+        return ema_vals
+
+    window = obv[-60:]
+    macd_line = ema(window, 12)[-1] - ema(window, 26)[-1]
+    max_obv = max(abs(max(window)), abs(min(window)))
+    if max_obv <= 0:
+        return None
+    return macd_line / max_obv / 100
+
+
+def calculate_obv_tp_gap(obv_display, tp_min, tp_max, edges=OBV_TP_EDGES, ratios=OBV_TP_RATIOS):
+    """ OBV 절대값 구간별 TP 갭 (tp_min ~ tp_max 사이, 구간 수 = len(ratios)) """
+    tp_ratio = ratios[obv_bucket(abs(obv_display), edges)]
+    return tp_min + (tp_max - tp_min) * tp_ratio
+
+
+def loss_rate_multiplier(loss_rate, loss_weight=Decimal("20")):
+    """ 손실률 → 진입 수량 가중치 (1 + 손실률 × loss_weight) """
+    return Decimal("1.0") + loss_rate * loss_weight
+
+
+def calculate_loss_multiplier(main_side, price, long_entry, short_entry, loss_weight=Decimal("20")):
+    """ 주력 포지션 손실률 × loss_weight 만큼 진입 수량 가중. (multiplier, loss_rate) 반환 """
+    if main_side == "long" and long_entry > 0 and price < long_entry:
+        loss_rate = (long_entry - price) / long_entry
+        return loss_rate_multiplier(loss_rate, loss_weight), loss_rate
+    if main_side == "short" and short_entry > 0 and price > short_entry:
+        loss_rate = (price - short_entry) / short_entry
+        return loss_rate_multiplier(loss_rate, loss_weight), loss_rate
+    return Decimal("1.0"), Decimal("0")
+
+
+def calculate_idle_multiplier(idle_entry_count):
+    if idle_entry_count <= 1:
+        return Decimal("1.0")
+    idle_multiplier = Decimal("1.0") + Decimal(str((idle_entry_count - 1) * 0.1))
+    return min(idle_multiplier, Decimal("2.0"))
+
+
+def calculate_entry_contracts(capital, price, obv_display, loss_multiplier, idle_multiplier, base_ratio,
+                              obv_edges=OBV_WEIGHT_EDGES, obv_weights=OBV_WEIGHTS):
+    """
+    진입 계약 수 계산 → (long_contracts, short_contracts, obv_multiplier)
+    OBV > 0 이면 SHORT, OBV < 0 이면 LONG 쪽에 OBV 가중치를 곱합니다.
+    """
+    base_value = Decimal(str(capital)) * base_ratio
+    base_qty = base_value / Decimal(str(price))
+    obv_multiplier = calculate_obv_macd_weight(obv_display, obv_edges, obv_weights)
+
+    final_long = base_qty * loss_multiplier * idle_multiplier
+    final_short = base_qty * loss_multiplier * idle_multiplier
+    if obv_display > 0:
+        final_short *= obv_multiplier
+    elif obv_display < 0:
+        final_long *= obv_multiplier
+
+    long_qty_contract = max(int(final_long / CONTRACT_MULTIPLIER), 1)
+    short_qty_contract = max(int(final_short / CONTRACT_MULTIPLIER), 1)
+    return long_qty_contract, short_qty_contract, obv_multiplier
+
+
+def calculate_tier_sl_qty(main_position_value, capital, non_main_size,
+                          tier1_factor=Decimal("0.8"), tier2_factor=Decimal("1.5")):
+    """
+    비주력 TP 체결 시 주력 포지션 손절 수량 (코인 단위)
+    주력 가치 < 자본 1배: 손절 없음 (None) / 1~2배: Tier-1 / 2배 이상: Tier-2
+    """
+    if main_position_value < capital:
+        return None, None
+    if main_position_value < capital * Decimal("2.0"):
+        return Decimal(str(non_main_size)) * tier1_factor, f"Tier-1 ({tier1_factor}x)"
+    return Decimal(str(non_main_size)) * tier2_factor, f"Tier-2 ({tier2_factor}x)"
@@ -0,0 +1,363 @@
+"""
+전략 파라미터 스윕 (녹화된 캔들 데이터 기반 병렬 백테스트)
+
+사용법:
+    python sweep.py candles.csv --samples 500 --workers 8 --out sweep_results.csv
+    python sweep.py candles.json --grid sweep_grid.json
+
+- 캔들 파일은 한 번만 읽어 공유 메모리(SharedMemory)에 올리고, 워커 프로세스는
+  복사 없이 같은 버퍼를 참조합니다. (워커 수에 거의 선형으로 확장)
+- 수량/TP 계산은 실거래와 동일하게 strategy.py / volatility.py 함수를 사용합니다.
+
+캔들 파일 형식:
+    CSV : t,open,high,low,close,volume (헤더 포함)
+    JSON: Gate.io candlestick 리스트 [{"t":..,"o":..,"h":..,"l":..,"c":..,"v":..}, ...]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from strategy import (
+    CONTRACT_MULTIPLIER, calculate_obv_macd_normalized, calculate_obv_tp_gap,
+    calculate_loss_multiplier, calculate_idle_multiplier, calculate_entry_contracts,
+    calculate_tier_sl_qty,
+)
+from volatility import VolatilityTracker, VolatilityTPModel
+
+# 공유 메모리 컬럼 레이아웃
+COL_T, COL_OPEN, COL_HIGH, COL_LOW, COL_CLOSE, COL_VOLUME, COL_OBV, COL_ATR_PCT, COL_RV = range(9)
+NUM_COLS = 9
+
+WARMUP_CANDLES = 60
+OBV_WINDOW = 200
+TAKER_FEE = 0.0005                          # 시장가 진입/손절
+MAKER_FEE = 0.0002                          # TP 지정가
+
+# 기본 탐색 공간: 리스트 = 그리드 후보 / [lo, hi] 튜플 = 랜덤 샘플 구간
+DEFAULT_SPACE = {
+    "base_ratio": [0.005, 0.01, 0.015, 0.02],
+    "tp_min": [0.0015, 0.0021, 0.003],
+    "tp_max": [0.004, 0.006, 0.01],
+    "loss_weight": [10, 20, 30],
+    "tier1_factor": [0.5, 0.8, 1.0],
+    "tier2_factor": [1.0, 1.5, 2.0],
+    "idle_time_seconds": [300, 600, 1200],
+    "rebalance_seconds": [3 * 3600, 5 * 3600, 8 * 3600],
+    "tp_atr_multiplier": [0, 0.5, 1.0],      # 0 → OBV 단계 TP 사용
+}
+
+
+# =============================================================================
+# 데이터 로드 / 전처리
+# =============================================================================
+def load_candles(path):
+    rows = []
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            for c in json.load(f):
+                rows.append((float(c["t"]), float(c.get("o", c["c"])), float(c["h"]),
+                             float(c["l"]), float(c["c"]), float(c.get("v") or 0)))
+    else:
+        with open(path, "r", newline="") as f:
+            for r in csv.DictReader(f):
+                rows.append((float(r["t"]), float(r.get("open") or r["close"]), float(r["high"]),
+                             float(r["low"]), float(r["close"]), float(r.get("volume") or 0)))
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+
+def build_feature_matrix(rows, atr_period=14, rv_window=30):
+    """ 파라미터와 무관한 지표(OBV-MACD, ATR%, RV)를 한 번만 계산 """
+    data = np.zeros((len(rows), NUM_COLS), dtype=np.float64)
+    data[:, :6] = np.asarray(rows, dtype=np.float64)
+
+    closes = data[:, COL_CLOSE].tolist()
+    volumes = data[:, COL_VOLUME].tolist()
+    tracker = VolatilityTracker(atr_period=atr_period, rv_window=rv_window)
+    window = atr_period + 2
+    for i in range(len(rows)):
+        lo = max(0, i + 1 - OBV_WINDOW)
+        obv = calculate_obv_macd_normalized(closes[lo:i + 1], volumes[lo:i + 1])
+        data[i, COL_OBV] = obv * 100 if obv is not None else 0.0
+
+        if i + 1 >= window:
+            candles = [{"t": data[j, COL_T], "high": data[j, COL_HIGH], "low": data[j, COL_LOW],
+                        "close": data[j, COL_CLOSE]} for j in range(i + 1 - window, i + 1)]
+            if tracker.update(candles) and tracker.ready:
+                data[i, COL_ATR_PCT] = tracker.atr_pct
+                data[i, COL_RV] = tracker.realized_vol
+    return data
+
+
+# =============================================================================
+# 워커 (공유 메모리 참조)
+# =============================================================================
+_shm = None
+_data = None
+
+
+def _init_worker(shm_name, shape):
+    global _shm, _data
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _data = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+
+
+class _VolSnapshot:
+    """ VolatilityTPModel.raw_gap에 넘길 최소 인터페이스 """
+    __slots__ = ("atr_pct", "realized_vol", "ready")
+
+    def __init__(self, atr_pct, realized_vol):
+        self.atr_pct = atr_pct
+        self.realized_vol = realized_vol
+        self.ready = atr_pct > 0
+
+
+def simulate(params, data, initial_capital=50.0, max_position_ratio=3.0):
+    """
+    main.py의 이벤트 흐름을 캔들 단위로 재현:
+    무포지션 → 양방향 진입 / TP 체결 → Tier 손절·리밸런싱 → 재진입 / 아이들 진입
+    """
+    base_ratio = Decimal(str(params["base_ratio"]))
+    tp_min = Decimal(str(params["tp_min"]))
+    tp_max = Decimal(str(max(params["tp_max"], params["tp_min"])))
+    loss_weight = Decimal(str(params["loss_weight"]))
+    tier1 = Decimal(str(params["tier1_factor"]))
+    tier2 = Decimal(str(params["tier2_factor"]))
+    idle_time = float(params["idle_time_seconds"])
+    rebalance_time = float(params["rebalance_seconds"])
+    atr_mult = float(params.get("tp_atr_multiplier", 0))
+    tp_model = VolatilityTPModel(tp_min, tp_max, atr_multiplier=atr_mult) if atr_mult > 0 else None
+    contract = float(CONTRACT_MULTIPLIER)
+
+    cash = initial_capital
+    capital = initial_capital
+    pos = {"long": [0.0, 0.0], "short": [0.0, 0.0]}    # [size(코인), entry]
+    tp_price = {"long": 0.0, "short": 0.0}
+    last_event = data[WARMUP_CANDLES, COL_T]
+    no_position_since = 0.0
+    idle_count = 0
+    fees = 0.0
+    peak_equity = initial_capital
+    max_drawdown = 0.0
+    stats = {"tp_fills": 0, "entries": 0, "tier_sl": 0, "rebalances": 0, "idle_entries": 0}
+
+    def unrealized(price):
+        return (pos["long"][0] * (price - pos["long"][1]) +
+                pos["short"][0] * (pos["short"][1] - price))
+
+    def close_side(side, qty, price, fee_rate):
+        nonlocal cash, fees
+        size, entry = pos[side]
+        qty = min(qty, size)
+        pnl = qty * (price - entry) if side == "long" else qty * (entry - price)
+        fee = qty * price * fee_rate
+        cash += pnl - fee
+        fees += fee
+        pos[side][0] = size - qty
+        if pos[side][0] <= 1e-12:
+            pos[side] = [0.0, 0.0]
+        return qty
+
+    def tp_gap(i):
+        if tp_model is not None:
+            snap = _VolSnapshot(data[i, COL_ATR_PCT], data[i, COL_RV])
+            if snap.ready:
+                return float(tp_model.raw_gap(snap))
+        return float(calculate_obv_tp_gap(data[i, COL_OBV], tp_min, tp_max))
+
+    def reprice_tp(i):
+        gap = tp_gap(i)
+        tp_price["long"] = pos["long"][1] * (1 + gap) if pos["long"][0] > 0 else 0.0
+        tp_price["short"] = pos["short"][1] * (1 - gap) if pos["short"][0] > 0 else 0.0
+
+    def enter(i, price):
+        nonlocal cash, fees, capital, last_event
+        if pos["long"][0] == 0 and pos["short"][0] == 0:
+            capital = cash
+        main_side = "long" if pos["long"][0] > pos["short"][0] else "short" if pos["short"][0] > pos["long"][0] else "none"
+        loss_mult, _ = calculate_loss_multiplier(main_side, Decimal(str(price)), Decimal(str(pos["long"][1])),
+                                                 Decimal(str(pos["short"][1])), loss_weight)
+        long_c, short_c, _ = calculate_entry_contracts(capital, price, data[i, COL_OBV], loss_mult,
+                                                       calculate_idle_multiplier(idle_count), base_ratio)
+        for side, qty in (("long", long_c * contract), ("short", short_c * contract)):
+            size, entry = pos[side]
+            pos[side] = [size + qty, (size * entry + qty * price) / (size + qty)]
+            fee = qty * price * TAKER_FEE
+            cash -= fee
+            fees += fee
+        stats["entries"] += 1
+        last_event = data[i, COL_T]
+        reprice_tp(i)
+
+    for i in range(WARMUP_CANDLES, len(data)):
+        t, high, low, price = data[i, COL_T], data[i, COL_HIGH], data[i, COL_LOW], data[i, COL_CLOSE]
+
+        if pos["long"][0] == 0 and pos["short"][0] == 0:
+            if no_position_since == 0:
+                no_position_since = t
+            enter(i, price)
+            continue
+
+        filled = None
+        if pos["long"][0] > 0 and tp_price["long"] > 0 and high >= tp_price["long"]:
+            filled = "long"
+        elif pos["short"][0] > 0 and tp_price["short"] > 0 and low <= tp_price["short"]:
+            filled = "short"
+
+        if filled:
+            other = "short" if filled == "long" else "long"
+            tp_qty = close_side(filled, pos[filled][0], tp_price[filled], MAKER_FEE)
+            stats["tp_fills"] += 1
+            last_event = t
+            idle_count = 0
+
+            # 리밸런싱: main.check_rebalancing_condition과 같은 명목가 비교
+            if no_position_since and t - no_position_since >= rebalance_time:
+                if tp_qty * tp_price[filled] > pos[other][0] * price * 0.8:
+                    close_side(other, pos[other][0], price, TAKER_FEE)
+                    stats["rebalances"] += 1
+
+            # Tier 손절: main.handle_non_main_position_tp
+            main_side = "long" if pos["long"][0] > pos["short"][0] else "short"
+            main_value = Decimal(str(pos[main_side][0] * price))
+            sl_qty, _ = calculate_tier_sl_qty(main_value, Decimal(str(capital)), tp_qty, tier1, tier2)
+            if sl_qty is not None and pos[main_side][0] > 0:
+                close_side(main_side, max(float(sl_qty), contract), price, TAKER_FEE)
+                stats["tier_sl"] += 1
+
+            if pos["long"][0] == 0 and pos["short"][0] == 0:
+                no_position_since = t
+            else:
+                no_position_since = 0
+            enter(i, price)
+        elif t - last_event >= idle_time:
+            exposure = (pos["long"][0] + pos["short"][0]) * price
+            if exposure < capital * max_position_ratio:
+                idle_count += 1
+                stats["idle_entries"] += 1
+                enter(i, price)
+            else:
+                last_event = t
+
+        equity = cash + unrealized(price)
+        if equity > peak_equity:
+            peak_equity = equity
+        elif peak_equity > 0:
+            max_drawdown = max(max_drawdown, (peak_equity - equity) / peak_equity)
+
+    final_equity = cash + unrealized(data[-1, COL_CLOSE])
+    result = dict(params)
+    result.update(stats)
+    result.update({
+        "final_equity": round(final_equity, 4),
+        "return_pct": round((final_equity / initial_capital - 1) * 100, 4),
+        "max_drawdown_pct": round(max_drawdown * 100, 4),
+        "fees": round(fees, 4),
+    })
+    return result
+
+
+def _run(params):
+    return simulate(params, _data)
+
+
+# =============================================================================
+# 파라미터 생성
+# =============================================================================
+def grid_params(space):
+    keys = list(space)
+    values = [v if isinstance(v, list) else list(v) for v in space.values()]
+    for combo in itertools.product(*values):
+        yield dict(zip(keys, combo))
+
+
+def random_params(space, samples, seed=None):
+    rng = random.Random(seed)
+    for _ in range(samples):
+        params = {}
+        for key, value in space.items():
+            if isinstance(value, list):
+                params[key] = rng.choice(value)
+            else:
+                lo, hi = value
+                params[key] = rng.uniform(lo, hi)
+        yield params
+
+
+def run_sweep(data, param_sets, workers=None):
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        shared = np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)
+        shared[:] = data
+        workers = workers or os.cpu_count() or 1
+        param_sets = list(param_sets)
+        chunksize = max(1, len(param_sets) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, data.shape)) as pool:
+            results = list(pool.map(_run, param_sets, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+    results.sort(key=lambda r: (r["return_pct"], -r["max_drawdown_pct"]), reverse=True)
+    return results
+
+
+def write_results(results, path):
+    if not results:
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["rank"] + list(results[0]))
+        writer.writeheader()
+        for rank, row in enumerate(results, 1):
+            writer.writerow({"rank": rank, **row})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel strategy parameter sweep")
+    parser.add_argument("candles", help="recorded candle file (.csv / .json)")
+    parser.add_argument("--grid", help="JSON parameter space (defaults to built-in space)")
+    parser.add_argument("--samples", type=int, default=0, help="random samples instead of full grid")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep_results.csv")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    space = DEFAULT_SPACE
+    if args.grid:
+        with open(args.grid, "r") as f:
+            space = {k: (v if isinstance(v, list) else tuple(v["range"])) if isinstance(v, dict) else v
+                     for k, v in json.load(f).items()}
+
+    started = time.time()
+    rows = load_candles(args.candles)
+    if len(rows) <= WARMUP_CANDLES:
+        raise SystemExit(f"Not enough candles: {len(rows)}")
+    data = build_feature_matrix(rows)
+    print(f"[📂 SWEEP] {len(rows)} candles loaded ({time.time() - started:.1f}s)")
+
+    param_sets = random_params(space, args.samples, args.seed) if args.samples else grid_params(space)
+    started = time.time()
+    results = run_sweep(data, param_sets, args.workers)
+    elapsed = time.time() - started
+    print(f"[✅ SWEEP] {len(results)} parameter sets in {elapsed:.1f}s "
+          f"({len(results) / elapsed if elapsed > 0 else 0:.1f} sets/s)")
+
+    write_results(results, args.out)
+    for r in results[:args.top]:
+        print(f"  return {r['return_pct']:>8.2f}%  dd {r['max_drawdown_pct']:>6.2f}%  "
+              + " ".join(f"{k}={r[k]}" for k in space))
+    print(f"[💾 SWEEP] Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
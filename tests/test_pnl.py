@@ -0,0 +1,37 @@
+"""
+PnlEngine 펀딩 귀속: 헤지 모드 양방향 보유 시 롱은 +비율을 내고 숏은 받음
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pnl import PnlEngine  # noqa: E402
+
+
+def hedged_engine():
+    engine = PnlEngine(contract_multiplier=0.01)
+    engine.on_fill("long", 300, 600.0, opening=True)
+    engine.on_fill("short", 100, 600.0, opening=True)
+    engine.on_mark(600.0)
+    return engine
+
+
+def test_funding_attributed_per_side_from_rate():
+    engine = hedged_engine()
+    # 롱 명목 1800, 숏 명목 600, 비율 0.0001 → 롱 -0.18, 숏 +0.06, 정산액 -0.12
+    snap = engine.on_funding(-0.12, rate=0.0001)
+    assert snap.long.funding == pytest.approx(-0.18)
+    assert snap.short.funding == pytest.approx(0.06)
+    assert snap.funding == pytest.approx(-0.12)
+
+
+def test_funding_without_rate_is_account_level_only():
+    engine = hedged_engine()
+    snap = engine.on_funding(-0.12)
+    assert snap.long.funding == 0.0
+    assert snap.short.funding == 0.0
+    assert snap.funding == pytest.approx(-0.12)
+    assert snap.to_dict()["funding"] == pytest.approx(-0.12)
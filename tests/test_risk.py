@@ -0,0 +1,78 @@
+"""
+RiskGatedApi 수량 amend 검사: 원장은 정수 id(WS/REST JSON), amend 호출은 문자열 id
+"""
+import os
+import sys
+
+import pytest
+from gate_api import FuturesOrderAmendment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid_ladder import GridLadder  # noqa: E402
+from risk import RiskGate, RiskGatedApi, RiskLedger, RiskRejected  # noqa: E402
+
+
+class Snapshot:
+    long_size = 0
+    short_size = 0
+    long_locked = False
+    short_locked = False
+    capital = 5.0
+
+
+class FakeApi:
+    def __init__(self):
+        self.amended = []
+
+    def amend_futures_order(self, settle, order_id, amendment):
+        self.amended.append((order_id, amendment.size))
+        return {"id": order_id, "size": amendment.size}
+
+
+def build(order):
+    """ 한도 5 USDT (capital 5 × side_ratio 1), 가격 600 → 1계약 0.6 USDT """
+    ledger = RiskLedger(contract_multiplier=0.001)
+    ledger.on_state(Snapshot())
+    ledger.on_price(600.0)
+    ledger.on_order(order)
+    api = FakeApi()
+    return ledger, api, RiskGatedApi(api, RiskGate(ledger, side_ratio=1.0, gross_ratio=2.0))
+
+
+PARTIAL = {"id": 123, "status": "open", "size": 10, "left": 4, "is_reduce_only": False, "text": "t-gl1"}
+
+
+@pytest.mark.parametrize("order_id", ["123", 123])
+def test_amend_counts_only_increase_over_total_size(order_id):
+    # 전체 10 (체결 6, 잔량 4) → 11: 증가분 1계약만 새 노출 → (4 + 1) × 0.6 = 3.0 ≤ 5
+    ledger, api, gated = build(PARTIAL)
+    assert ledger.open_order(order_id) == ("long", 4, 10, False)
+    gated.amend_futures_order("usdt", order_id, FuturesOrderAmendment(size=11))
+    assert api.amended == [(order_id, 11)]
+
+
+def test_amend_beyond_limit_is_blocked():
+    # 10 → 20: 증가분 10계약 → (4 + 10) × 0.6 = 8.4 > 5
+    ledger, api, gated = build(PARTIAL)
+    with pytest.raises(RiskRejected):
+        gated.amend_futures_order("usdt", "123", FuturesOrderAmendment(size=20))
+    assert api.amended == []
+
+
+def test_reduce_only_amend_skips_exposure_check():
+    order = {"id": 7, "status": "open", "size": -10, "left": -10, "is_reduce_only": True, "text": "t-tp1"}
+    ledger, api, gated = build(order)
+    gated.amend_futures_order("usdt", "7", FuturesOrderAmendment(size=-50))
+    assert api.amended == [("7", -50)]
+
+
+def test_ladder_keeps_level_when_amend_is_blocked():
+    ledger, api, gated = build(PARTIAL)
+    store = {"long": [{"level": 1, "price_ticks": 60000, "price": "600.00", "size": 10, "text": "t-gl1", "id": 123}],
+             "short": []}
+    ladder = GridLadder(gated, "usdt", "BNB_USDT", store, lambda *args: "t-gl2", "grid_level", "0.01")
+    lv = store["long"][0]
+    ladder._amend("long", lv, 1, 20)
+    assert store["long"] == [lv] and lv["size"] == 10
+    assert ladder.amended == 0
@@ -0,0 +1,149 @@
+"""
+해시 타이머 휠 스케줄러 (이름 있는 데드라인 등록 / 이벤트마다 재등록)
+
+- 시간을 tick 단위로 나누고 slots개 버킷에 (데드라인 tick % slots)로 배치 → 등록/취소 O(1)
+- 같은 이름으로 다시 등록하면 기존 데드라인을 대체 (이벤트가 올 때마다 재무장)
+- 실행 스레드는 다음 데드라인까지 잠들고, 등록된 타이머가 없으면 무기한 대기 (빈 깨어남 없음)
+  데드라인은 tick 올림 → 예정 시각보다 일찍 실행되지 않음 (지연 ≤ tick)
+- 콜백은 작업 스레드 풀에서 실행 → 오래 걸리는 콜백이 다른 타이머를 늦추지 않음
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Timer:
+    __slots__ = ("name", "deadline", "tick", "callback", "args")
+
+    def __init__(self, name, deadline, tick, callback, args):
+        self.name = name
+        self.deadline = deadline            # time.monotonic() 기준
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+
+
+class TimerWheel:
+    def __init__(self, tick=0.01, slots=1024, workers=4, logger=None):
+        self.tick = tick
+        self.slots = slots
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self._origin = time.monotonic()
+        self._cursor = 0                    # 마지막으로 처리한 tick
+        self._buckets = [dict() for _ in range(slots)]
+        self._timers = {}
+        self._cond = threading.Condition()
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="timer")
+        self._thread = None
+        self.fired = 0
+        self.rearmed = 0
+        self.cancelled = 0
+        self.wakeups = 0
+        self.max_late_ms = 0.0
+
+    def _tick_of(self, monotonic_ts):
+        return math.ceil((monotonic_ts - self._origin) / self.tick)
+
+    # -------------------------------------------------------------------------
+    # 등록 / 취소
+    # -------------------------------------------------------------------------
+    def schedule(self, name, delay, callback, *args):
+        """ delay초 뒤 callback(*args). 같은 이름의 타이머가 있으면 대체 """
+        deadline = time.monotonic() + max(0.0, delay)
+        timer = Timer(name, deadline, max(self._tick_of(deadline), self._cursor + 1), callback, args)
+        with self._cond:
+            if self._remove_locked(name):
+                self.rearmed += 1
+            self._timers[name] = timer
+            self._buckets[timer.tick % self.slots][name] = timer
+            self._cond.notify()
+        return timer
+
+    def schedule_at(self, name, wall_ts, callback, *args):
+        """ wall-clock 시각(time.time())에 callback(*args) """
+        return self.schedule(name, wall_ts - time.time(), callback, *args)
+
+    def cancel(self, name):
+        with self._cond:
+            if self._remove_locked(name):
+                self.cancelled += 1
+                return True
+        return False
+
+    def _remove_locked(self, name):
+        timer = self._timers.pop(name, None)
+        if timer is None:
+            return False
+        self._buckets[timer.tick % self.slots].pop(name, None)
+        return True
+
+    def remaining(self, name):
+        """ 남은 시간(초), 등록되지 않았으면 None """
+        timer = self._timers.get(name)
+        return None if timer is None else max(0.0, timer.deadline - time.monotonic())
+
+    # -------------------------------------------------------------------------
+    # 실행
+    # -------------------------------------------------------------------------
+    def _collect_due_locked(self, now_tick):
+        due = []
+        span = now_tick - self._cursor
+        ticks = range(self._cursor + 1, now_tick + 1) if span < self.slots else range(now_tick - self.slots + 1, now_tick + 1)
+        for t in ticks:
+            bucket = self._buckets[t % self.slots]
+            if bucket:
+                for name in [n for n, timer in bucket.items() if timer.tick <= now_tick]:
+                    due.append(self._timers.pop(name))
+                    del bucket[name]
+        self._cursor = max(self._cursor, now_tick)
+        return due
+
+    def _next_tick_locked(self):
+        """ 다음으로 만기되는 tick (없으면 None): 한 바퀴 안은 버킷 순회, 그 너머는 전체 최소값 """
+        if not self._timers:
+            return None
+        for k in range(1, self.slots + 1):
+            t = self._cursor + k
+            bucket = self._buckets[t % self.slots]
+            if bucket and any(timer.tick <= t for timer in bucket.values()):
+                return t
+        return min(timer.tick for timer in self._timers.values())
+
+    def _run_timer(self, timer):
+        late_ms = (time.monotonic() - timer.deadline) * 1000
+        self.max_late_ms = max(self.max_late_ms, late_ms)
+        try:
+            timer.callback(*timer.args)
+        except Exception as e:
+            self.log("❌ TIMER", "%s error: %s", timer.name, e, event="timer_error", timer=timer.name)
+
+    def run(self):
+        while True:
+            with self._cond:
+                due = self._collect_due_locked(math.floor((time.monotonic() - self._origin) / self.tick))
+                if not due:
+                    next_tick = self._next_tick_locked()
+                    timeout = None if next_tick is None else max(0.0, self._origin + next_tick * self.tick - time.monotonic())
+                    self._cond.wait(timeout=timeout)
+                    self.wakeups += 1
+                    continue
+            for timer in due:
+                self.fired += 1
+                self._workers.submit(self._run_timer, timer)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="timer-wheel", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "pending": {name: round(timer.deadline - now, 3) for name, timer in list(self._timers.items())},
+            "fired": self.fired,
+            "rearmed": self.rearmed,
+            "cancelled": self.cancelled,
+            "wakeups": self.wakeups,
+            "max_late_ms": round(self.max_late_ms, 1),
+        }
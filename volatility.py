@@ -0,0 +1,193 @@
+"""
+변동성 지표 (ATR / 실현 변동성) 및 변동성 기반 TP 모델
+
+fetch_klines가 저장하는 캔들(high/low/close)을 그대로 사용합니다.
+확정된 캔들은 한 번만 반영(증분)하고, 진행 중인 마지막 캔들은 매번 임시로 계산합니다.
+"""
+import math
+import threading
+from decimal import Decimal
+
+import numpy as np
+
+
+class VolatilityTracker:
+    """
+    Wilder ATR과 로그수익률 기반 실현 변동성을 증분 계산합니다.
+    - 최초 시딩: 전체 히스토리를 NumPy로 한 번에 계산
+    - 이후 갱신: 새로 확정된 캔들만 O(1)로 반영
+    """
+
+    def __init__(self, atr_period=14, rv_window=30):
+        self.atr_period = atr_period
+        self.rv_window = rv_window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._last_closed_t = None     # 마지막으로 반영한 확정 캔들 timestamp
+            self._last_close = None        # 확정 캔들 종가 (다음 TR 계산용)
+            self._atr = None               # 확정 캔들 기준 ATR
+            self._returns = np.zeros(self.rv_window, dtype=np.float64)
+            self._ret_idx = 0
+            self._ret_count = 0
+            self._ret_sum = 0.0
+            self._ret_sqsum = 0.0
+            self.atr = 0.0                 # 진행 중 캔들 포함 ATR
+            self.atr_pct = 0.0             # ATR / 현재가
+            self.realized_vol = 0.0        # 캔들당 로그수익률 표준편차
+            self.last_close = 0.0
+
+    @property
+    def ready(self):
+        return self._atr is not None and self._ret_count >= 2
+
+    # -------------------------------------------------------------------------
+    # 시딩 (벡터화)
+    # -------------------------------------------------------------------------
+    def _seed(self, highs, lows, closes):
+        n = len(closes)
+        prev_close = np.empty(n)
+        prev_close[0] = closes[0]
+        prev_close[1:] = closes[:-1]
+        tr = np.maximum.reduce([
+            highs - lows,
+            np.abs(highs - prev_close),
+            np.abs(lows - prev_close),
+        ])
+
+        period = self.atr_period
+        alpha = 1.0 / period
+        seed = tr[:period].mean()
+        rest = tr[period:]
+        if len(rest) > 0:
+            # Wilder 재귀식을 가중합으로 전개: ATR_n = (1-a)^m * seed + Σ a(1-a)^(m-1-k) * TR_k
+            decay = (1.0 - alpha) ** np.arange(len(rest) - 1, -1, -1)
+            atr = seed * (1.0 - alpha) ** len(rest) + alpha * np.dot(decay, rest)
+        else:
+            atr = seed
+
+        rets = np.diff(np.log(closes))[-self.rv_window:]
+        self._returns[:] = 0.0
+        self._returns[:len(rets)] = rets
+        self._ret_count = len(rets)
+        self._ret_idx = len(rets) % self.rv_window
+        self._ret_sum = float(rets.sum())
+        self._ret_sqsum = float(np.dot(rets, rets))
+        self._atr = float(atr)
+        self._last_close = float(closes[-1])
+
+    # -------------------------------------------------------------------------
+    # 증분 갱신
+    # -------------------------------------------------------------------------
+    @staticmethod
+    def _true_range(high, low, prev_close):
+        return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+    def _push_closed(self, high, low, close):
+        tr = self._true_range(high, low, self._last_close)
+        self._atr += (tr - self._atr) / self.atr_period
+
+        ret = math.log(close / self._last_close) if self._last_close > 0 else 0.0
+        if self._ret_count >= self.rv_window:
+            old = self._returns[self._ret_idx]
+            self._ret_sum -= old
+            self._ret_sqsum -= old * old
+        else:
+            self._ret_count += 1
+        self._returns[self._ret_idx] = ret
+        self._ret_idx = (self._ret_idx + 1) % self.rv_window
+        self._ret_sum += ret
+        self._ret_sqsum += ret * ret
+        self._last_close = close
+
+    def _std(self, extra=None):
+        count, s, sq = self._ret_count, self._ret_sum, self._ret_sqsum
+        if extra is not None:
+            count, s, sq = count + 1, s + extra, sq + extra * extra
+        if count < 2:
+            return 0.0
+        var = (sq - s * s / count) / (count - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def update(self, candles):
+        """
+        candles: kline_history 항목 리스트 ({'t','high','low','close',...}, 시간순)
+        마지막 캔들은 진행 중으로 간주하여 확정 상태에 반영하지 않습니다.
+        """
+        if len(candles) < self.atr_period + 2:
+            return False
+
+        with self._lock:
+            closed = candles[:-1]
+            live = candles[-1]
+
+            if self._last_closed_t is None or closed[0].get('t', 0) > self._last_closed_t:
+                # 최초 실행 또는 히스토리 공백 → 전체 재시딩
+                highs = np.fromiter((k['high'] for k in closed), dtype=np.float64, count=len(closed))
+                lows = np.fromiter((k['low'] for k in closed), dtype=np.float64, count=len(closed))
+                closes = np.fromiter((k['close'] for k in closed), dtype=np.float64, count=len(closed))
+                self._seed(highs, lows, closes)
+            else:
+                for k in closed:
+                    if k.get('t', 0) > self._last_closed_t:
+                        self._push_closed(k['high'], k['low'], k['close'])
+            self._last_closed_t = closed[-1].get('t', 0)
+
+            # 진행 중 캔들은 임시로만 반영
+            live_tr = self._true_range(live['high'], live['low'], self._last_close)
+            self.atr = self._atr + (live_tr - self._atr) / self.atr_period
+            live_ret = math.log(live['close'] / self._last_close) if self._last_close > 0 else 0.0
+            self.realized_vol = self._std(live_ret)
+            self.last_close = live['close']
+            self.atr_pct = self.atr / live['close'] if live['close'] > 0 else 0.0
+        return True
+
+
+class VolatilitySnapshot:
+    """ 시세 프로세스가 계산해 보낸 값 (VolatilityTracker와 같은 조회 속성, 읽기 전용) """
+    __slots__ = ("atr", "atr_pct", "realized_vol", "ready")
+
+    def __init__(self, atr=0.0, atr_pct=0.0, realized_vol=0.0, ready=False):
+        self.atr = atr
+        self.atr_pct = atr_pct
+        self.realized_vol = realized_vol
+        self.ready = ready
+
+
+class VolatilityTPModel:
+    """
+    ATR 비율에 비례하는 TP 갭을 [tp_min, tp_max] 범위로 제한하여 산출합니다.
+    직전에 발행한 갭 대비 상대 변화가 hysteresis 미만이면 이전 값을 유지하여
+    변동성이 그대로일 때 TP 재주문이 일어나지 않도록 합니다.
+    """
+
+    def __init__(self, tp_min, tp_max, atr_multiplier=Decimal("0.5"),
+                 rv_multiplier=Decimal("1.0"), hysteresis=Decimal("0.15"),
+                 step=Decimal("0.0001")):
+        self.tp_min = Decimal(str(tp_min))
+        self.tp_max = Decimal(str(tp_max))
+        self.atr_multiplier = Decimal(str(atr_multiplier))
+        self.rv_multiplier = Decimal(str(rv_multiplier))
+        self.hysteresis = Decimal(str(hysteresis))
+        self.step = Decimal(str(step))
+        self.current_gap = None
+
+    def raw_gap(self, tracker):
+        atr_gap = Decimal(str(tracker.atr_pct)) * self.atr_multiplier
+        rv_gap = Decimal(str(tracker.realized_vol)) * self.rv_multiplier
+        gap = max(atr_gap, rv_gap)
+        return min(max(gap, self.tp_min), self.tp_max)
+
+    def gap(self, tracker):
+        """ 발행 갭 (hysteresis 적용, step 단위 반올림). 데이터 부족 시 None """
+        if not tracker.ready:
+            return None
+        new_gap = self.raw_gap(tracker).quantize(self.step)
+        if self.current_gap is not None and self.current_gap > 0:
+            change = abs(new_gap - self.current_gap) / self.current_gap
+            if change < self.hysteresis:
+                return self.current_gap
+        self.current_gap = new_gap
+        return new_gap
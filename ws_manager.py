@@ -0,0 +1,261 @@
+"""
+Gate.io 선물 WebSocket 단일 연결 관리자
+
+- 하나의 연결에 공개/비공개 채널 구독을 다중화
+- 재연결 시 자동 재구독, 지터가 포함된 지수 백오프
+- 채널별 메시지 시간 공백(gap) 감지 → 백필 콜백 호출
+- 재연결 후 끊겨 있던 구간을 백필 콜백(REST)으로 보충
+- 채널별 메시지 수 / 초당 처리율 / 지연(lag) 지표 제공
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import websockets
+
+
+class ChannelStats:
+    __slots__ = ("messages", "rate", "last_lag_ms", "max_lag_ms", "avg_lag_ms",
+                 "last_message_at", "gaps", "errors", "_rate_window_start", "_rate_window_count")
+
+    def __init__(self):
+        self.messages = 0
+        self.rate = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.avg_lag_ms = 0.0
+        self.last_message_at = 0.0
+        self.gaps = 0
+        self.errors = 0
+        self._rate_window_start = time.time()
+        self._rate_window_count = 0
+
+    def record(self, now, server_time_ms):
+        self.messages += 1
+        self.last_message_at = now
+        self._rate_window_count += 1
+        elapsed = now - self._rate_window_start
+        if elapsed >= 10:
+            self.rate = self._rate_window_count / elapsed
+            self._rate_window_start = now
+            self._rate_window_count = 0
+        if server_time_ms:
+            lag = now * 1000 - server_time_ms
+            self.last_lag_ms = lag
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+            # 지수 이동 평균
+            self.avg_lag_ms = lag if self.messages == 1 else self.avg_lag_ms * 0.95 + lag * 0.05
+
+    def to_dict(self, now):
+        return {
+            "messages": self.messages,
+            "rate_per_sec": round(self.rate, 3),
+            "lag_ms": round(self.last_lag_ms, 1),
+            "avg_lag_ms": round(self.avg_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_message_age_s": round(now - self.last_message_at, 1) if self.last_message_at else None,
+            "gaps": self.gaps,
+            "errors": self.errors,
+        }
+
+
+class Subscription:
+    def __init__(self, channel, payload, handler, private=False, blocking=False,
+                 gap_seconds=None, backfill=None):
+        self.channel = channel
+        self.payload = payload
+        self.handler = handler              # handler(result, message) - 동기 함수
+        self.private = private
+        self.gap_seconds = gap_seconds      # 이 시간 이상 메시지가 없으면 gap으로 판단
+        self.backfill = backfill            # backfill(since_ts, until_ts) - REST 보충
+        self.gap_reported_at = 0.0
+        self.stats = ChannelStats()
+        # 블로킹 핸들러는 전용 단일 스레드에서 순서대로 실행 (이벤트 루프 보호)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"ws-{channel}") if blocking else None
+
+
+class WsConnectionManager:
+    def __init__(self, url, api_key="", api_secret="", logger=None,
+                 ping_interval=20, ping_timeout=20, recv_timeout=60,
+                 backoff_base=1.0, backoff_max=60.0, stable_after=30.0):
+        self.url = url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.log = logger or (lambda tag, msg, *args, **fields: None)
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.recv_timeout = recv_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+
+        self.subscriptions = {}
+        self.connected = False
+        self.reconnects = 0
+        self.last_disconnect_at = 0.0
+        self._loop = None
+        self._ws = None
+        self._backfill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ws-backfill")
+        self.tap = None                     # tap(raw, recv_ts) - 수신 원문 관찰 (기록기 등), 파싱 전 호출
+
+    # -------------------------------------------------------------------------
+    # 구독 등록
+    # -------------------------------------------------------------------------
+    def subscribe(self, channel, payload, handler, private=False, blocking=False,
+                  gap_seconds=None, backfill=None):
+        sub = Subscription(channel, payload, handler, private, blocking, gap_seconds, backfill)
+        self.subscriptions[channel] = sub
+        if self.connected and self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(self._ws, sub), self._loop)
+        return sub
+
+    def _sign(self, channel, event, ts):
+        message = f"channel={channel}&event={event}&time={ts}"
+        return hmac.new(self.api_secret.encode(), message.encode(), hashlib.sha512).hexdigest()
+
+    def _request(self, sub, event="subscribe"):
+        ts = int(time.time())
+        req = {"time": ts, "channel": sub.channel, "event": event, "payload": sub.payload}
+        if sub.private:
+            req["auth"] = {"method": "api_key", "KEY": self.api_key, "SIGN": self._sign(sub.channel, event, ts)}
+        return json.dumps(req)
+
+    async def _send_subscribe(self, ws, sub):
+        await ws.send(self._request(sub))
+
+    # -------------------------------------------------------------------------
+    # 메시지 처리
+    # -------------------------------------------------------------------------
+    def _dispatch(self, sub, result, data):
+        try:
+            sub.handler(result, data)
+        except Exception as e:
+            sub.stats.errors += 1
+            self.log("❌ WS", "Handler error on %s: %s", sub.channel, e, event="ws_handler_error", channel=sub.channel)
+
+    def _on_message(self, raw):
+        now = time.time()
+        if self.tap is not None:
+            self.tap(raw, now)
+        self._handle(json.loads(raw), now)
+
+    def replay(self, data):
+        """ 기록된 메시지(파싱된 dict)를 현재 스레드에서 바로 처리 (재생 순서 보장) """
+        self._handle(data, time.time(), inline=True)
+
+    def _handle(self, data, now, inline=False):
+        channel = data.get("channel")
+        sub = self.subscriptions.get(channel)
+        if sub is None:
+            return
+        event = data.get("event")
+        if event == "subscribe":
+            if data.get("error"):
+                self.log("❌ WS", "Subscribe failed %s: %s", channel, data.get("error"), event="ws_subscribe_error", channel=channel)
+            else:
+                self.log("✅ WS", "Subscribed %s", channel, event="ws_subscribed", channel=channel)
+            return
+        if event != "update":
+            return
+
+        sub.stats.record(now, data.get("time_ms"))
+        result = data.get("result")
+        if sub.executor is not None and not inline:
+            sub.executor.submit(self._dispatch, sub, result, data)
+        else:
+            self._dispatch(sub, result, data)
+
+    def _run_backfill(self, sub, since_ts, until_ts, reason):
+        if sub.backfill is None or since_ts <= 0:
+            return
+        self.log("🔁 WS", "Backfill %s (%s): %.1fs", sub.channel, reason, until_ts - since_ts,
+                 event="ws_backfill", channel=sub.channel, reason=reason, since=since_ts, until=until_ts)
+        target = sub.executor or self._backfill_executor
+        target.submit(self._safe_backfill, sub, since_ts, until_ts)
+
+    def _safe_backfill(self, sub, since_ts, until_ts):
+        try:
+            sub.backfill(since_ts, until_ts)
+        except Exception as e:
+            self.log("❌ WS", "Backfill error on %s: %s", sub.channel, e, event="ws_backfill_error", channel=sub.channel)
+
+    async def _gap_watchdog(self):
+        while True:
+            await asyncio.sleep(1)
+            now = time.time()
+            for sub in self.subscriptions.values():
+                last = max(sub.stats.last_message_at, sub.gap_reported_at)
+                if sub.gap_seconds and last and now - last > sub.gap_seconds:
+                    sub.stats.gaps += 1
+                    self.log("⚠️ WS", "Gap on %s: %.1fs without messages", sub.channel, now - last,
+                             event="ws_gap", channel=sub.channel, gap_s=round(now - last, 1))
+                    self._run_backfill(sub, last, now, "gap")
+                    sub.gap_reported_at = now
+
+    # -------------------------------------------------------------------------
+    # 연결 루프
+    # -------------------------------------------------------------------------
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            connected_at = 0.0
+            watchdog = None
+            try:
+                async with websockets.connect(self.url, ping_interval=self.ping_interval,
+                                              ping_timeout=self.ping_timeout, close_timeout=10) as ws:
+                    self._ws = ws
+                    for sub in list(self.subscriptions.values()):
+                        await self._send_subscribe(ws, sub)
+                    self.connected = True
+                    connected_at = time.time()
+                    self.log("✅ WS", "Connected (%d channels)", len(self.subscriptions), event="ws_connected")
+
+                    if self.last_disconnect_at:
+                        for sub in self.subscriptions.values():
+                            self._run_backfill(sub, self.last_disconnect_at, connected_at, "reconnect")
+
+                    watchdog = asyncio.ensure_future(self._gap_watchdog())
+                    while True:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=self.recv_timeout)
+                        self._on_message(raw)
+                        if attempt and time.time() - connected_at > self.stable_after:
+                            attempt = 0
+            except Exception as e:
+                self.log("⚠️ WS", "Disconnected: %s", e, event="ws_disconnected")
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+                if self.connected:
+                    self.last_disconnect_at = time.time()
+                self.connected = False
+                self._ws = None
+
+            if connected_at and time.time() - connected_at > self.stable_after:
+                attempt = 0
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            attempt += 1
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+
+    def start(self):
+        def runner():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.run())
+        thread = threading.Thread(target=runner, name="ws-manager", daemon=True)
+        thread.start()
+        return thread
+
+    def metrics(self):
+        now = time.time()
+        return {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "channels": {ch: sub.stats.to_dict(now) for ch, sub in self.subscriptions.items()},
+        }